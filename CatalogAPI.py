@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+
+from CatalogUtils import normalize_course_code
+from DeptShards import MANIFEST, shard_dir
+from TermStore import TermCatalogStore
+
+logger = logging.getLogger(__name__)
+
+API_HOST = '127.0.0.1'
+API_PORT = 8080
+CATALOG_MAX_AGE = 300
+RATINGS_MAX_AGE = 60
+GZIP_MIN_BYTES = 1024
+BODY_CACHE_SIZE = 2048
+
+
+class CatalogState:
+    """Standalone stand-in for the bot's module globals the API reads"""
+
+    def __init__(self, term_store=None, shared_cache_path=None):
+        self.term_store = term_store or TermCatalogStore()
+        self.departments = {}
+        self.course_descriptions = {}
+        self.catalog_version = None
+        self.grade_table = None
+        self.prereq_graph = None
+        self.professor_cache = {}
+        self.shared_ratings = None
+        if shared_cache_path:
+            from SharedCache import SharedRatingCache
+            self.shared_ratings = SharedRatingCache(shared_cache_path)
+
+    def load(self):
+        from GradeIngest import GradeStore
+        from GradeStats import GradeTable
+        from PrereqGraph import PrereqGraph
+        catalog = self.term_store.current(reload=True)
+        self.departments = catalog['departments']
+        self.course_descriptions = catalog['course_descriptions']
+        self.grade_table = GradeTable.load(store=GradeStore.load())
+        self.prereq_graph = PrereqGraph.build(self.course_descriptions)
+        self.catalog_version = catalog['version']
+        return self
+
+
+class CatalogAPI:
+    """Read-only JSON over the same in-memory catalog, grade table and rating caches the bot uses.
+
+    `state` is anything with the bot's global names (the bot passes its own module), read
+    on every request so reloads show up immediately. Catalog responses carry an ETag of
+    the catalog version and their encoded bodies are kept until the version changes;
+    rating responses are tagged by content since ratings fill in between catalog loads.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.bodies = OrderedDict()
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/api/version', self.version),
+            web.get('/api/departments', self.departments),
+            web.get('/api/departments/{dept}', self.department),
+            web.get('/api/courses/{code}', self.course),
+            web.get('/api/courses/{code}/sections', self.sections),
+            web.get('/api/grades/{code}', self.grades),
+            web.get('/api/ratings', self.ratings),
+            web.get('/api/ratings/{name}', self.rating),
+            web.get('/api/shards', self.shard_manifest),
+            web.get('/api/shards/{dept}', self.shard),
+        ])
+        self.manifests = {}
+        self.runner = None
+
+    def course_info(self, code):
+        return self.state.course_descriptions.get(normalize_course_code(code))
+
+    async def cached_ratings(self, names):
+        """{name: rating or None} from the in-memory cache, then the shared SQLite cache off the loop"""
+        ratings = {name: self.state.professor_cache.get(name) for name in names}
+        missing = [name for name, rating in ratings.items() if rating is None]
+        shared = getattr(self.state, 'shared_ratings', None)
+        if missing and shared is not None:
+            found = await asyncio.to_thread(lambda: {name: shared.get(name) for name in missing})
+            ratings.update(found)
+        return ratings
+
+    @staticmethod
+    def encode(raw, request):
+        if len(raw) >= GZIP_MIN_BYTES and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            return gzip.compress(raw, compresslevel=6, mtime=0), 'gzip'
+        return raw, None
+
+    @staticmethod
+    def build_response(request, body, encoding, etag, max_age):
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={max_age}",
+            'Vary': 'Accept-Encoding'
+        }
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return web.Response(body=body, content_type='application/json', charset='utf-8', headers=headers)
+
+    async def respond(self, request, build, by_version=True):
+        version = self.state.catalog_version
+        if version is None:
+            return web.json_response({'error': 'Catalog is still loading'}, status=503, headers={'Retry-After': '5'})
+
+        if not by_version:
+            payload = build()
+            if payload is None:
+                return web.json_response({'error': 'Not found'}, status=404)
+            raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            etag = f'"r-{hashlib.sha1(raw).hexdigest()[:16]}"'
+            return self.build_response(request, *self.encode(raw, request), etag, RATINGS_MAX_AGE)
+
+        etag = f'"{version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return self.build_response(request, None, None, etag, CATALOG_MAX_AGE)
+        key = (version, request.path_qs, 'gzip' in request.headers.get('Accept-Encoding', ''))
+        cached = self.bodies.get(key)
+        if cached is None:
+            payload = build()
+            if payload is None:
+                return web.json_response({'error': 'Not found'}, status=404)
+            raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            cached = self.bodies[key] = self.encode(raw, request)
+            if len(self.bodies) > BODY_CACHE_SIZE:
+                self.bodies.popitem(last=False)
+        else:
+            self.bodies.move_to_end(key)
+        return self.build_response(request, *cached, etag, CATALOG_MAX_AGE)
+
+    async def version(self, request):
+        return await self.respond(request, lambda: {
+            'version': self.state.catalog_version,
+            'courses': len(self.state.course_descriptions),
+            'departments': len(self.state.departments)
+        })
+
+    async def departments(self, request):
+        return await self.respond(request, lambda: {
+            dept: sorted(codes) for dept, codes in sorted(self.state.departments.items())
+        })
+
+    async def department(self, request):
+        dept = request.match_info['dept'].upper()
+
+        def build():
+            codes = self.state.departments.get(dept)
+            if codes is None:
+                return None
+            return [{'code': code, 'name': self.state.course_descriptions[code]['name'],
+                     'credits': self.state.course_descriptions[code].get('credits')}
+                    for code in sorted(codes) if code in self.state.course_descriptions]
+        return await self.respond(request, build)
+
+    async def course(self, request):
+        code = normalize_course_code(request.match_info['code'])
+        if code is None:
+            return web.json_response({'error': 'Not found'}, status=404)
+
+        def build():
+            info = self.course_info(code)
+            if info is None:
+                return None
+            payload = {'code': code, **info}
+            if self.state.grade_table is not None:
+                payload['grades'] = self.state.grade_table.lookup(code)
+            graph = self.state.prereq_graph
+            if graph is not None and code in graph.ids:
+                direct, transitive = graph.prerequisites(code)
+                payload['prerequisites'] = {'direct': sorted(direct), 'transitive': sorted(transitive)}
+            return payload
+        return await self.respond(request, build)
+
+    async def sections(self, request):
+        code = normalize_course_code(request.match_info['code'])
+        if code is None:
+            return web.json_response({'error': 'Not found'}, status=404)
+        info = self.course_info(code)
+        ratings = {}
+        if info is not None:
+            ratings = await self.cached_ratings({section.get('instructor') for section in info['sections']})
+
+        def build():
+            if info is None:
+                return None
+            return [dict(section, rating=ratings.get(section.get('instructor')))
+                    for section in info['sections']]
+        return await self.respond(request, build, by_version=False)
+
+    async def grades(self, request):
+        code = normalize_course_code(request.match_info['code'])
+        if code is None:
+            return web.json_response({'error': 'Not found'}, status=404)
+
+        def build():
+            table = self.state.grade_table
+            if table is None or table.row(code) is None:
+                return None
+            return {'code': code, **table.lookup(code)}
+        return await self.respond(request, build)
+
+    async def ratings(self, request):
+        return await self.respond(request, lambda: dict(self.state.professor_cache), by_version=False)
+
+    async def rating(self, request):
+        name = request.match_info['name']
+        rating = (await self.cached_ratings([name]))[name]
+        return await self.respond(request, lambda: rating, by_version=False)
+
+    def read_manifest(self):
+        """(shard directory, manifest bytes, parsed manifest) for the current term, reread when the file changes"""
+        directory = shard_dir(self.state.term_store.current_term)
+        path = os.path.join(directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return directory, None, None
+        cached = self.manifests.get(directory)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            cached = self.manifests[directory] = (mtime, raw, json.loads(raw))
+        return directory, cached[1], cached[2]
+
+    async def shard_manifest(self, request):
+        _, raw, manifest = self.read_manifest()
+        if manifest is None:
+            return web.json_response({'error': 'No shards built for this term'}, status=404)
+        etag = f'"m-{hashlib.sha1(raw).hexdigest()[:16]}"'
+        return self.build_response(request, *self.encode(raw, request), etag, CATALOG_MAX_AGE)
+
+    async def shard(self, request):
+        """A department shard, served from its precompressed variant when the client accepts one"""
+        directory, _, manifest = self.read_manifest()
+        entry = manifest and manifest['departments'].get(request.match_info['dept'].upper())
+        if entry is None:
+            return web.json_response({'error': 'Not found'}, status=404)
+        etag = f'"{entry["sha256"][:16]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return self.build_response(request, None, None, etag, CATALOG_MAX_AGE)
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = next((e for e in ('br', 'gzip') if e in accepted and e in entry['encodings']), None)
+        name = entry['encodings'][encoding]['file'] if encoding else entry['file']
+        with open(os.path.join(directory, name), 'rb') as f:
+            body = f.read()
+        return self.build_response(request, body, encoding, etag, CATALOG_MAX_AGE)
+
+    async def start(self, host=API_HOST, port=API_PORT):
+        """Serve from inside an already running event loop (the bot's)"""
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info(f"Catalog API listening on http://{host}:{port}/api")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+async def load_test(base_url, connections=32, duration=10.0, seed=0):
+    """Hammer a running API with a mix of catalog and ratings requests.
+
+    Half the clients revalidate with If-None-Match like a well-behaved cache would.
+    """
+    import aiohttp
+
+    rng = random.Random(seed)
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/api/departments") as response:
+            departments = await response.json()
+        codes = [code for dept_codes in departments.values() for code in dept_codes]
+        depts = list(departments)
+
+        latencies, statuses = [], {}
+        deadline = time.perf_counter() + duration
+
+        async def client(revalidate):
+            etags = {}
+            headers = {'Accept-Encoding': 'gzip'}
+            while time.perf_counter() < deadline:
+                roll = rng.random()
+                if roll < 0.5:
+                    path = f"/api/courses/{rng.choice(codes).replace(' ', '%20')}"
+                elif roll < 0.7:
+                    path = f"/api/departments/{rng.choice(depts)}"
+                elif roll < 0.9:
+                    path = f"/api/grades/{rng.choice(codes).replace(' ', '%20')}"
+                else:
+                    path = f"/api/courses/{rng.choice(codes).replace(' ', '%20')}/sections"
+                request_headers = dict(headers)
+                if revalidate and path in etags:
+                    request_headers['If-None-Match'] = etags[path]
+                start = time.perf_counter()
+                async with session.get(base_url + path, headers=request_headers) as response:
+                    await response.read()
+                    if 'ETag' in response.headers:
+                        etags[path] = response.headers['ETag']
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client(i % 2 == 1) for i in range(connections)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'statuses': statuses
+    }
+
+
+def wait_for_server(base_url, timeout=120.0):
+    import urllib.request
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/version", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(0.25)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the course catalog")
+    sub = parser.add_subparsers(dest='command')
+    serve = sub.add_parser('serve')
+    serve.add_argument('--host', default=API_HOST)
+    serve.add_argument('--port', type=int, default=API_PORT)
+    serve.add_argument('--shared-cache', default=os.environ.get('SFU_SHARED_CACHE'))
+    bench = sub.add_parser('loadtest', help="Start a server process and load test it")
+    bench.add_argument('--port', type=int, default=API_PORT + 1)
+    bench.add_argument('--connections', type=int, default=32)
+    bench.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.command == 'loadtest':
+        base_url = f"http://{API_HOST}:{args.port}"
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--port', str(args.port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for_server(base_url):
+                raise RuntimeError("API server did not start")
+            result = asyncio.run(load_test(base_url, args.connections, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{result['requests']} requests over {args.connections} connections in {args.duration:.0f}s "
+              f"(server and client share {os.cpu_count()} CPU)")
+        print(f"  {result['rps']:.0f} req/s   p50 {result['p50_ms']:.1f} ms   p99 {result['p99_ms']:.1f} ms")
+        print(f"  statuses: {dict(sorted(result['statuses'].items()))}")
+        return
+
+    host = getattr(args, 'host', API_HOST)
+    port = getattr(args, 'port', API_PORT)
+    state = CatalogState(shared_cache_path=getattr(args, 'shared_cache', None)).load()
+    web.run_app(CatalogAPI(state).app, host=host, port=port, access_log=None)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
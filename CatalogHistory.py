@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from TermStore import CURRENT_TERM, parse_term, term_path
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DIR = os.path.join(SCRIPT_DIR, 'catalog_history')
+# Every Nth version also stores its full record map so checkouts never replay long chains
+CHECKPOINT_EVERY = 20
+MAX_MATERIALIZED = 4
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def record_hash(record):
+    return hashlib.sha1(canonical_json(record).encode('utf-8')).hexdigest()
+
+
+def record_keys(courses):
+    """Stable key per record: its whitespace-normalized name, with '#2', '#3'... for repeats"""
+    seen = {}
+    keys = []
+    for course in courses:
+        name = ' '.join((course.get('course_name') or '').split())
+        seen[name] = seen.get(name, 0) + 1
+        keys.append(name if seen[name] == 1 else f"{name}#{seen[name]}")
+    return keys
+
+
+def write_json(path, value):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class CatalogHistory:
+    """Every scrape of a term kept as a version, course records stored once by content hash.
+
+    objects/ holds one file per distinct record, shared by all versions and terms. Each
+    version stores only its delta against the previous one as {key: [old_hash, new_hash]}
+    (plus a full map every CHECKPOINT_EVERY versions), so an unchanged re-scrape costs
+    nothing and a diff between two versions only reads the deltas in between. HEAD is the
+    version the bot serves; rolling back moves it and rewrites the term's catalog file.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._materialized = OrderedDict()
+
+    def _term_dir(self, term):
+        path = os.path.join(self.root, term)
+        os.makedirs(os.path.join(path, 'versions'), exist_ok=True)
+        return path
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def _index(self, term):
+        try:
+            with open(os.path.join(self._term_dir(term), 'index.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'versions': [], 'head': None}
+
+    def _save_index(self, term, index):
+        write_json(os.path.join(self._term_dir(term), 'index.json'), index)
+
+    def version(self, term, version_id):
+        with open(os.path.join(self._term_dir(term), 'versions', f"{version_id}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def versions(self, term):
+        return self._index(term)['versions']
+
+    def head(self, term):
+        return self._index(term)['head']
+
+    def resolve(self, term, ref):
+        """Full id for a version id prefix, 'HEAD', or 'HEAD~n'"""
+        index = self._index(term)
+        if ref is None or ref.upper().startswith('HEAD'):
+            if index['head'] is None:
+                raise KeyError(f"No versions recorded for {term}")
+            back = int(ref.split('~', 1)[1]) if ref and '~' in ref else 0
+            position = index['versions'].index(index['head']) - back
+            if position < 0:
+                raise KeyError(f"{term} has no version {ref}")
+            return index['versions'][position]
+        matches = [v for v in index['versions'] if v.startswith(ref)]
+        if len(matches) != 1:
+            raise KeyError(f"{'Ambiguous' if matches else 'Unknown'} version '{ref}' for {term}")
+        return matches[0]
+
+    def materialize(self, term, version_id):
+        """{key: record_hash} for a version: nearest checkpoint plus the deltas after it"""
+        cache_key = (term, version_id)
+        if cache_key in self._materialized:
+            self._materialized.move_to_end(cache_key)
+            return self._materialized[cache_key]
+
+        versions = self.versions(term)
+        position = versions.index(version_id)
+        start = position
+        while 'full' not in self.version(term, versions[start]):
+            start -= 1
+        tree = dict(self.version(term, versions[start])['full'])
+        for vid in versions[start + 1:position + 1]:
+            for key, (_, new) in self.version(term, vid)['delta'].items():
+                if new is None:
+                    tree.pop(key, None)
+                else:
+                    tree[key] = new
+
+        self._materialized[cache_key] = tree
+        if len(self._materialized) > MAX_MATERIALIZED:
+            self._materialized.popitem(last=False)
+        return tree
+
+    def commit(self, term, courses, source=None):
+        """Record a scrape as a new version and make it HEAD; returns its id.
+
+        Only records not already in objects/ are written. A scrape identical to the latest
+        version adds nothing and returns the latest id.
+        """
+        tree = {}
+        for key, course in zip(record_keys(courses), courses):
+            digest = record_hash(course)
+            tree[key] = digest
+            path = self._object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write_json(path, course)
+        tree_hash = hashlib.sha1(canonical_json(tree).encode('utf-8')).hexdigest()
+
+        index = self._index(term)
+        parent = index['versions'][-1] if index['versions'] else None
+        previous = self.materialize(term, parent) if parent else {}
+        if parent and self.version(term, parent)['tree'] == tree_hash:
+            logger.info(f"{term}: catalog unchanged since {parent}")
+            if index['head'] != parent:
+                index['head'] = parent
+                self._save_index(term, index)
+            return parent
+
+        delta = {key: [previous.get(key), tree.get(key)]
+                 for key in previous.keys() | tree.keys() if previous.get(key) != tree.get(key)}
+        version_id = hashlib.sha1(f"{parent}:{tree_hash}".encode('utf-8')).hexdigest()[:12]
+        version = {
+            'id': version_id,
+            'parent': parent,
+            'tree': tree_hash,
+            'created_at': int(time.time()),
+            'source': source,
+            'count': len(tree),
+            'changed': len(delta),
+            # A first version's delta is just its full map, which the checkpoint already holds
+            'delta': delta if parent else {}
+        }
+        if len(index['versions']) % CHECKPOINT_EVERY == 0:
+            version['full'] = tree
+        write_json(os.path.join(self._term_dir(term), 'versions', f"{version_id}.json"), version)
+
+        index['versions'].append(version_id)
+        index['head'] = version_id
+        self._save_index(term, index)
+        self._materialized[(term, version_id)] = tree
+        logger.info(f"{term}: recorded version {version_id} ({len(delta)} records changed of {len(tree)})")
+        return version_id
+
+    def diff(self, term, old_ref, new_ref):
+        """Keys added, removed and modified between two versions, reading only the deltas between them"""
+        versions = self.versions(term)
+        old_id, new_id = self.resolve(term, old_ref), self.resolve(term, new_ref)
+        i, j = versions.index(old_id), versions.index(new_id)
+        forward = i <= j
+        path = versions[min(i, j) + 1:max(i, j) + 1]
+
+        # First old value and last new value per key along the path, oldest to newest
+        changes = {}
+        for vid in path:
+            for key, (old, new) in self.version(term, vid)['delta'].items():
+                changes[key] = [changes[key][0] if key in changes else old, new]
+
+        result = {'added': [], 'removed': [], 'modified': []}
+        for key, (before, after) in changes.items():
+            if not forward:
+                before, after = after, before
+            if before == after:
+                continue
+            kind = 'added' if before is None else 'removed' if after is None else 'modified'
+            result[kind].append(key)
+        for keys in result.values():
+            keys.sort()
+        return result
+
+    def load_record(self, digest):
+        with open(self._object_path(digest), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def checkout(self, term, ref):
+        """The course list of a version, in key order"""
+        tree = self.materialize(term, self.resolve(term, ref))
+        return [self.load_record(tree[key]) for key in sorted(tree)]
+
+    def rollback(self, term, ref='HEAD~1', output_file=None):
+        """Serve an earlier version: rewrite the term's catalog file from history and move HEAD"""
+        version_id = self.resolve(term, ref)
+        courses = self.checkout(term, version_id)
+        output_file = output_file or term_path(term)
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        tmp_path = f"{output_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(courses, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, output_file)
+
+        index = self._index(term)
+        index['head'] = version_id
+        self._save_index(term, index)
+        logger.info(f"{term}: rolled back to {version_id} ({len(courses)} courses)")
+        return version_id
+
+    def log(self, term):
+        """(version, created_at, count, changed, is_head) newest first"""
+        index = self._index(term)
+        rows = []
+        for vid in reversed(index['versions']):
+            version = self.version(term, vid)
+            rows.append((vid, version['created_at'], version['count'], version['changed'], vid == index['head']))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned catalog history")
+    parser.add_argument('--root', default=HISTORY_DIR)
+    parser.add_argument('--term', default=CURRENT_TERM, help="e.g. 'Fall 2025' or 2025-fall")
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('import', help="Record catalog JSON files as versions, oldest first")
+    add.add_argument('files', nargs='+')
+    sub.add_parser('log')
+    diff = sub.add_parser('diff')
+    diff.add_argument('old')
+    diff.add_argument('new', nargs='?', default='HEAD')
+    back = sub.add_parser('rollback')
+    back.add_argument('version', nargs='?', default='HEAD~1')
+    args = parser.parse_args()
+
+    term = parse_term(args.term) or args.term
+    history = CatalogHistory(args.root)
+
+    if args.command == 'import':
+        for path in args.files:
+            with open(path, 'r', encoding='utf-8') as f:
+                courses = json.load(f)
+            start = time.perf_counter()
+            version_id = history.commit(term, courses, source=os.path.basename(path))
+            print(f"{path}: {version_id} ({time.perf_counter() - start:.2f}s)")
+    elif args.command == 'log':
+        for vid, created_at, count, changed, is_head in history.log(term):
+            stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(created_at))
+            print(f"{'*' if is_head else ' '} {vid}  {stamp}  {count:>5} courses  {changed:>5} changed")
+    elif args.command == 'diff':
+        start = time.perf_counter()
+        result = history.diff(term, args.old, args.new)
+        elapsed = time.perf_counter() - start
+        for kind, sign in (('added', '+'), ('removed', '-'), ('modified', '~')):
+            for key in result[kind]:
+                print(f"{sign} {key}")
+        print(f"{len(result['added'])} added, {len(result['removed'])} removed, "
+              f"{len(result['modified'])} modified ({elapsed * 1000:.1f} ms)")
+    elif args.command == 'rollback':
+        version_id = history.rollback(term, args.version)
+        print(f"{term} now serves {version_id} from {term_path(term)}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
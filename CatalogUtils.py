@@ -0,0 +1,111 @@
+import re
+
+DAY_NAMES = {
+    'Mon': 'monday', 'Tue': 'tuesday', 'Wed': 'wednesday', 'Thu': 'thursday',
+    'Fri': 'friday', 'Sat': 'saturday', 'Sun': 'sunday'
+}
+WEEKDAYS = list(DAY_NAMES)
+
+# Scraped locations repeat the campus once per meeting ("BurnabyBurnaby")
+CAMPUSES = ['Burnaby', 'Surrey', 'Vancouver', 'Online', 'GOLDCORP', 'SEGAL', 'DT VSAR', 'TBD']
+CAMPUS_PATTERN = re.compile('|'.join(re.escape(c) for c in CAMPUSES))
+
+TIME_RANGE_PATTERN = re.compile(
+    r'(\d{1,2}):(\d{2})\s*(a\.m\.|p\.m\.)?\s*[–-]\s*(\d{1,2}):(\d{2})\s*(a\.m\.|p\.m\.)'
+)
+COURSE_CODE_PATTERN = re.compile(r'\b([A-Z]{2,5})\s*(\d{3})\b')
+
+
+def parse_credits(course_name):
+    """Units from a raw scraped name like 'Intro [ACMA\\n\\t\\t101\\n\\t\\t\\t(3)]', or None"""
+    match = re.search(r'\(([\d.]+)\)\s*\]\s*$', course_name)
+    return float(match.group(1)) if match else None
+
+
+def parse_campuses(location):
+    campuses = []
+    for campus in CAMPUS_PATTERN.findall(location or ''):
+        if campus not in campuses:
+            campuses.append(campus)
+    if not campuses and location and location.strip():
+        campuses.append(location.strip())
+    return campuses
+
+
+def _to_minutes(hour, minute, meridiem):
+    hour = int(hour) % 12
+    if meridiem == 'p.m.':
+        hour += 12
+    return hour * 60 + int(minute)
+
+
+def parse_meetings(day_time):
+    """Split a scraped 'day/time' cell into [(days, start_minute, end_minute), ...].
+
+    Handles cells like 'Jan 6 – Apr 9, 2025: Tue, Thu, 10:30–11:20 a.m.' where the start
+    time borrows the end time's a.m./p.m. unless that would put it after the end.
+    """
+    meetings = []
+    for line in (day_time or '').split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        schedule = line.split(': ', 1)[1] if ': ' in line else line
+        days = [day for day in re.findall(r'\b(Mon|Tue|Wed|Thu|Fri|Sat|Sun)\b', schedule)]
+        match = TIME_RANGE_PATTERN.search(schedule)
+        if not days and not match:
+            continue
+        start = end = None
+        if match:
+            h1, m1, mer1, h2, m2, mer2 = match.groups()
+            end = _to_minutes(h2, m2, mer2)
+            start = _to_minutes(h1, m1, mer1 or mer2)
+            if mer1 is None and start > end:
+                start -= 12 * 60
+        meetings.append((days, start, end))
+    return meetings
+
+
+def format_meetings(meetings):
+    """[(['Tue', 'Thu'], 810, 860)] -> 'Tue/Thu 13:30–14:20'"""
+    parts = []
+    for days, start, end in meetings:
+        when = f"{start // 60}:{start % 60:02d}–{end // 60}:{end % 60:02d}" if start is not None else ''
+        text = ' '.join(filter(None, ['/'.join(days), when]))
+        if text and text not in parts:
+            parts.append(text)
+    return '; '.join(parts)
+
+
+def lecture_sections(sections):
+    """Lecture sections (D100, E100...) without their tutorials and labs, or all if none match"""
+    lectures = [section for section in sections if section['section'].endswith('00')]
+    return lectures or sections
+
+
+def course_level(course_code):
+    """'CMPT 307' -> 300"""
+    try:
+        return int(course_code.split()[1][:3]) // 100 * 100
+    except (IndexError, ValueError):
+        return None
+
+
+def parse_course_codes(text):
+    """'CMPT 225, macm201 276' -> ['CMPT 225', 'MACM 201', 'MACM 276'].
+
+    A bare number reuses the department before it; duplicates are dropped.
+    """
+    codes = []
+    dept = None
+    for match in re.finditer(r'\b([A-Z]{2,5})?\s*(\d{3})\b', re.sub(r'[-_]', ' ', (text or '').upper())):
+        dept = match.group(1) or dept
+        if dept and f"{dept} {match.group(2)}" not in codes:
+            codes.append(f"{dept} {match.group(2)}")
+    return codes
+
+
+def normalize_course_code(text):
+    """'cmpt225' / 'CMPT-225' / 'cmpt 225' -> 'CMPT 225', or None"""
+    match = COURSE_CODE_PATTERN.search(re.sub(r'[-_]', ' ', text.upper()))
+    return f"{match.group(1)} {match.group(2)}" if match else None
@@ -6,6 +6,7 @@ import logging
 from queue import Queue
 import json
 import re
+from HttpClient import install_ratemyprofessor
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +16,25 @@ logger = logging.getLogger(__name__)
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
+install_ratemyprofessor()
+
+# RateMyProfessor lookups allowed in flight at once for a pasted cart
+PROFESSOR_CONCURRENCY = 4
+MAX_ROWS = 25
+
+sfu_school = None
+professor_cache = {}
+grade_data = None
+
+FIELDS_ERROR = "Error: Invalid course data format. Please provide: Semester, Course Code, Course Name, Capacity, Professor Name, Campus"
+ROW_START = re.compile(r'^\s*((?:Spring|Summer|Fall)\s+\d{4})\s+([A-Z]{2,5}\s*\d{3}\w?(?:\s+[A-Z]\d{2,3})?)\s+(.*)$', re.IGNORECASE)
+CAPACITY = re.compile(r'^\d*\s*/\s*\d+$')
+NOT_FOUND = {
+    'rating': 'Not Found',
+    'difficulty': 'Not Found',
+    'would_take_again': 'Not Found',
+    'num_ratings': 'Not Found'
+}
 
 def get_professor_rating(school, professor_name):
     if not professor_name:
@@ -25,26 +45,26 @@ def get_professor_rating(school, professor_name):
             'num_ratings': 'N/A'
         }
     
-    asyncio.sleep(1)  # Rate limiting
-    try:
-        prof = ratemyprofessor.get_professor_by_school_and_name(school, professor_name)
-        
-        if prof:
-            return {
-                'rating': prof.rating if prof.rating else 'N/A',
-                'difficulty': prof.difficulty if prof.difficulty else 'N/A',
-                'would_take_again': f"{round(prof.would_take_again, 1)}%" if prof.would_take_again is not None else 'N/A',
-                'num_ratings': prof.num_ratings
-            }
-    except Exception as e:
-        logger.error(f"Error getting professor rating for {professor_name}: {str(e)}")
+    # Lookup errors propagate so the caller can keep them out of the cache
+    prof = ratemyprofessor.get_professor_by_school_and_name(school, professor_name)
     
-    return {
-        'rating': 'Not Found',
-        'difficulty': 'Not Found',
-        'would_take_again': 'Not Found',
-        'num_ratings': 'Not Found'
-    }
+    if prof:
+        return {
+            'rating': prof.rating if prof.rating else 'N/A',
+            'difficulty': prof.difficulty if prof.difficulty else 'N/A',
+            'would_take_again': f"{round(prof.would_take_again, 1)}%" if prof.would_take_again is not None else 'N/A',
+            'num_ratings': prof.num_ratings
+        }
+    
+    return dict(NOT_FOUND)
+
+def load_grade_data():
+    """data.txt lines, read once per process instead of once per lookup"""
+    global grade_data
+    if grade_data is None:
+        with open('data.txt', 'r') as f:
+            grade_data = [line.strip() for line in f if line.strip()]
+    return grade_data
 
 def get_course_digger_info(course_code):
     """Get course information from local data.txt file"""
@@ -57,8 +77,7 @@ def get_course_digger_info(course_code):
     }
     
     try:
-        with open('data.txt', 'r') as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
+        lines = load_grade_data()
         
         grade_to_gpa = {
             'A+': 4.33, 'A': 4.00, 'A-': 3.67,
@@ -96,84 +115,160 @@ def get_course_digger_info(course_code):
         return default_response
 
 
+def parse_course_row(row):
+    """Split one pasted row into its six fields, or return None if it doesn't look like one"""
+    # Replace '\t' with actual tabs
+    row = row.replace('\\t', '\t').strip()
+    if not row:
+        return None
+    
+    # Split by either tabs or multiple spaces
+    parts = [part.strip() for part in re.split(r'\t+|\s{2,}', row) if part.strip()]
+    
+    # Semester and course code are sometimes pasted with single spaces between them
+    match = ROW_START.match(row)
+    if match and (len(parts) < 2 or parts[1] != match.group(2)):
+        rest = [part.strip() for part in re.split(r'\t+|\s{2,}', match.group(3)) if part.strip()]
+        parts = [match.group(1), match.group(2)] + rest
+    
+    # Anchor on the enrollment column ("12/105"); anything between code and it is the course name
+    capacity_index = next((i for i in range(2, len(parts)) if CAPACITY.match(parts[i])), None)
+    if capacity_index is None or len(parts) < capacity_index + 3:
+        return None
+    
+    return {
+        'semester': parts[0],
+        'course_code': ' '.join(parts[1].split()),
+        'course_name': ' '.join(parts[2:capacity_index]) or 'N/A',
+        'capacity': parts[capacity_index].replace(' ', ''),
+        'professor_name': parts[capacity_index + 1],
+        'campus': parts[capacity_index + 2]
+    }
+
+def parse_course_rows(course_data):
+    """Parse a whole pasted cart in one pass: (rows, indexes of lines that didn't parse, lines past MAX_ROWS)"""
+    rows, bad_lines = [], []
+    lines = [line for line in course_data.replace('\\n', '\n').splitlines() if line.strip()]
+    for i, line in enumerate(lines[:MAX_ROWS], 1):
+        row = parse_course_row(line)
+        if row:
+            rows.append(row)
+        else:
+            bad_lines.append(i)
+    return rows, bad_lines, max(len(lines) - MAX_ROWS, 0)
+
+async def get_school():
+    global sfu_school
+    if sfu_school is None:
+        sfu_school = await asyncio.to_thread(ratemyprofessor.get_school_by_name, "Simon Fraser University")
+    return sfu_school
+
+async def get_professor_ratings(school, professor_names):
+    """Ratings for every distinct professor, fetched concurrently under a limiter"""
+    limiter = asyncio.Semaphore(PROFESSOR_CONCURRENCY)
+    
+    async def fetch(name):
+        if name in professor_cache:
+            return name, professor_cache[name]
+        async with limiter:
+            try:
+                rating = await asyncio.to_thread(get_professor_rating, school, name)
+            except Exception as e:
+                # Shown as not found this time, looked up again next time
+                logger.error(f"Error getting professor rating for {name}: {str(e)}")
+                return name, dict(NOT_FOUND)
+        professor_cache[name] = rating
+        return name, rating
+    
+    unique_names = list(dict.fromkeys(professor_names))
+    return dict(await asyncio.gather(*[fetch(name) for name in unique_names]))
+
+def split_capacity(capacity):
+    try:
+        current, maximum = capacity.split('/')
+        if not current:
+            current = '0'
+    except ValueError:
+        current = '0'
+        maximum = '0'
+    return current, maximum
+
+def course_embed(row, prof_data, course_info):
+    """Detailed embed for a single pasted course"""
+    current, maximum = split_capacity(row['capacity'])
+    
+    # Format response as an embedded message
+    embed = discord.Embed(
+        title=f"{row['course_code']} - {row['course_name']}",
+        color=discord.Color.blue()
+    )
+    
+    embed.add_field(name="Semester", value=row['semester'], inline=True)
+    embed.add_field(name="Professor", value=row['professor_name'], inline=True)
+    embed.add_field(name="Campus", value=row['campus'], inline=True)
+    embed.add_field(name="Enrollment", value=f"{current}/{maximum}", inline=True)
+    
+    # Professor ratings
+    embed.add_field(name="Professor Rating", value=prof_data['rating'], inline=True)
+    embed.add_field(name="Professor Difficulty", value=prof_data['difficulty'], inline=True)
+    embed.add_field(name="Would Take Again", value=prof_data['would_take_again'], inline=True)
+    embed.add_field(name="Number of Ratings", value=prof_data['num_ratings'], inline=True)
+    
+    # Course statistics
+    embed.add_field(name="Median Grade", value=course_info['median_grade'], inline=True)
+    embed.add_field(name="Fail Percentage", value=course_info['fail_percentage'], inline=True)
+    embed.add_field(name="Course Difficulty", value=course_info['course_difficulty'], inline=True)
+    
+    return embed
+
+def summary_table(rows, ratings, course_infos):
+    """Compact fixed-width table, one line per pasted course"""
+    header = f"{'Course':<15}{'Professor':<20}{'Rating':>7}{'Diff':>6}{'Again':>7}{'Median':>7}{'Fail':>7}{'Seats':>9}"
+    lines = [header, '-' * len(header)]
+    for row, course_info in zip(rows, course_infos):
+        prof = ratings[row['professor_name']]
+        current, maximum = split_capacity(row['capacity'])
+        fail = course_info['fail_percentage']
+        if fail != 'N/A':
+            fail = f"{float(fail.rstrip('%')):.1f}%"
+        lines.append(
+            f"{row['course_code'][:14]:<15}{row['professor_name'][:19]:<20}{str(prof['rating'])[:6]:>7}"
+            f"{str(prof['difficulty'])[:5]:>6}{str(prof['would_take_again'])[:6]:>7}"
+            f"{course_info['median_grade']:>7}{fail:>7}{f'{current}/{maximum}':>9}"
+        )
+    return '\n'.join(lines)
+
 async def process_course_info(course_data):
-    """Process a single course entry and return formatted information"""
+    """Process one or many pasted course rows and return an embed (or an error string)"""
     try:
-        # Replace '\t' with actual tabs and handle multiple spaces
-        course_data = course_data.replace('\\t', '\t')
-        
-        # Split by either tabs or multiple spaces
-        parts = re.split(r'\t+|\s{2,}', course_data.strip())
-        
-        # Reconstruct the parts considering the course code might have spaces
-        processed_parts = []
-        i = 0
-        while i < len(parts):
-            if i == 1:  # Course code position
-                # Combine course code parts (e.g., "ACMA", "101", "D100")
-                code_parts = []
-                while i < len(parts) and not parts[i].lower().startswith('introduction'):
-                    code_parts.append(parts[i])
-                    i += 1
-                processed_parts.append(' '.join(code_parts))
-                if i < len(parts):
-                    processed_parts.append(parts[i])
-            else:
-                processed_parts.append(parts[i])
-            i += 1
-            
-        if len(processed_parts) < 6:
-            return "Error: Invalid course data format. Please provide: Semester, Course Code, Course Name, Capacity, Professor Name, Campus"
-            
-        semester = processed_parts[0]
-        course_code = processed_parts[1]
-        course_name = processed_parts[2]
-        capacity = processed_parts[3]
-        professor_name = processed_parts[4]
-        campus = processed_parts[5]
+        rows, bad_lines, ignored = parse_course_rows(course_data)
+        if not rows:
+            return FIELDS_ERROR
         
         # Get school
-        school = ratemyprofessor.get_school_by_name("Simon Fraser University")
+        school = await get_school()
         if not school:
             return "Error: Could not find Simon Fraser University"
-            
-        # Get professor rating
-        prof_data = get_professor_rating(school, professor_name)
         
-        # Get course information
-        course_info = get_course_digger_info(course_code)
+        # One lookup per distinct professor, all in flight together
+        ratings = await get_professor_ratings(school, [row['professor_name'] for row in rows])
+        course_infos = [get_course_digger_info(row['course_code']) for row in rows]
+        
+        if len(rows) == 1 and not bad_lines and not ignored:
+            return course_embed(rows[0], ratings[rows[0]['professor_name']], course_infos[0])
         
-        # Parse capacity
-        try:
-            current, maximum = capacity.split('/')
-            if not current:
-                current = '0'
-        except ValueError:
-            current = '0'
-            maximum = '0'
-            
-        # Format response as an embedded message
         embed = discord.Embed(
-            title=f"{course_code} - {course_name}",
+            title=f"{rows[0]['semester']} - {len(rows)} courses",
+            description=f"```\n{summary_table(rows, ratings, course_infos)}\n```",
             color=discord.Color.blue()
         )
-        
-        embed.add_field(name="Semester", value=semester, inline=True)
-        embed.add_field(name="Professor", value=professor_name, inline=True)
-        embed.add_field(name="Campus", value=campus, inline=True)
-        embed.add_field(name="Enrollment", value=f"{current}/{maximum}", inline=True)
-        
-        # Professor ratings
-        embed.add_field(name="Professor Rating", value=prof_data['rating'], inline=True)
-        embed.add_field(name="Professor Difficulty", value=prof_data['difficulty'], inline=True)
-        embed.add_field(name="Would Take Again", value=prof_data['would_take_again'], inline=True)
-        embed.add_field(name="Number of Ratings", value=prof_data['num_ratings'], inline=True)
-        
-        # Course statistics
-        embed.add_field(name="Median Grade", value=course_info['median_grade'], inline=True)
-        embed.add_field(name="Fail Percentage", value=course_info['fail_percentage'], inline=True)
-        embed.add_field(name="Course Difficulty", value=course_info['course_difficulty'], inline=True)
-        
+        notes = []
+        if bad_lines:
+            notes.append(f"Skipped line(s) {', '.join(map(str, bad_lines))}: could not read all six fields")
+        if ignored:
+            notes.append(f"Ignored {ignored} line(s) past the first {MAX_ROWS}; paste them in another message")
+        if notes:
+            embed.set_footer(text='\n'.join(notes))
         return embed
         
     except Exception as e:
@@ -201,6 +296,7 @@ Example:
 
 Note: Separate fields with either two or more spaces or use '\\t'
 Fields needed: Semester, Course Code, Course Name, Capacity, Professor Name, Campus
+Paste several rows (one per line, up to 25) to get a summary table of your whole cart
     """
     embed = discord.Embed(title="Help", description=help_text, color=discord.Color.blue())
     await ctx.send(embed=embed)
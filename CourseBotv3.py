@@ -1,168 +1,302 @@
+from StartupReport import StartupReport, ResponseTimes
+startup = StartupReport()
+
 import discord
 from discord.ext import commands
-import ratemyprofessor
 import asyncio
 import logging
-from queue import Queue
-import json
 import re
-from fuzzywuzzy import process
+import time
 from collections import defaultdict
 import os
-import aiohttp
-from typing import Optional, Dict, Any
-import concurrent.futures
-import subprocess
+import sys
 from functools import partial
-import google.generativeai as ga
+from CourseSummaries import load_summaries, description_hash
+from CatalogUtils import (normalize_course_code, parse_campuses, parse_course_codes, parse_meetings, format_meetings,
+                          lecture_sections)
+from TermStore import TermCatalogStore, available_terms, parse_term
+from CatalogHistory import CatalogHistory
+from LLMBackend import get_backend
+from SharedCache import SharedRatingCache
+from MessageScheduler import MessageScheduler, INTERACTIVE, BULK
+from RatingService import RatingService, FETCH_TIMEOUT, RATING_TTL
 
-GeminiAIKey = ""
-ModelName= "gemini-1.5-flash"
-ga.configure(api_key=GeminiAIKey)
-model=ga.GenerativeModel(ModelName)
+# CourseSearch, GradeStats and PrereqGraph (and NumPy with them) are imported by the
+# background catalog load; ratemyprofessor on the first rating lookup.
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='/', intents=intents)
+
+# Sharded deployments (see ShardLauncher.py) give each process a slice of the shards
+SHARD_COUNT = int(os.environ.get('SFU_SHARD_COUNT', '0'))
+SHARD_IDS = [int(i) for i in os.environ.get('SFU_SHARD_IDS', '').split(',') if i.strip()]
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix='/', intents=intents,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+else:
+    bot = commands.Bot(command_prefix='/', intents=intents)
 
 departments = defaultdict(list)
 course_descriptions = {}
+course_summaries = {}
+grade_stats = {}
+grade_table = None
+grade_store = None
+search_index = None
+prereq_graph = None
+find_index = None
+prof_index = None
+degree_planner = None
+catalog_version = None
+# Modification time of the term file the published catalog was read from
+catalog_mtime = None
+course_asker = None
+catalog_ready = asyncio.Event()
+# One catalog reload at a time
+reload_lock = asyncio.Lock()
+# Reload started because another shard process rewrote the term file
+catalog_refresh = None
 
 professor_cache = {}
-rate_limit_lock=asyncio.Semaphore(1)
+sfu_school = None
+SHARED_CACHE_PATH = os.environ.get('SFU_SHARED_CACHE')
+shared_ratings = SharedRatingCache(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else None
+# RateMyProfessor lookups in flight at once; HttpClient backs off on 429s
+RATING_CONCURRENCY = 8
+rate_limit_lock = asyncio.Semaphore(RATING_CONCURRENCY)
+school_lock = asyncio.Lock()
+MAX_COMPARE = 6
+# /find looks up at most this many unrated instructors before filtering on rating
+MAX_FIND_LOOKUPS = 25
+MAX_FIND_RESULTS = 20
 OWNER_ID = ""
-THREAD_COUNT=6
+# Set SFU_API_PORT to also serve the catalog as JSON from this process (see CatalogAPI.py)
+API_PORT = int(os.environ.get('SFU_API_PORT', '0'))
+term_store = TermCatalogStore()
+response_times = ResponseTimes()
+# /courses edits its reply at most this often while instructor ratings come in
+EDIT_INTERVAL = 1.0
+catalog_history = CatalogHistory()
+scheduler = MessageScheduler()
+
+
+# Commands that don't need the catalog and are answered while it loads
+WARM_COMMANDS = {'course_help', 'terms'}
+
+
+class WarmingUp(commands.CheckFailure):
+    pass
+
+
+def ratemyprofessor_client():
+    # Routes the package's requests through the shared HTTP client (pooling, cache, record/replay)
+    from HttpClient import install_ratemyprofessor
+    return install_ratemyprofessor()
+
+
+async def reply(ctx, content=None, *, embed=None, priority=INTERACTIVE):
+    """Send through the shared scheduler so every command respects the channel's rate limit"""
+    message = await scheduler.send(ctx, content, embed=embed, priority=priority)
+    if 'first_response' not in startup.marks:
+        startup.mark('first_response')
+        logger.info(f"Startup: {startup.summary()}")
+    return message
+
+
+async def warm_up():
+    """Load the catalog off the event loop so the gateway connects meanwhile"""
+    await reload_catalog()
+    startup.mark('catalog_loaded')
+    catalog_ready.set()
+    logger.info(f'Loaded {len(departments)} departments: {sorted(departments.keys())}')
+
+
+async def reload_catalog():
+    """Reload the current term after /update or /rollback, off the event loop like warm_up.
+
+    The rebuild takes about a second; run inline it would stall the gateway heartbeat
+    and every other command meanwhile. Commands keep the old catalog until the new one
+    and all its indexes are published together.
+    """
+    async with reload_lock:
+        snapshot = await asyncio.to_thread(build_catalog)
+        if snapshot is not None:
+            publish_catalog(snapshot)
+
+
+def start_warm_up():
+    return asyncio.ensure_future(warm_up())
+
+
+def refresh_if_changed():
+    """Reload in the background if the term file changed under us.
+
+    /update and /rollback reload only the shard process that ran them; the others
+    notice here, on their next command, and keep serving the old catalog meanwhile.
+    """
+    global catalog_refresh
+    if catalog_refresh is not None and not catalog_refresh.done():
+        return
+    if term_store.is_stale(term_store.current_term, catalog_mtime):
+        logger.info("Course data changed on disk, reloading")
+        catalog_refresh = asyncio.ensure_future(reload_catalog())
+
+
+@bot.check
+async def catalog_ready_check(ctx):
+    if catalog_ready.is_set():
+        refresh_if_changed()
+        return True
+    if ctx.command.name in WARM_COMMANDS:
+        return True
+    await reply(ctx, "Warming up: course data is still loading. Please try again in a few seconds.")
+    raise WarmingUp()
+
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, WarmingUp):
+        return
+    logger.error(f"Error in command {ctx.command}: {error}", exc_info=error)
+
+
+@bot.event
+async def setup_hook():
+    startup.mark('setup')
+    scheduler.install(bot)
+    start_warm_up()
+    if API_PORT:
+        from CatalogAPI import CatalogAPI
+        # Reads this module's globals, so it always serves what the bot serves
+        await CatalogAPI(sys.modules[__name__]).start(port=API_PORT)
 
 @bot.event
 async def on_ready():
+    startup.mark('gateway_ready')
     logger.info(f'{bot.user} has connected to Discord!')
-    load_course_data()
-    logger.info(f'Loaded {len(departments)} departments: {sorted(departments.keys())}')
 
 
-def process_course_batch(batch):
-    results = {}
-    for course in batch:
-        match = re.search(r'\[([A-Z]+)\s*(\d+)', course['course_name'])
-        if match:
-            dept, number = match.groups()
-            dept = dept.strip()
-            number = number.strip()
-            course_code = f"{dept} {number}"
-            results[course_code] = {
-                'name': course['course_name'].split('[')[0].strip(),
-                'description': course['description'],
-                'sections': course['sections']
-            }
-    return results
-
-
-def load_course_data():
+def build_catalog():
+    """The current term's catalog and everything derived from it, as {global name: value}.
+
+    Runs in a worker thread and touches no shared state, so commands on the event loop
+    keep reading the old catalog meanwhile. Returns None if the catalog can't be loaded.
+    """
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, 'sfu_courses2.json')
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            courses = json.load(f)
-        
-        batch_size = len(courses) // THREAD_COUNT + 1
-        batches = [courses[i:i + batch_size] for i in range(0, len(courses), batch_size)]
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
-            results = list(executor.map(process_course_batch, batches))
-        
-        # Combine results
-        departments.clear()
-        course_descriptions.clear()
-        
-        for result in results:
-            for course_code, info in result.items():
-                dept = course_code.split()[0]
-                departments[dept].append(course_code)
-                course_descriptions[course_code] = info
-        
-        logger.info(f"Loaded {len(departments)} departments")
-        logger.info(f"Loaded {len(course_descriptions)} courses")
-        
+        catalog = term_store.current(reload=True)
+        snapshot = {
+            'departments': defaultdict(list, catalog['departments']),
+            'course_descriptions': dict(catalog['course_descriptions']),
+            'catalog_version': catalog['version'],
+            'catalog_mtime': catalog['mtime']
+        }
+        logger.info(f"Loaded {len(snapshot['departments'])} departments")
+        logger.info(f"Loaded {len(snapshot['course_descriptions'])} courses")
+
+        snapshot.update(load_grade_table())
+        snapshot['course_summaries'] = load_course_summaries(snapshot['course_descriptions'])
+        snapshot['search_index'] = build_search_index(snapshot['course_descriptions'], snapshot['grade_stats'],
+                                                      snapshot['catalog_version'])
+        snapshot['prereq_graph'] = build_prereq_graph(snapshot['course_descriptions'])
+        snapshot['find_index'] = build_find_index(snapshot['course_descriptions'])
+        snapshot['prof_index'] = build_prof_index(snapshot['course_descriptions'])
+        return snapshot
+
     except Exception as e:
         logger.error(f"Error loading course data: {str(e)}")
+        return None
 
 
-def get_professor_rating(school, professor_name):
-    if not professor_name:
-        return {
-            'rating': 'N/A',
-            'difficulty': 'N/A',
-            'would_take_again': 'N/A',
-            'num_ratings': 'N/A'
-        }
-    
-    asyncio.sleep(1)
-    try:
-        prof = ratemyprofessor.get_professor_by_school_and_name(school, professor_name)
-        
-        if prof:
-            return {
-                'rating': prof.rating if prof.rating else 'N/A',
-                'difficulty': prof.difficulty if prof.difficulty else 'N/A',
-                'would_take_again': f"{round(prof.would_take_again, 1)}%" if prof.would_take_again is not None else 'N/A',
-                'num_ratings': prof.num_ratings
-            }
-    except Exception as e:
-        logger.error(f"Error getting professor rating for {professor_name}: {str(e)}")
-    
-    return {
-        'rating': 'Not Found',
-        'difficulty': 'Not Found',
-        'would_take_again': 'Not Found',
-        'num_ratings': 'Not Found'
-    }
+def publish_catalog(snapshot):
+    """Swap a build_catalog() result in. Runs on the event loop with no await inside, so no
+    command ever sees a catalog from one load next to an index from another."""
+    global course_asker
+    if course_asker is None:
+        from CourseSearch import CourseAsker
+        course_asker = CourseAsker(get_backend())
+    # Ratings that came in while the index was built
+    from FindIndex import parse_rating
+    for name, rating in professor_cache.items():
+        snapshot['find_index'].set_rating(name, parse_rating(rating))
+    globals().update(snapshot)
+
+
+def load_course_summaries(course_descriptions):
+    """Precomputed summaries (see CourseSummaries.py) matched to courses by description hash"""
+    summaries = load_summaries()
+    course_summaries = {}
+    for course_code, info in course_descriptions.items():
+        summary = summaries.get(description_hash(info['description']))
+        if summary:
+            course_summaries[course_code] = summary
+    logger.info(f"Loaded summaries for {len(course_summaries)} courses")
+    return course_summaries
+
+
+def load_grade_table():
+    from GradeStats import GradeTable
+    from GradeIngest import GradeStore
+    grade_store = GradeStore.load()
+    grade_table = GradeTable.load(store=grade_store)
+    return {'grade_store': grade_store, 'grade_table': grade_table, 'grade_stats': grade_table.as_dict()}
+
+
+def build_search_index(course_descriptions, grade_stats, catalog_version):
+    from CourseSearch import SearchIndex
+    search_index = SearchIndex(course_descriptions, grade_stats)
+    logger.info(f"Indexed {len(search_index.codes)} courses for /ask (catalog {catalog_version})")
+    return search_index
+
+
+def build_prereq_graph(course_descriptions):
+    from PrereqGraph import PrereqGraph
+    prereq_graph = PrereqGraph.build(course_descriptions)
+    logger.info(f"Built prerequisite graph over {len(prereq_graph.codes)} courses")
+    return prereq_graph
+
+
+def build_find_index(course_descriptions):
+    from FindIndex import FindIndex
+    index = FindIndex(course_descriptions)
+    logger.info(f"Built /find bitmaps over {len(index.rows)} sections")
+    return index
+
+
+def build_prof_index(course_descriptions):
+    from ProfIndex import ProfIndex
+    prof_index = ProfIndex(course_descriptions)
+    logger.info(f"Indexed {len(prof_index.names)} instructors for /prof")
+    return prof_index
+
+
+def add_summary_fields(embed, course_code):
+    summary = course_summaries.get(course_code)
+    if summary:
+        embed.add_field(name="Summary", value=summary['summary'] or "N/A", inline=False)
+        embed.add_field(name="Workload", value=summary['workload'] or "N/A", inline=False)
+
 
 def get_course_digger_info(course_code):
-    """Get course information from local data.txt file"""
+    """Get course information from the grade statistics loaded from data.txt"""
     logger.info(f"Fetching course data for {course_code}")
     
-    default_response = {
-        'median_grade': 'N/A',
-        'fail_percentage': 'N/A',
-        'course_difficulty': 'N/A'
-    }
-    
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, 'data.txt')
-        
-        with open(file_path, 'r') as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-        
-        base_course_code = ' '.join(course_code.split()[:2])
-        
-        for line in lines:
-            parts = line.split()
-            if len(parts) >= 4:
-                file_course = f"{parts[0]} {parts[1]}"
-                if file_course == base_course_code:
-                    return {
-                        'median_grade': parts[2],
-                        'fail_percentage': f"{float(parts[3]):.1f}%",
-                        'course_difficulty': parts[4] if len(parts) > 4 else 'N/A'
-                    }
-        
-        return default_response
-                
-    except Exception as e:
-        logger.error(f"Error reading course data for {course_code}: {str(e)}")
-        return default_response
+    if grade_table is None:
+        return {
+            'median_grade': 'N/A',
+            'fail_percentage': 'N/A',
+            'course_difficulty': 'N/A'
+        }
+    return grade_table.lookup(course_code)
 
 async def display_departments(ctx):
     """Display all available departments in a formatted message"""
     dept_list = sorted(departments.keys())
     
     if not dept_list:
-        await ctx.send("Error: No departments loaded. Please check the course data.")
+        await reply(ctx, "Error: No departments loaded. Please check the course data.")
         return
         
     chunks = [dept_list[i:i + 10] for i in range(0, len(dept_list), 10)]
@@ -180,13 +314,13 @@ async def display_departments(ctx):
             inline=True
         )
     
-    await ctx.send(embed=embed)
+    await reply(ctx, embed=embed)
 
 async def display_courses(ctx, dept):
     """Display all courses for a given department"""
     dept = dept.upper().strip()
     if dept not in departments:
-        await ctx.send(f"Department '{dept}' not found. Please try again with a valid department code.")
+        await reply(ctx, f"Department '{dept}' not found. Please try again with a valid department code.")
         return None
 
     courses = sorted(departments[dept])
@@ -204,7 +338,7 @@ async def display_courses(ctx, dept):
             inline=True
         )
     
-    await ctx.send(embed=embed)
+    await reply(ctx, embed=embed)
     return dept
 
 def check_author(ctx):
@@ -213,7 +347,48 @@ def check_author(ctx):
         return message.author == ctx.author and message.channel == ctx.channel
     return inner
 
+async def fetch_professor_rating(professor_name: str) -> dict:
+    """Look a professor up on RateMyProfessor. Upstream errors propagate so they are never cached."""
+    global sfu_school
+    async with rate_limit_lock:
+        # The RateMyProfessor client is blocking (and slow to import); keep it off the event loop
+        ratemyprofessor = await asyncio.to_thread(ratemyprofessor_client)
+        async with school_lock:
+            if sfu_school is None:
+                sfu_school = await asyncio.to_thread(ratemyprofessor.get_school_by_name, "Simon Fraser University")
+        # Bounded here rather than around the whole lookup, so time queued for the limiter doesn't count
+        professor = await asyncio.wait_for(asyncio.to_thread(
+            ratemyprofessor.get_professor_by_school_and_name, sfu_school, professor_name
+        ), FETCH_TIMEOUT)
+    
+    if professor:
+        return {
+            'rating': f"{professor.rating:.1f}/5.0" if professor.rating else 'N/A',
+            'difficulty': f"{professor.difficulty:.1f}/5.0" if professor.difficulty else 'N/A',
+            'would_take_again': f"{professor.would_take_again}%" if professor.would_take_again is not None else 'N/A',
+            'num_ratings': professor.num_ratings if professor.num_ratings else 0
+        }
+    
+    # Professor not found
+    return {
+        'rating': 'Not Found',
+        'difficulty': 'Not Found',
+        'would_take_again': 'Not Found',
+        'num_ratings': 0
+    }
+
+async def load_professor_rating(professor_name: str) -> dict:
+    if shared_ratings is not None:
+        # Fetched at most once across all shard processes
+        return await shared_ratings.get_or_fetch(
+            professor_name, partial(fetch_professor_rating, professor_name), max_age=RATING_TTL
+        )
+    return await fetch_professor_rating(professor_name)
+
+rating_service = RatingService(load_professor_rating, professor_cache, timeout=None)
+
 async def get_professor_rating(professor_name: str) -> dict:
+    """Cached rating, refreshed in the background once stale; 'Unavailable' while RateMyProfessor is down"""
     if not professor_name or professor_name.lower() in ['tba', 'staff']:
         return {
             'rating': 'N/A',
@@ -221,47 +396,8 @@ async def get_professor_rating(professor_name: str) -> dict:
             'would_take_again': 'N/A',
             'num_ratings': 'N/A'
         }
+    return await rating_service.get(professor_name)
 
-    if professor_name in professor_cache:
-        return professor_cache[professor_name]
-
-    async with rate_limit_lock:
-        try:
-            await asyncio.sleep(1)
-            
-            # Get professor rating
-            school = ratemyprofessor.get_school_by_name("Simon Fraser University")
-            professor = ratemyprofessor.get_professor_by_school_and_name(school, professor_name)
-            
-            if professor:
-                rating = {
-                    'rating': f"{professor.rating:.1f}/5.0" if professor.rating else 'N/A',
-                    'difficulty': f"{professor.difficulty:.1f}/5.0" if professor.difficulty else 'N/A',
-                    'would_take_again': f"{professor.would_take_again}%" if professor.would_take_again is not None else 'N/A',
-                    'num_ratings': professor.num_ratings if professor.num_ratings else 0
-                }
-                professor_cache[professor_name] = rating
-                return rating
-            
-            # Professor not found
-            not_found = {
-                'rating': 'Not Found',
-                'difficulty': 'Not Found',
-                'would_take_again': 'Not Found',
-                'num_ratings': 0
-            }
-            professor_cache[professor_name] = not_found
-            return not_found
-
-        except Exception as e:
-            logger.error(f"Error getting professor rating for {professor_name}: {e}")
-            error_rating = {
-                'rating': 'Error',
-                'difficulty': 'Error',
-                'would_take_again': 'Error',
-                'num_ratings': 'Error'
-            }
-            return error_rating
 
 @bot.command(name='dispdept')
 async def display_department(ctx):
@@ -275,7 +411,7 @@ async def display_department(ctx):
         dept = dept_msg.content.upper().strip()
         
         if dept not in departments:
-            await ctx.send(f"Department '{dept}' not found. Please try again with a valid department code.")
+            await reply(ctx, f"Department '{dept}' not found. Please try again with a valid department code.")
             return
         
         courses = sorted(departments[dept])
@@ -294,6 +430,7 @@ async def display_department(ctx):
                 
                 embed.add_field(name="Median Grade", value=stats['median_grade'], inline=True)
                 embed.add_field(name="Fail Percentage", value=stats['fail_percentage'], inline=True)
+                add_summary_fields(embed, course_code)
                 
                 if course_info['sections']:
                     for section in course_info['sections']:
@@ -314,8 +451,9 @@ async def display_department(ctx):
                 return embed
             return None
         
-        # Process courses in batches to avoid rate limits
+        # Build in batches; the scheduler paces sends and packs up to 10 embeds per message
         batch_size = 5
+        pending = []
         for i in range(0, len(courses), batch_size):
             batch = courses[i:i + batch_size]
             tasks = [process_course(course) for course in batch]
@@ -323,32 +461,39 @@ async def display_department(ctx):
             
             for embed in embeds:
                 if embed:
-                    await ctx.send(embed=embed)
-                    await asyncio.sleep(1)
+                    pending.append(scheduler.submit(ctx, embed=embed, priority=BULK))
+        await asyncio.gather(*pending)
         
     except asyncio.TimeoutError:
-        await ctx.send("Selection timed out. Please try again with !dispdept")
+        await reply(ctx, "Selection timed out. Please try again with !dispdept")
     except Exception as e:
         logger.error(f"Error in display_department: {str(e)}")
-        await ctx.send("An error occurred while processing your request.")
+        await reply(ctx, "An error occurred while processing your request.")
 
 @bot.command(name='update')
-async def update_courses(ctx):
+async def update_courses(ctx, *, term: str = None):
     if ((ctx.message.author.id != "placeholder") and (ctx.message.type=="APPLICATION_COMMAND") and (ctx.message.interaction.commandName=="update")):
-        await ctx.send("Sorry, only the bot owner can use this command.")
+        await reply(ctx, "Sorry, only the bot owner can use this command.")
         return
     
+    key = parse_term(term) if term else term_store.current_term
+    if not key:
+        await reply(ctx, f"Unrecognized term '{term}'. Use e.g. `/update Fall 2025`.")
+        return
+
     try:
-        await ctx.send("Starting course data update...")
+        await reply(ctx, f"Starting course data update for {key}...")
         
         script_dir = os.path.dirname(os.path.abspath(__file__))
         script_path = os.path.join(script_dir, 'CoursetoJSON.py')
         python_executable = sys.executable
 
-        
+        year, season = key.split('-', 1)
         process = await asyncio.create_subprocess_exec(
             python_executable,
             script_path,
+            year,
+            season,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
@@ -356,15 +501,318 @@ async def update_courses(ctx):
         stdout, stderr = await process.communicate()
         
         if process.returncode == 0:
-            load_course_data()
-            await ctx.send("Course data updated successfully!")
+            if key == term_store.current_term:
+                await reload_catalog()
+            else:
+                term_store.discard(key)
+            await reply(ctx, "Course data updated successfully!")
         else:
             error_msg = stderr.decode() if stderr else "Unknown error"
-            await ctx.send(f"Error updating course data: {error_msg}")
+            await reply(ctx, f"Error updating course data: {error_msg}")
             
     except Exception as e:
         logger.error(f"Error in update_courses: {str(e)}")
-        await ctx.send(f"An error occurred while updating course data: {str(e)}")
+        await reply(ctx, f"An error occurred while updating course data: {str(e)}")
+
+def rating_text(rating):
+    if rating['rating'] in ('N/A', 'Not Found', 'Unavailable'):
+        return rating['rating']
+    return f"★ {rating['rating']}, difficulty {rating['difficulty']}, {rating['would_take_again']} again"
+
+
+@bot.command(name='compare')
+async def compare(ctx, *, courses: str):
+    """Grade stats, credits, schedules and instructor ratings for several courses side by side"""
+    codes = parse_course_codes(courses)[:MAX_COMPARE]
+    found = [code for code in codes if code in course_descriptions]
+    missing = [code for code in codes if code not in course_descriptions]
+    if not found:
+        await reply(ctx, "Please give at least one known course, e.g. `/compare CMPT 225 CMPT 276 MACM 201`.")
+        return
+
+    # Each instructor is looked up once across all courses, all lookups at the same time
+    instructors = list(dict.fromkeys(
+        section['instructor'] for code in found
+        for section in lecture_sections(course_descriptions[code]['sections'])
+    ))
+    async with ctx.typing():
+        ratings = dict(zip(instructors, await asyncio.gather(*[get_professor_rating(name) for name in instructors])))
+
+    embed = discord.Embed(title=f"Comparing {' vs '.join(found)}", color=discord.Color.blue())
+    glance = []
+    for code in found:
+        info = course_descriptions[code]
+        stats = get_course_digger_info(code)
+        credits = info.get('credits')
+        lines = [
+            f"**{info['name']}**",
+            f"Credits: {credits:g}" if credits else "Credits: N/A",
+            f"Median: {stats['median_grade']} · Fail: {stats['fail_percentage']}",
+            f"Difficulty: {stats['course_difficulty']}/5"
+        ]
+        sections = lecture_sections(info['sections'])
+        for section in sections[:4]:
+            schedule = format_meetings(parse_meetings(section['day/time'])) or "TBA"
+            campus = ', '.join(parse_campuses(section['location'])) or section['location'] or "TBA"
+            lines.append(f"\n`{section['section']}` {schedule} · {campus}\n"
+                         f"{section['instructor'] or 'TBA'}: {rating_text(ratings[section['instructor']])}")
+        if len(sections) > 4:
+            lines.append(f"… and {len(sections) - 4} more sections")
+        if not sections:
+            lines.append("\nNot offered this term")
+        embed.add_field(name=code, value='\n'.join(lines)[:1024], inline=True)
+
+        rated = [ratings[s['instructor']]['rating'] for s in sections]
+        best = max((float(str(r).split('/')[0]) for r in rated if str(r)[:1].isdigit()), default=None)
+        glance.append(f"`{code:<9}` {stats['median_grade']:<4} fail {stats['fail_percentage']:<6} "
+                      f"best instructor {f'{best:.1f}' if best is not None else 'N/A'}")
+
+    embed.add_field(name="At a glance", value='\n'.join(glance)[:1024], inline=False)
+    if missing:
+        embed.set_footer(text=f"Not found: {', '.join(missing)}")
+    await reply(ctx, embed=embed)
+
+
+@bot.command(name='find')
+async def find(ctx, *, query: str = ''):
+    """Courses by campus, days, time, credits, level, department and instructor rating"""
+    from FindIndex import describe_filters, parse_find_query, parse_rating
+    filters = parse_find_query(query, departments)
+    if not filters:
+        await reply(ctx, "Please give some filters, e.g. `/find Burnaby Tue/Thu after 2pm 3 credits 200-level rated >= 4`.")
+        return
+
+    # The index and catalog of one load, even if a reload lands during the rating lookups
+    index, courses = find_index, course_descriptions
+    skipped = 0
+    if 'min_rating' in filters:
+        for name, rating in list(professor_cache.items()):
+            index.set_rating(name, parse_rating(rating))
+        unrated = index.unrated_instructors(index.query(filters, rated=False))
+        skipped = max(len(unrated) - MAX_FIND_LOOKUPS, 0)
+        if unrated:
+            unrated = unrated[:MAX_FIND_LOOKUPS]
+            async with ctx.typing():
+                await asyncio.gather(*[get_professor_rating(name) for name in unrated])
+            # Lookups that failed stay unrated so a later /find tries them again
+            for name in unrated:
+                if name in professor_cache:
+                    index.set_rating(name, parse_rating(professor_cache[name]))
+
+    start = time.perf_counter()
+    found = index.matches(index.query(filters))
+    elapsed = time.perf_counter() - start
+
+    lines = []
+    for code, sections in list(found.items())[:MAX_FIND_RESULTS]:
+        line = f"`{code:<9}` {courses[code]['name']}"
+        if sections:
+            section = sections[0]
+            schedule = format_meetings(parse_meetings(section['day/time'])) or "TBA"
+            campus = ', '.join(parse_campuses(section['location'])) or "TBA"
+            rating = index.ratings.get(section['instructor'])
+            line += (f"\n  {section['section']} {schedule} · {campus} · {section['instructor'] or 'TBA'}"
+                     f"{f' (★ {rating:.1f})' if rating is not None else ''}")
+            if len(sections) > 1:
+                line += f" · +{len(sections) - 1} more"
+        lines.append(line)
+
+    embed = discord.Embed(
+        title=f"Find: {describe_filters(filters)}"[:256],
+        description='\n'.join(lines)[:4096] or "No courses match those filters.",
+        color=discord.Color.blue()
+    )
+    footer = (f"{len(found)} courses, {sum(map(len, found.values()))} sections · "
+              f"filtered in {elapsed * 1000:.2f} ms")
+    if len(found) > MAX_FIND_RESULTS:
+        footer += f" · showing the first {MAX_FIND_RESULTS}"
+    if skipped:
+        footer += f" · {skipped} instructors not yet rated were left out"
+    embed.set_footer(text=footer)
+    await reply(ctx, embed=embed)
+
+
+def outline_embed(course_code, section, outline):
+    from OutlineStore import plain_text
+    info = outline.get('info', {})
+    embed = discord.Embed(title=f"{course_code} {section}: {info.get('title', '')}".strip(': '),
+                          description=plain_text(info.get('courseDetails'))[:1000] or None,
+                          color=discord.Color.blue())
+    details = [f"{label}: {info[key]}" for key, label in (('units', 'Units'), ('deliveryMethod', 'Delivery'),
+                                                         ('designation', 'Designation')) if info.get(key)]
+    if details:
+        embed.add_field(name="Course", value="\n".join(details), inline=False)
+    instructors = [f"{person.get('name', '')} {person.get('email', '')}".strip() for person in outline.get('instructor', [])]
+    if instructors:
+        embed.add_field(name="Instructor", value="\n".join(instructors)[:1024], inline=False)
+    for key, label in (('courseSchedule', 'Schedule'), ('examSchedule', 'Exam')):
+        meetings = [f"{m.get('days', '')} {m.get('startTime', '')}–{m.get('endTime', '')}, "
+                    f"{m.get('campus', '')} {m.get('buildingCode', '')} {m.get('roomNumber', '')}".strip()
+                    for m in outline.get(key, [])]
+        if meetings:
+            embed.add_field(name=label, value="\n".join(meetings)[:1024], inline=False)
+    grading = [f"{part.get('description', '')}: {part.get('weight', '')}%" for part in outline.get('grades', [])]
+    notes = plain_text(info.get('gradingNotes'))
+    if grading or notes:
+        embed.add_field(name="Grading", value="\n".join(grading + ([notes] if notes else []))[:1024], inline=False)
+    texts = [plain_text(text.get('details')) for text in outline.get('requiredText', [])]
+    if texts:
+        embed.add_field(name="Required texts", value="\n".join(texts)[:1024], inline=False)
+    return embed
+
+
+@bot.command(name='outline')
+async def outline(ctx, *, query: str):
+    """Show a section's outline: /outline CMPT 225 D100 [Spring 2025]"""
+    from OutlineStore import open_store
+    course_code = normalize_course_code(query)
+    if not course_code:
+        await reply(ctx, "Please give a course code, e.g. `/outline CMPT 225 D100`.")
+        return
+    match = re.search(r'(spring|summer|fall)\s*(20\d{2})|(20\d{2})[\s-]*(spring|summer|fall)', query, re.IGNORECASE)
+    key = parse_term(match.group(0)) if match else term_store.current_term
+    store = open_store(key)
+    if store is None:
+        await reply(ctx, f"No course outlines have been scraped for {key}.")
+        return
+
+    dept, number = course_code.split()
+    section_match = re.search(r'\b([A-Z]{1,2}\d{2,3})\b', query.upper())
+    sections = store.sections(dept, number)
+    section = section_match.group(1) if section_match else (sections[0] if len(sections) == 1 else None)
+    if section is None:
+        await reply(ctx, f"Sections of {course_code} with outlines: {', '.join(sections)}. "
+                         f"Pick one, e.g. `/outline {course_code} {sections[0]}`." if sections
+                    else f"No outlines found for {course_code} in {key}.")
+        return
+    # One binary search over the mapped index and one record decoded; nothing else is read
+    found = store.get(dept, number, section)
+    if found is None:
+        await reply(ctx, f"No outline for {course_code} {section} in {key}. "
+                         f"Sections with outlines: {', '.join(sections) or 'none'}.")
+        return
+    await reply(ctx, embed=outline_embed(course_code, section, found))
+
+
+@bot.command(name='history')
+async def history(ctx, *, term: str = None):
+    """List recorded catalog versions for a term"""
+    key = parse_term(term) if term else term_store.current_term
+    if not key:
+        await reply(ctx, f"Unrecognized term '{term}'. Use e.g. `/history Fall 2025`.")
+        return
+    rows = await asyncio.to_thread(catalog_history.log, key)
+    lines = [
+        f"{'▶ ' if is_head else ''}`{vid}` <t:{created_at}:d> {count} courses, {changed} changed"
+        for vid, created_at, count, changed, is_head in rows[:15]
+    ]
+    await reply(ctx, embed=discord.Embed(
+        title=f"Catalog versions for {key}",
+        description="\n".join(lines) or "No versions recorded yet.",
+        color=discord.Color.blue()
+    ))
+
+@bot.command(name='rollback')
+async def rollback(ctx, version: str = 'HEAD~1', *, term: str = None):
+    if ((ctx.message.author.id != "placeholder") and (ctx.message.type=="APPLICATION_COMMAND") and (ctx.message.interaction.commandName=="rollback")):
+        await reply(ctx, "Sorry, only the bot owner can use this command.")
+        return
+
+    key = parse_term(term) if term else term_store.current_term
+    if not key:
+        await reply(ctx, f"Unrecognized term '{term}'. Use e.g. `/rollback 352d4a14 Fall 2025`.")
+        return
+
+    try:
+        previous = catalog_history.head(key)
+        version_id = await asyncio.to_thread(catalog_history.rollback, key, version)
+        changes = await asyncio.to_thread(catalog_history.diff, key, previous, version_id) if previous else None
+        if key == term_store.current_term:
+            await reload_catalog()
+        else:
+            term_store.discard(key)
+        summary = (f" ({len(changes['added'])} added, {len(changes['removed'])} removed, "
+                   f"{len(changes['modified'])} modified)") if changes else ""
+        await reply(ctx, f"{key} now serves catalog version `{version_id}`{summary}.")
+    except KeyError as e:
+        await reply(ctx, f"Could not roll back: {e.args[0]}")
+    except Exception as e:
+        logger.error(f"Error in rollback: {str(e)}")
+        await reply(ctx, f"An error occurred while rolling back: {str(e)}")
+
+def section_text(section, prof_rating=None):
+    text = (
+        f"**Section {section['section']}**\n"
+        f"Instructor: {section['instructor']}\n"
+        f"Time: {section['day/time']}\n"
+        f"Location: {section['location']}\n"
+    )
+    if prof_rating is None:
+        return text + "\nProfessor Ratings: loading…\n"
+    return text + (
+        f"\nProfessor Ratings:\n"
+        f"• Rating: {prof_rating['rating']}\n"
+        f"• Difficulty: {prof_rating['difficulty']}\n"
+        f"• Would Take Again: {prof_rating['would_take_again']}\n"
+        f"• Number of Ratings: {prof_rating['num_ratings']}\n"
+    )
+
+
+async def send_course_info(ctx, course_code):
+    """Reply at once with the catalog's details, then edit instructor ratings in as they resolve.
+
+    Edits go out at most every EDIT_INTERVAL and through the scheduler, which drops
+    intermediate states while the channel's edit budget is spent.
+    """
+    start = time.perf_counter()
+    course_info = course_descriptions[course_code]
+    stats = get_course_digger_info(course_code)
+    sections = course_info['sections']
+
+    embed = discord.Embed(
+        title=f"{course_code} - {course_info['name']}",
+        description=course_info['description'] or "No description available",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="Median Grade", value=stats['median_grade'], inline=True)
+    embed.add_field(name="Fail Percentage", value=stats['fail_percentage'], inline=True)
+    add_summary_fields(embed, course_code)
+    first_section_field = len(embed.fields)
+
+    lookups = {}
+    for section in sections:
+        if section['instructor'] not in lookups:
+            lookups[section['instructor']] = asyncio.ensure_future(get_professor_rating(section['instructor']))
+    # Cached ratings finish on their first step, so they make it into the first reply
+    if lookups:
+        await asyncio.wait(lookups.values(), timeout=0)
+
+    def fill_sections():
+        for offset, section in enumerate(sections):
+            lookup = lookups[section['instructor']]
+            embed.set_field_at(first_section_field + offset, name="Section Information",
+                               value=section_text(section, lookup.result() if lookup.done() else None), inline=False)
+
+    for section in sections:
+        embed.add_field(name="Section Information", value=section_text(section), inline=False)
+    fill_sections()
+    message = await reply(ctx, embed=embed)
+    first_byte = time.perf_counter() - start
+
+    pending = {lookup for lookup in lookups.values() if not lookup.done()}
+    edits = []
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=EDIT_INTERVAL)
+        fill_sections()
+        edits.append(scheduler.submit_edit(message, embed=embed.copy()))
+    for result in await asyncio.gather(*edits, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not update /courses reply for {course_code}: {result!r}")
+            break
+    complete = time.perf_counter() - start
+    response_times.record('courses', first_byte, complete)
+    logger.debug(f"/courses {course_code}: first reply {first_byte * 1000:.0f} ms, complete {complete * 1000:.0f} ms")
+
 
 @bot.command(name='courses')
 async def courses(ctx):
@@ -387,46 +835,317 @@ async def courses(ctx):
             course_code = course_msg.content.upper()
             
             if course_code in course_descriptions:
-                course_info = course_descriptions[course_code]
-                stats = get_course_digger_info(course_code)
-                
-                embed = discord.Embed(
-                    title=f"{course_code} - {course_info['name']}",
-                    description=course_info['description'] or "No description available",
-                    color=discord.Color.blue()
-                )
-                
-                embed.add_field(name="Median Grade", value=stats['median_grade'], inline=True)
-                embed.add_field(name="Fail Percentage", value=stats['fail_percentage'], inline=True)
-                
-                if course_info['sections']:
-                    for section in course_info['sections']:
-                        # Get professor rating using the simplified function
-                        prof_rating = await get_professor_rating(section['instructor'])
-                        
-                        section_text = (
-                            f"**Section {section['section']}**\n"
-                            f"Instructor: {section['instructor']}\n"
-                            f"Time: {section['day/time']}\n"
-                            f"Location: {section['location']}\n"
-                            f"\nProfessor Ratings:\n"
-                            f"• Rating: {prof_rating['rating']}\n"
-                            f"• Difficulty: {prof_rating['difficulty']}\n"
-                            f"• Would Take Again: {prof_rating['would_take_again']}\n"
-                            f"• Number of Ratings: {prof_rating['num_ratings']}\n"
-                        )
-                        embed.add_field(name=f"Section Information", value=section_text, inline=False)
-                
-                await ctx.send(embed=embed)
+                await send_course_info(ctx, course_code)
             else:
-                await ctx.send(f"Course '{course_code}' not found. Please try again.")
+                await reply(ctx, f"Course '{course_code}' not found. Please try again.")
                 
         except asyncio.TimeoutError:
-            await ctx.send("Selection timed out. Please try again with !courses")
+            await reply(ctx, "Selection timed out. Please try again with !courses")
             
     except Exception as e:
         logger.error(f"Error in courses command: {str(e)}")
-        await ctx.send(f"An error occurred while processing your request. Please try again later.")
+        await reply(ctx, f"An error occurred while processing your request. Please try again later.")
+
+
+@bot.command(name='ask')
+async def ask(ctx, *, question: str):
+    """Answer a natural-language question from the catalog"""
+    if search_index is None:
+        await reply(ctx, "Course data is still loading. Please try again shortly.")
+        return
+    try:
+        async with ctx.typing():
+            answer, codes, source = await course_asker.ask(
+                question, search_index, course_descriptions, grade_stats, catalog_version
+            )
+        embed = discord.Embed(title=question[:256], description=answer[:4096], color=discord.Color.blue())
+        if codes:
+            embed.add_field(name="Sources", value=", ".join(codes), inline=False)
+        if source == 'retrieval':
+            embed.set_footer(text="AI answer unavailable, showing catalog matches")
+        await reply(ctx, embed=embed)
+    except Exception as e:
+        logger.error(f"Error in ask command: {str(e)}")
+        await reply(ctx, "An error occurred while processing your request. Please try again later.")
+
+
+def course_list_text(codes, limit=60):
+    text = ", ".join(codes[:limit]) or "None"
+    if len(codes) > limit:
+        text += f" … and {len(codes) - limit} more"
+    return text[:1024]
+
+
+@bot.command(name='prereqs')
+async def prereqs(ctx, *, course: str):
+    """Show what a course requires, directly and transitively"""
+    course_code = normalize_course_code(course)
+    if prereq_graph is None or course_code not in prereq_graph.ids:
+        await reply(ctx, f"Course '{course}' not found. Please try again.")
+        return
+
+    from PrereqGraph import format_requirement
+    direct, transitive = prereq_graph.prerequisites(course_code)
+    embed = discord.Embed(title=f"Prerequisites for {course_code}", color=discord.Color.blue())
+    embed.add_field(name="Requirement",
+                    value=format_requirement(prereq_graph.prereq_expr.get(course_code))[:1024], inline=False)
+    if course_code in prereq_graph.coreq_expr:
+        embed.add_field(name="Corequisite",
+                        value=format_requirement(prereq_graph.coreq_expr[course_code])[:1024], inline=False)
+    # The union over every OR branch, not a list of courses all of which must be taken
+    embed.add_field(name=f"Anywhere in its prerequisite tree, alternatives included ({len(transitive)})",
+                    value=course_list_text(transitive), inline=False)
+    await reply(ctx, embed=embed)
+
+
+@bot.command(name='unlocks')
+async def unlocks(ctx, *, course: str):
+    """Show which courses list a course as a prerequisite, directly and transitively"""
+    course_code = normalize_course_code(course)
+    if prereq_graph is None or course_code not in prereq_graph.ids:
+        await reply(ctx, f"Course '{course}' not found. Please try again.")
+        return
+
+    direct, transitive = prereq_graph.unlocked_by(course_code)
+    embed = discord.Embed(title=f"Courses unlocked by {course_code}", color=discord.Color.blue())
+    embed.add_field(name=f"Directly ({len(direct)})", value=course_list_text(sorted(direct)), inline=False)
+    embed.add_field(name=f"Eventually ({len(transitive)})", value=course_list_text(transitive), inline=False)
+    await reply(ctx, embed=embed)
+
+
+def current_degree_planner():
+    """The DegreePlanner for the loaded catalog, built on first use after each load"""
+    global degree_planner
+    from DegreePlanner import DegreePlanner
+    if degree_planner is None or degree_planner.graph is not prereq_graph:
+        degree_planner = DegreePlanner(course_descriptions, prereq_graph)
+    return degree_planner
+
+
+@bot.command(name='plan')
+async def plan(ctx, program: str = None, *, courses: str = ''):
+    """Check a course plan against a program: /plan cmpt-major completed: CMPT 120; Fall 2025: CMPT 125 MATH 151"""
+    from DegreePlanner import available_programs, load_program, parse_plan, DEFAULT_UNITS
+    programs = available_programs()
+    if program is None or program not in programs:
+        await reply(ctx, embed=discord.Embed(
+            title="Degree Programs",
+            description=("Usage: `/plan <program> completed: <courses>; <term>: <courses>; ...`\n"
+                         "Terms are checked in the order given.\n\n" + "\n".join(f"`{name}`" for name in programs)),
+            color=discord.Color.blue()
+        ))
+        return
+    if prereq_graph is None:
+        await reply(ctx, "The prerequisite graph isn't built yet. Please try again shortly.")
+        return
+
+    requirements = load_program(program)
+    course_plan = parse_plan(courses.replace(';', '\n'))
+    planner = current_degree_planner()
+    validation = planner.validate(requirements, course_plan)
+    suggestions = planner.suggest(requirements, validation)
+
+    embed = discord.Embed(
+        title=f"{validation['program']}: {'complete' if validation['met'] else 'in progress'} "
+              f"({validation['units']:g} units)",
+        color=discord.Color.green() if validation['met'] else discord.Color.orange()
+    )
+    lines = []
+    for result in validation['requirements']:
+        if result['met']:
+            lines.append(f"✅ {result['label']}")
+        else:
+            unit = '' if result['kind'] == 'choose' else ' units'
+            lines.append(f"❌ {result['label']} (need {result['missing']:g} more{unit})")
+    embed.add_field(name="Requirements", value="\n".join(lines)[:1024] or "None", inline=False)
+    if validation['order_issues']:
+        embed.add_field(name="Prerequisites not met in time", value="\n".join(
+            f"{issue['term']}: {issue['course']} needs {issue['requires']}"
+            for issue in validation['order_issues'])[:1024], inline=False)
+    if validation['not_offered']:
+        embed.add_field(name=f"Not in this term's catalog (counted as {DEFAULT_UNITS:g} units)",
+                        value=course_list_text(validation['not_offered']), inline=False)
+    if suggestions:
+        embed.add_field(name="Suggested next", value="\n".join(
+            f"{suggestion['course']}{'' if suggestion['eligible'] else ' (after prerequisites)'}"
+            for suggestion in suggestions)[:1024], inline=False)
+    await reply(ctx, embed=embed)
+
+
+@bot.command(name='terms')
+async def terms(ctx):
+    """List the terms with scraped catalogs"""
+    loaded = term_store.loaded_terms()
+    lines = []
+    for key in available_terms():
+        marker = " (current)" if key == term_store.current_term else " (loaded)" if key in loaded else ""
+        lines.append(f"{key}{marker}")
+    await reply(ctx, embed=discord.Embed(
+        title="Available Terms",
+        description="\n".join(lines) or "No catalogs found.",
+        color=discord.Color.blue()
+    ))
+
+
+@bot.command(name='offerings')
+async def offerings(ctx, *, query: str):
+    """Compare a course's sections across terms: /offerings CMPT 225 [Spring 2025 Fall 2025 ...]"""
+    course_code = normalize_course_code(query)
+    if not course_code:
+        await reply(ctx, "Please give a course code, e.g. `/offerings CMPT 225`.")
+        return
+
+    requested = []
+    for match in re.finditer(r'(spring|summer|fall)\s*(20\d{2})|(20\d{2})[\s-]*(spring|summer|fall)', query, re.IGNORECASE):
+        key = parse_term(match.group(0))
+        if key not in requested:
+            requested.append(key)
+    keys = requested or available_terms()
+
+    embed = discord.Embed(title=f"{course_code} across terms", color=discord.Color.blue())
+    for key in keys[:25]:
+        try:
+            # Older and future terms load on first use; cold ones are evicted again later
+            catalog = await asyncio.to_thread(term_store.get, key)
+        except FileNotFoundError:
+            embed.add_field(name=key, value="No catalog scraped for this term", inline=False)
+            continue
+        info = catalog['course_descriptions'].get(course_code)
+        if not info:
+            embed.add_field(name=key, value="Not offered", inline=False)
+            continue
+        instructors = sorted({s['instructor'] for s in info['sections'] if s['instructor']})
+        campuses = sorted({c for s in info['sections'] for c in parse_campuses(s['location'])})
+        embed.add_field(
+            name=key,
+            value=(f"{len(info['sections'])} sections\n"
+                   f"Instructors: {', '.join(instructors) or 'TBA'}\n"
+                   f"Locations: {', '.join(campuses) or 'TBD'}")[:1024],
+            inline=False
+        )
+    await reply(ctx, embed=embed)
+
+
+async def send_grade_ranking(ctx, query, easiest):
+    if grade_table is None:
+        await reply(ctx, "Grade statistics are not loaded yet. Please try again shortly.")
+        return
+    from GradeStats import parse_ranking_query
+    label = "Easiest" if easiest else "Hardest"
+    dept, level = parse_ranking_query(query)
+
+    if dept == 'departments':
+        rows = grade_table.rank_departments(easiest=easiest)
+        lines = [
+            f"`{grade_table.dept_names[i]:<5}` avg GPA {grade_table.dept_gpa[i]:.2f}, "
+            f"fail {grade_table.dept_fail[i]:.1f}% ({grade_table.dept_students[i]} grades)"
+            for i in rows
+        ]
+        title = f"{label} Departments"
+    else:
+        rows = grade_table.rank_courses(dept, level, easiest=easiest)
+        lines = []
+        for i in rows:
+            code = grade_table.codes[i]
+            info = course_descriptions.get(f"{grade_table.depts[i]} {grade_table.numbers[i]}")
+            name = f" - {info['name']}" if info else ""
+            lines.append(
+                f"`{code:<10}` {grade_table.medians[i]:<4} fail {grade_table.fail[i]:.1f}%, "
+                f"n={grade_table.counts[i]}, easier than {grade_table.percentile[i]:.0f}%{name}"
+            )
+        scope = ' '.join(part for part in (dept, f"{level}-level" if level else None) if part) or "All"
+        title = f"{label} Courses: {scope}"
+
+    embed = discord.Embed(
+        title=title,
+        description="\n".join(lines)[:4096] or "No courses with grade data match that filter.",
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text="Median GPA weighted by number of grades; small classes pulled toward their department average")
+    await reply(ctx, embed=embed)
+
+
+@bot.command(name='easiest')
+async def easiest(ctx, *, query: str = ''):
+    """/easiest [DEPT] [level], e.g. /easiest CMPT 300-level, or /easiest departments"""
+    await send_grade_ranking(ctx, query, easiest=True)
+
+
+@bot.command(name='hardest')
+async def hardest(ctx, *, query: str = ''):
+    """/hardest [DEPT] [level], e.g. /hardest MATH, or /hardest departments"""
+    await send_grade_ranking(ctx, query, easiest=False)
+
+
+def grade_line(label, stats):
+    return (f"`{label:<14}` {stats['median_grade']:<2} · fail {stats['fail_percentage']:.1f}% · "
+            f"GPA {stats['mean_gpa']:.2f} · difficulty {stats['difficulty']:.1f} · n={stats['grades']}")
+
+
+@bot.command(name='grades')
+async def grades(ctx, *, course: str):
+    """Grade distribution statistics for a course, per term and per instructor"""
+    course_code = normalize_course_code(course)
+    stats = grade_store.course(course_code) if grade_store is not None and course_code else None
+    if stats is None:
+        summary = get_course_digger_info(course_code) if course_code else None
+        if summary and summary['median_grade'] != 'N/A':
+            await reply(ctx, f"{course_code}: median {summary['median_grade']}, fail {summary['fail_percentage']}. "
+                             f"No per-term or per-instructor distributions have been ingested for it.")
+        else:
+            await reply(ctx, f"No grade data for '{course}'.")
+        return
+
+    embed = discord.Embed(title=f"Grades for {course_code}", description=grade_line('All offerings', stats),
+                          color=discord.Color.blue())
+    embed.add_field(name="By term", value="\n".join(
+        grade_line(term, term_stats) for term, term_stats in grade_store.by_term(course_code))[:1024], inline=False)
+    instructors = grade_store.by_instructor(course_code)
+    embed.add_field(name="By instructor", value="\n".join(
+        grade_line(name[:14], instructor_stats) for name, instructor_stats in instructors[:10])[:1024], inline=False)
+    embed.set_footer(text="Difficulty 0-5 from the mean GPA, weighted toward the department average for small classes")
+    await reply(ctx, embed=embed)
+
+
+@bot.command(name='prof')
+async def prof(ctx, *, name: str):
+    """An instructor's sections this term, with their rating: /prof <name>"""
+    index = prof_index
+    key, others = index.match(name) if index is not None else (None, [])
+    if key is None:
+        if others:
+            await reply(ctx, f"Several instructors match '{name}': "
+                             f"{', '.join(index.names[other] for other in others)}. Try a full name.")
+        else:
+            await reply(ctx, f"No instructor matching '{name}' teaches this term.")
+        return
+
+    from ProfIndex import normalize_name
+    # Everything comes from the index built at catalog load; only the rating may need a lookup
+    display_name, courses = index.profile(key)
+    rating = await get_professor_rating(display_name)
+    sections = sum(map(len, courses.values()))
+    embed = discord.Embed(title=display_name,
+                          description=f"{sections} section{'s' if sections != 1 else ''} in "
+                                      f"{len(courses)} course{'s' if len(courses) != 1 else ''} "
+                                      f"({term_store.current_term})\nRating: {rating_text(rating)}",
+                          color=discord.Color.blue())
+    # Discord allows 25 fields per embed
+    for course_code, entries in list(courses.items())[:25]:
+        lines = []
+        for entry in entries:
+            line = f"{entry['section']} · {entry['schedule'] or 'TBA'} · {', '.join(entry['campuses']) or 'TBA'}"
+            co_teachers = [other for other in entry['with'] if normalize_name(other) != key]
+            if co_teachers:
+                line += f" · with {', '.join(co_teachers)}"
+            lines.append(line)
+        embed.add_field(name=f"{course_code} {entries[0]['name']}"[:256], value="\n".join(lines)[:1024], inline=False)
+    if len(courses) > 25:
+        embed.set_footer(text=f"{len(courses) - 25} more courses not shown")
+    if others:
+        footer = f"Also close: {', '.join(index.names[other] for other in others)}"
+        embed.set_footer(text=f"{embed.footer.text} · {footer}" if embed.footer.text else footer)
+    await reply(ctx, embed=embed)
 
 
 @bot.command(name='course_help')
@@ -449,11 +1168,47 @@ Interactive course selection:
      - Day/Time
      - Location
 
+`/ask <question>`
+Ask about courses in plain English, e.g. `/ask easy 3-credit Burnaby courses on Tuesdays with no prerequisites`
+
+`/prereqs <course>` / `/unlocks <course>`
+Show what a course requires, or what it leads to (e.g. `/prereqs CMPT 307`)
+
+`/compare <course> <course> ...`
+Compare up to six courses side by side: grades, credits, schedules and instructor ratings, e.g. `/compare CMPT 225 CMPT 276 MACM 201`
+
+`/find <filters>`
+Filter courses by campus, days, start/end time, credits, level, department and instructor rating, e.g. `/find Burnaby Tue/Thu after 2pm 3 credits 200-level rated >= 4`
+
+`/outline <course> [section] [term]`
+Show a section's course outline: instructor, schedule and rooms, grading and required texts, e.g. `/outline CMPT 225 D100`
+
+`/plan <program> completed: <courses>; <term>: <courses>; ...`
+Check a course plan against a degree program's requirements and prerequisite order, with suggestions for what to take next, e.g. `/plan cmpt-major completed: CMPT 120, MATH 151; Fall 2025: CMPT 125, MACM 101`. `/plan` alone lists programs.
+
 `/dispdept`
 Display all available departments. Follow the prompt to select a department.
 
-`/update`
-Update the course data. Only the bot owner can use this command. You will be prompted to provide the owner's ID if not set.
+`/easiest [dept] [level]` / `/hardest [dept] [level]`
+Rank courses by grade statistics, e.g. `/easiest CMPT 300-level`, or `/hardest departments`
+
+`/prof <name>`
+An instructor's sections this term (times, campuses, co-instructors) and their RateMyProfessor rating. Partial and misspelled names work, e.g. `/prof jurock` or `/prof david mitchel`
+
+`/grades <course>`
+Grade distribution statistics (median, fail rate, mean GPA, difficulty) for a course, broken down by term and by instructor, e.g. `/grades CMPT 225`
+
+`/terms`
+List terms with scraped catalogs.
+
+`/offerings <course> [terms]`
+Compare a course's sections across terms, e.g. `/offerings CMPT 225 Spring 2025 Fall 2025`
+
+`/update [term]`
+Update the course data (current term unless a term like `Fall 2025` is given). Only the bot owner can use this command. You will be prompted to provide the owner's ID if not set.
+
+`/history [term]` / `/rollback [version] [term]`
+List recorded catalog versions, or serve an earlier one (default: the previous version). Rollback is owner only.
 
 `/course_help`
 Display this help message with information on how to use the bot commands.
@@ -473,14 +1228,7 @@ ACMA 101
         description=help_text,
         color=discord.Color.blue()
     )
-    await ctx.send(embed=embed)
-
-@bot.event
-async def on_ready():
-    logger.info(f'{bot.user} has connected to Discord!')
-    load_course_data()
-    logger.info(f'Loaded {len(departments)} departments: {sorted(departments.keys())}')
-
+    await reply(ctx, embed=embed)
 
 if __name__ == "__main__":
-    bot.run('') 
\ No newline at end of file
+    bot.run(os.environ.get('DISCORD_TOKEN', '')) 
\ No newline at end of file
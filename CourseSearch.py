@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import defaultdict
+
+from CatalogUtils import DAY_NAMES, parse_campuses, parse_meetings, parse_course_codes, course_level
+from GradeStats import grade_to_gpa, MAX_GPA
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 5
+LATENCY_BUDGET = 8.0
+ANSWER_CACHE_SIZE = 512
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'about', 'any', 'as', 'at', 'be', 'by', 'can', 'course', 'courses',
+    'do', 'does', 'for', 'from', 'give', 'have', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on',
+    'or', 'some', 'that', 'the', 'there', 'this', 'to', 'what', 'which', 'with', 'you', 'take',
+    'want', 'should', 'show', 'find', 'class', 'classes', 'sfu'
+}
+EASY_WORDS = {'easy', 'easiest', 'bird', 'gpa', 'light', 'chill'}
+HARD_WORDS = {'hard', 'hardest', 'difficult', 'challenging'}
+# Words consumed by parse_filters; scoring them as text would work against the filter
+FILTER_WORDS = EASY_WORDS | HARD_WORDS | {
+    'burnaby', 'surrey', 'vancouver', 'online', 'credit', 'credits', 'unit', 'units', 'cr', 'level',
+    'no', 'without', 'prereq', 'prereqs', 'prerequisite', 'prerequisites'
+} | {name for abbr, full in DAY_NAMES.items() for name in (abbr.lower(), full, full + 's')}
+
+ANSWER_PROMPT = """Answer the student's question about Simon Fraser University courses using ONLY the catalog
+excerpts below. Recommend specific courses by code and say briefly why they fit. If nothing fits, say so.
+
+QUESTION: {question}
+
+CATALOG EXCERPTS:
+{snippets}"""
+
+
+def tokenize(text):
+    return [token for token in re.findall(r'[a-z0-9]+', text.lower()) if token not in STOPWORDS]
+
+
+def normalize_question(question):
+    """Cache key for a question: order, case, punctuation and filler words don't matter."""
+    return ' '.join(sorted(set(tokenize(question))))
+
+
+def parse_filters(question):
+    """Pull structured constraints (campus, weekday, credits, level, prerequisites) out of a question"""
+    lowered = question.lower()
+    filters = {}
+    campuses = [c for c in ('Burnaby', 'Surrey', 'Vancouver', 'Online') if c.lower() in lowered]
+    if campuses:
+        filters['campuses'] = set(campuses)
+    days = [abbr for abbr, name in DAY_NAMES.items()
+            if re.search(rf'\b({name}s?|{abbr.lower()})\b', lowered)]
+    if days:
+        filters['days'] = set(days)
+    match = re.search(r'\b(\d)[\s-]*(?:credit|unit|cr)s?\b', lowered)
+    if match:
+        filters['credits'] = float(match.group(1))
+    match = re.search(r'\b([1-8])00[\s-]*level\b', lowered)
+    if match:
+        filters['level'] = int(match.group(1)) * 100
+    if re.search(r'\bno\s+(?:prereq|prerequisite)s?\b|\bwithout\s+(?:prereq|prerequisite)s?\b', lowered):
+        filters['no_prereqs'] = True
+    tokens = set(re.findall(r'[a-z]+', lowered))
+    if tokens & EASY_WORDS:
+        filters['prefer'] = 'easy'
+    elif tokens & HARD_WORDS:
+        filters['prefer'] = 'hard'
+    return filters
+
+
+class SearchIndex:
+    """BM25 inverted index over course text, with per-course metadata for filtering and ranking"""
+
+    def __init__(self, course_descriptions, grade_stats):
+        self.codes = []
+        self.doc_of = {}
+        self.meta = []
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for course_code, info in course_descriptions.items():
+            doc_id = len(self.codes)
+            self.codes.append(course_code)
+            self.doc_of[course_code] = doc_id
+
+            campuses, days = set(), set()
+            for section in info.get('sections', []):
+                campuses.update(parse_campuses(section.get('location')))
+                for meeting_days, _, _ in parse_meetings(section.get('day/time')):
+                    days.update(meeting_days)
+
+            median, fail = grade_stats.get(course_code, (None, None))
+            gpa = grade_to_gpa(median) if median else None
+            description = info.get('description') or ''
+            self.meta.append({
+                'credits': info.get('credits'),
+                'level': course_level(course_code),
+                'campuses': campuses,
+                'days': days,
+                'has_prereqs': 'prerequisite' in description.lower(),
+                'median_grade': median,
+                'fail_percentage': fail,
+                'gpa': gpa if gpa == gpa else None
+            })
+
+            text = ' '.join([
+                course_code, info.get('name', ''), description,
+                ' '.join(campuses), ' '.join(DAY_NAMES[d] for d in days)
+            ])
+            counts = defaultdict(int)
+            for token in tokenize(text):
+                counts[token] += 1
+            for token, count in counts.items():
+                self.postings[token].append((doc_id, count))
+            self.doc_lengths.append(sum(counts.values()))
+
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def matches(self, doc_id, filters):
+        meta = self.meta[doc_id]
+        if 'campuses' in filters and not (meta['campuses'] & filters['campuses']):
+            return False
+        if 'days' in filters and not (meta['days'] & filters['days']):
+            return False
+        if 'credits' in filters and meta['credits'] != filters['credits']:
+            return False
+        if 'level' in filters and meta['level'] != filters['level']:
+            return False
+        if filters.get('no_prereqs') and meta['has_prereqs']:
+            return False
+        return True
+
+    def search(self, question, k=TOP_K):
+        """Return [(course_code, score)] for the best k courses satisfying the question's filters.
+
+        Courses named by code in the question ("what is CMPT 225 about") come first, whatever
+        the filters say; BM25 skips bare numbers, so without this the code itself never matches.
+        """
+        # '300 level' is a filter, not CMPT 300
+        mentioned = parse_course_codes(re.sub(r'\b[1-8]00[\s-]*level\b', ' ', question, flags=re.I))
+        named = [self.doc_of[code] for code in mentioned if code in self.doc_of]
+        filters = parse_filters(question)
+        scores = defaultdict(float)
+        n_docs = len(self.codes)
+        for token in set(tokenize(question)) - FILTER_WORDS:
+            if token.isdigit():
+                continue
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # Pure filter queries ("3-credit Burnaby courses on Tuesdays") match on metadata alone
+        candidates = scores.keys() if scores and not filters else range(n_docs)
+        results = []
+        for doc_id in candidates:
+            if doc_id in named or not self.matches(doc_id, filters):
+                continue
+            score = scores.get(doc_id, 0.0)
+            gpa = self.meta[doc_id]['gpa']
+            if 'prefer' in filters and gpa is None:
+                continue
+            if filters.get('prefer') == 'easy':
+                score += gpa
+            elif filters.get('prefer') == 'hard':
+                score += MAX_GPA - gpa
+            if score > 0 or filters:
+                results.append((score, doc_id))
+
+        results.sort(key=lambda item: (-item[0], self.codes[item[1]]))
+        results = [(scores.get(doc_id, 0.0), doc_id) for doc_id in named] + results
+        return [(self.codes[doc_id], score) for score, doc_id in results[:k]]
+
+
+def course_snippet(course_code, info, grade_stats, max_description=300):
+    median, fail = grade_stats.get(course_code, ('N/A', None))
+    fail_text = f"{fail:.1f}%" if fail is not None else 'N/A'
+    credits = info.get('credits')
+    credits_text = f"{credits:g} units" if credits else 'units N/A'
+    sections = '; '.join(
+        f"{s['section']} {s['instructor'] or 'TBA'} {' '.join(s['day/time'].split())} {s['location']}"
+        for s in info.get('sections', [])[:3]
+    ) or 'no sections listed'
+    description = (info.get('description') or 'No description.')[:max_description]
+    return (f"{course_code} - {info.get('name', '')} ({credits_text}). {description} "
+            f"Median grade: {median}, fail rate: {fail_text}. Sections: {sections}")
+
+
+def retrieval_answer(results, course_descriptions):
+    if not results:
+        return "No courses in the catalog match that question."
+    lines = [f"• **{code}** - {course_descriptions[code]['name']}" for code, _ in results]
+    return "Closest matches in the catalog:\n" + "\n".join(lines)
+
+
+class CourseAsker:
+    """Retrieval-augmented /ask: local BM25 search, one model call per distinct question and catalog version"""
+
+    def __init__(self, backend, latency_budget=LATENCY_BUDGET, cache_size=ANSWER_CACHE_SIZE):
+        self.backend = backend
+        self.latency_budget = latency_budget
+        self.cache_size = cache_size
+        self.cache = {}
+        self.in_flight = {}
+
+    def _remember(self, key, answer):
+        if len(self.cache) >= self.cache_size:
+            self.cache.pop(next(iter(self.cache)))
+        self.cache[key] = answer
+
+    async def _generate(self, key, prompt):
+        try:
+            answer = await self.backend.generate(prompt)
+            self._remember(key, answer)
+            return answer
+        except Exception as e:
+            logger.error(f"Model answer failed: {str(e)}")
+            return None
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def ask(self, question, index, course_descriptions, grade_stats, catalog_version, k=TOP_K):
+        """Return (answer_text, source_codes, source) where source is 'cache', 'model' or 'retrieval'"""
+        start = time.perf_counter()
+        results = index.search(question, k)
+        codes = [code for code, _ in results]
+        key = (normalize_question(question), catalog_version)
+
+        if key in self.cache:
+            return self.cache[key], codes, 'cache'
+        # No model configured (the echoing stub): the search results are the answer, and aren't cached
+        if not results or not getattr(self.backend, 'answers', True):
+            return retrieval_answer(results, course_descriptions), codes, 'retrieval'
+
+        task = self.in_flight.get(key)
+        if task is None:
+            snippets = '\n'.join(course_snippet(code, course_descriptions[code], grade_stats) for code in codes)
+            prompt = ANSWER_PROMPT.format(question=question, snippets=snippets)
+            task = asyncio.ensure_future(self._generate(key, prompt))
+            self.in_flight[key] = task
+
+        remaining = self.latency_budget - (time.perf_counter() - start)
+        try:
+            # Shielded: on timeout the call keeps running and fills the cache for the next asker
+            answer = await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+            if answer:
+                return answer, codes, 'model'
+        except asyncio.TimeoutError:
+            logger.warning(f"Model answer exceeded {self.latency_budget}s budget, falling back to retrieval")
+        return retrieval_answer(results, course_descriptions), codes, 'retrieval'
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from LLMBackend import StubBackend, get_backend
+from TermStore import CURRENT_TERM, catalog_path
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_FILE = catalog_path(CURRENT_TERM)
+SUMMARY_FILE = os.path.join(SCRIPT_DIR, 'course_summaries.json')
+
+BATCH_SIZE = 10
+CONCURRENCY = 4
+
+PROMPT_TEMPLATE = """You are summarizing Simon Fraser University course descriptions for students.
+For each item below write:
+- "summary": one plain sentence (max 30 words) on what the course covers
+- "workload": a short note on expected workload (labs, projects, writing, math load), max 15 words
+Reply with only a JSON array of objects with keys "id", "summary" and "workload", one per item.
+
+ITEMS:
+{items}"""
+
+
+def description_hash(description):
+    """Content key for a course description; whitespace-only edits don't force regeneration."""
+    normalized = ' '.join((description or '').split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def load_summaries(path=SUMMARY_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Could not parse {path}: {str(e)}")
+        return {}
+
+
+def save_summaries(summaries, path=SUMMARY_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build_prompt(batch):
+    items = [{'id': key, 'description': description} for key, description in batch]
+    return PROMPT_TEMPLATE.format(items=json.dumps(items, ensure_ascii=False, indent=1))
+
+
+def parse_reply(text):
+    """Pull the JSON array out of a model reply, tolerating ```json fences and chatter."""
+    match = re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON array in model reply")
+    return {item['id']: item for item in json.loads(match.group(0)) if 'id' in item}
+
+
+def stub_responder(prompt):
+    """Deterministic local 'model': first sentence as summary, keyword-based workload note."""
+    items = json.loads(prompt.split('ITEMS:', 1)[1])
+    replies = []
+    for item in items:
+        description = item['description']
+        first_sentence = re.split(r'(?<=\.)\s', description, 1)[0]
+        words = first_sentence.split()
+        summary = ' '.join(words[:30]) + ('...' if len(words) > 30 else '')
+        lowered = description.lower()
+        load = [word for word in ('lab', 'project', 'writing', 'seminar', 'practicum') if word in lowered]
+        workload = f"Includes {', '.join(load)} work." if load else "Standard lecture workload."
+        replies.append({'id': item['id'], 'summary': summary, 'workload': workload})
+    return json.dumps(replies)
+
+
+async def summarize_batch(backend, batch, semaphore, retries=1):
+    prompt = build_prompt(batch)
+    async with semaphore:
+        for attempt in range(retries + 1):
+            try:
+                return parse_reply(await backend.generate(prompt))
+            except Exception as e:
+                logger.warning(f"Batch of {len(batch)} failed (attempt {attempt + 1}): {str(e)}")
+    return {}
+
+
+async def generate_summaries(courses, summaries, backend, batch_size=BATCH_SIZE,
+                             concurrency=CONCURRENCY, force=False, path=SUMMARY_FILE):
+    """Summarize every description whose content hash isn't in `summaries` yet.
+
+    The store is saved after each completed batch so an interrupted run resumes where it stopped.
+    """
+    pending = {}
+    for course in courses:
+        description = (course.get('description') or '').strip()
+        if not description:
+            continue
+        key = description_hash(description)
+        if force or key not in summaries:
+            pending[key] = description
+
+    logger.info(f"{len(pending)} descriptions need summaries ({len(summaries)} cached)")
+    items = list(pending.items())
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    model_name = getattr(backend, 'model_name', backend.name)
+
+    generated = 0
+    for done in asyncio.as_completed([summarize_batch(backend, batch, semaphore) for batch in batches]):
+        replies = await done
+        for key, reply in replies.items():
+            if key not in pending:
+                continue
+            summaries[key] = {
+                'summary': str(reply.get('summary', '')).strip(),
+                'workload': str(reply.get('workload', '')).strip(),
+                'model': model_name,
+                'generated_at': int(time.time())
+            }
+            generated += 1
+        if replies and path:
+            save_summaries(summaries, path)
+
+    logger.info(f"Generated {generated} summaries in {len(batches)} batches")
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AI summaries for course descriptions")
+    parser.add_argument('--backend', choices=['gemini', 'stub'], default=None)
+    parser.add_argument('--catalog', default=CATALOG_FILE)
+    parser.add_argument('--output', default=SUMMARY_FILE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--force', action='store_true', help="Regenerate even unchanged descriptions")
+    parser.add_argument('--prune', action='store_true', help="Drop summaries for descriptions no longer in the catalog")
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        courses = json.load(f)
+
+    backend = get_backend(args.backend)
+    if isinstance(backend, StubBackend):
+        backend.responder = stub_responder
+
+    summaries = load_summaries(args.output)
+    if args.prune:
+        live = {description_hash(c.get('description')) for c in courses}
+        summaries = {key: value for key, value in summaries.items() if key in live}
+
+    asyncio.run(generate_summaries(courses, summaries, backend, args.batch_size,
+                                   args.concurrency, args.force, args.output))
+    save_summaries(summaries, args.output)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
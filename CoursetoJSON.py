@@ -1,9 +1,20 @@
-import requests
 from bs4 import BeautifulSoup
 import json
 import time
 import logging
-from urllib.parse import urljoin
+import os
+import asyncio
+import concurrent.futures
+import sys
+from functools import partial
+from urllib.parse import urljoin, urlparse
+
+from TermStore import term_key, term_path
+from HttpClient import DEFAULT_MAX_AGE, HttpClient, default_client
+from CatalogHistory import CatalogHistory
+from DeptShards import build_from_file
+from CrawlTelemetry import CrawlTelemetry, profiled_call, report_run, timed_call
+from CrawlController import CrawlController
 
 # Set up logging
 logging.basicConfig(
@@ -12,70 +23,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_department_links(base_url):
-    try:
-        response = requests.get(base_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        department_links = []
-
-        # Find all ul elements that contain department links
-        for ul in soup.find_all('ul'):
-            # Look for links within each ul
-            for link in ul.find_all('a', href=True):
-                href = link.get('href', '')
-                text = link.get_text(strip=True)
-                
-                # Check if it's a valid department link
-                if (href.startswith('/students/calendar/2025/spring/courses/') and 
-                    href.endswith('.html') and
-                    len(href.split('/')) == 7):  # Ensure it's a department page
-                    
-                    # Create full URL
-                    full_url = urljoin('https://www.sfu.ca', href)
-                    
-                    if full_url not in department_links:
-                        department_links.append(full_url)
-                        logger.info(f"Found department: {text}")
-
-        logger.info(f"Found {len(department_links)} unique department links")
-        return department_links
-    except Exception as e:
-        logger.error(f"Error getting department links: {str(e)}")
-        return []
+YEAR = '2025'
+TERM = 'spring'
+
+# Pipeline tuning: most fetches in flight (CrawlController picks how many are, from the
+# server's latency and 429/5xx responses), parse processes (None = one per core),
+# bounded queue size between stages and how often the writer checkpoints
+FETCH_CONCURRENCY = 16
+PARSE_WORKERS = None
+QUEUE_SIZE = 32
+SAVE_EVERY = 100
+# A complete crawl smaller than this share of the current file is refused as a likely outage
+MIN_KEEP_RATIO = 0.5
+
+
+class CrawlIncomplete(Exception):
+    """The crawl missed pages (or found nothing); the term file was left alone"""
+
+
+def calendar_url(year, term):
+    return f"https://www.sfu.ca/students/calendar/{year}/{term.lower()}/courses.html"
+
+
+BASE_URL = calendar_url(YEAR, TERM)
+
+
+def courses_prefix(base_url):
+    """Path prefix of course pages for the calendar at base_url"""
+    path = urlparse(base_url).path
+    return path[:-len('.html')] + '/' if path.endswith('.html') else path
+
+
+def parse_department_links(html, base_url=BASE_URL):
+    soup = BeautifulSoup(html, 'html.parser')
+    department_links = []
+    prefix = courses_prefix(base_url)
+
+    # Find all ul elements that contain department links
+    for ul in soup.find_all('ul'):
+        # Look for links within each ul
+        for link in ul.find_all('a', href=True):
+            href = link.get('href', '')
+            text = link.get_text(strip=True)
+
+            # Check if it's a valid department link
+            if (href.startswith(prefix) and
+                href.endswith('.html') and
+                len(href.split('/')) == 7):  # Ensure it's a department page
 
-def get_course_links(department_url):
-    try:
-        response = requests.get(department_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        course_links = []
-
-        # Find all option elements with data-href attributes
-        for option in soup.find_all('option', attrs={'data-href': True}):
-            href = option.get('data-href', '')
-            course_text = option.get_text(strip=True)
-            
-            if href and '/courses/' in href:
                 # Create full URL
-                course_url = urljoin('https://www.sfu.ca', href)
-                if course_url not in course_links:
-                    course_links.append(course_url)
-                    logger.info(f"Found course: {course_text}")
-
-        if not course_links:
-            logger.warning(f"No course links found in {department_url}")
-            
-        return course_links
-    except Exception as e:
-        logger.error(f"Error getting course links from {department_url}: {str(e)}")
-        return []
+                full_url = urljoin(base_url, href)
 
-def get_course_details(course_url):
+                if full_url not in department_links:
+                    department_links.append(full_url)
+                    logger.info(f"Found department: {text}")
+
+    logger.info(f"Found {len(department_links)} unique department links")
+    return department_links
+
+
+def parse_course_links(html, department_url):
+    soup = BeautifulSoup(html, 'html.parser')
+    course_links = []
+
+    # Find all option elements with data-href attributes
+    for option in soup.find_all('option', attrs={'data-href': True}):
+        href = option.get('data-href', '')
+        course_text = option.get_text(strip=True)
+
+        if href and '/courses/' in href:
+            # Create full URL
+            course_url = urljoin(department_url, href)
+            if course_url not in course_links:
+                course_links.append(course_url)
+                logger.info(f"Found course: {course_text}")
+
+    if not course_links:
+        logger.warning(f"No course links found in {department_url}")
+
+    return course_links
+
+
+def parse_course_details(html, course_url):
+    """Parse a course page into a course record. CPU-bound, runs in the parse pool."""
     try:
-        response = requests.get(course_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
 
         # Find the main section using section tag with class "main"
         main_section = soup.find('section', class_='main')
@@ -93,11 +125,11 @@ def get_course_details(course_url):
 
         # Get the main title (excluding the small tag content)
         title_text = ''.join(text for text in course_title.stripped_strings if text not in course_title.small.stripped_strings) if course_title.small else course_title.text
-        
+
         # Get the course number from small tag
         course_number = course_title.find('small', class_='course_number')
         course_code = f"[{' '.join(course_number.stripped_strings)}]" if course_number else ""
-        
+
         course_details['course_name'] = f"{title_text.strip()} {course_code}".strip()
         logger.info(f"Successfully extracted course name: {course_details['course_name']}")
 
@@ -106,7 +138,7 @@ def get_course_details(course_url):
         if not description:
             logger.error(f"Could not find course description for {course_url}")
             return None
-            
+
         course_details['description'] = description.text.strip()
         logger.info(f"Successfully extracted course description (length: {len(course_details['description'])})")
 
@@ -127,77 +159,317 @@ def get_course_details(course_url):
                             'location': cells[3].text.strip()
                         }
                         course_details['sections'].append(section)
-            
+
             logger.info(f"Successfully extracted {len(course_details['sections'])} course sections")
         else:
             logger.warning(f"No course sections found for {course_url}")
 
+        course_details['url'] = course_url
         return course_details
 
     except Exception as e:
         logger.error(f"Error processing course {course_url}: {str(e)}")
         return None
 
-def scrape_sfu_courses():
-    #If using in a different semester, replace "2025" with the desired year and corresponding semester, SHOULD WORK
-    base_url = "https://www.sfu.ca/students/calendar/2025/spring/courses.html"
-    all_courses = []
-    
+
+def get_department_links(base_url):
+    try:
+        response = default_client().get(base_url)
+        response.raise_for_status()
+        return parse_department_links(response.content, base_url)
+    except Exception as e:
+        logger.error(f"Error getting department links: {str(e)}")
+        return []
+
+def get_course_links(department_url):
+    try:
+        response = default_client().get(department_url)
+        response.raise_for_status()
+        return parse_course_links(response.content, department_url)
+    except Exception as e:
+        logger.error(f"Error getting course links from {department_url}: {str(e)}")
+        return []
+
+def get_course_details(course_url):
+    try:
+        response = default_client().get(course_url)
+        response.raise_for_status()
+        return parse_course_details(response.content, course_url)
+    except Exception as e:
+        logger.error(f"Error processing course {course_url}: {str(e)}")
+        return None
+
+
+def save_courses(all_courses, output_file):
+    """Write the course list atomically so a crash never leaves a truncated file"""
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(all_courses, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, output_file)
+
+
+async def fetch_page(client, url):
+    response = await client.aget(url)
+    response.raise_for_status()
+    return response.content
+
+
+async def discover_stage(client, base_url, known_urls, url_queue, stats):
+    """Walk the department pages and feed unseen course URLs into url_queue.
+
+    Without the index page there is nothing to crawl, so that error is raised; a failed
+    department page is counted in stats['department_errors'].
+    """
+    department_links = parse_department_links(await fetch_page(client, base_url), base_url)
+
+    for department_url in department_links:
+        logger.info(f"Processing department: {department_url}")
+        try:
+            course_links = parse_course_links(await fetch_page(client, department_url), department_url)
+        except Exception as e:
+            logger.error(f"Error getting course links from {department_url}: {str(e)}")
+            stats['department_errors'] += 1
+            continue
+
+        for course_url in course_links:
+            # Skip if we already have this course
+            if course_url in known_urls:
+                logger.info(f"Skipping already processed course: {course_url}")
+                continue
+            known_urls.add(course_url)
+            # Blocks while the fetch stage is behind
+            await url_queue.put(course_url)
+            stats['discovered'] += 1
+
+
+async def fetch_stage(client, url_queue, html_queue, stats, telemetry=None):
+    while True:
+        course_url = await url_queue.get()
+        if course_url is None:
+            return
+        logger.info(f"Processing course: {course_url}")
+        try:
+            html = await fetch_page(client, course_url)
+        except Exception as e:
+            logger.error(f"Error processing course {course_url}: {str(e)}")
+            stats['fetch_errors'] += 1
+            continue
+        stats['bytes'] += len(html)
+        # Blocks while the parse pool is behind
+        waited = time.perf_counter()
+        await html_queue.put((course_url, html))
+        if telemetry:
+            telemetry.add_stage('fetch_blocked', time.perf_counter() - waited)
+
+
+async def parse_stage(pool, html_queue, result_queue, telemetry=None):
+    loop = asyncio.get_running_loop()
+    if telemetry and telemetry.profile_dir:
+        parse = partial(profiled_call, telemetry.profile_dir, parse_course_details)
+    else:
+        parse = partial(timed_call, parse_course_details)
+    while True:
+        item = await html_queue.get()
+        if item is None:
+            return
+        course_url, html = item
+        course_details, seconds = await loop.run_in_executor(pool, parse, html, course_url)
+        if telemetry:
+            telemetry.add_stage('parse', seconds)
+        if course_details:
+            await result_queue.put(course_details)
+        else:
+            logger.warning(f"Skipped course {course_url} due to missing details")
+
+
+async def write_stage(result_queue, all_courses, checkpoint_file, stats, telemetry=None):
+    """Single writer: appends parsed courses and checkpoints them for --resume"""
+    loop = asyncio.get_running_loop()
+    while True:
+        course_details = await result_queue.get()
+        if course_details is None:
+            return
+        all_courses.append(course_details)
+        stats['parsed'] += 1
+        logger.info(f"Added course details. Total courses: {len(all_courses)}")
+
+        # Save progress periodically
+        if stats['parsed'] % SAVE_EVERY == 0:
+            start = time.perf_counter()
+            await loop.run_in_executor(None, save_courses, list(all_courses), checkpoint_file)
+            if telemetry:
+                telemetry.add_stage('write', time.perf_counter() - start)
+
+
+def checkpoint_path(output_file):
+    return f"{output_file}.partial"
+
+
+def incomplete_reason(all_courses, stats, output_file):
+    """Why a finished crawl must not replace output_file, or None if it may"""
+    if not all_courses:
+        return "no courses were found"
+    if stats['department_errors'] or stats['fetch_errors']:
+        return (f"{stats['department_errors']} department page(s) and "
+                f"{stats['fetch_errors']} course page(s) could not be fetched")
+    current = len(load_courses(output_file)) if os.path.exists(output_file) else 0
+    if len(all_courses) < current * MIN_KEEP_RATIO:
+        return f"only {len(all_courses)} courses against {current} in {output_file}"
+    return None
+
+
+def load_courses(path):
     try:
-        # Load existing data if any
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+async def crawl_catalog(base_url, output_file, parse_workers=PARSE_WORKERS,
+                        fetch_concurrency=FETCH_CONCURRENCY, queue_size=QUEUE_SIZE, client=None, telemetry=None,
+                        controller=None, resume=False):
+    """Run the fetch -> parse -> write pipeline and return (courses, stats).
+
+    Stages are connected by bounded queues, so a slow stage stalls the ones
+    before it instead of buffering pages in memory. Pages come through `client`
+    (an HttpClient), so cached, recorded or replayed pages are used when available.
+    `telemetry` (a CrawlTelemetry) collects request, parse and write timings.
+
+    A crawl collects a fresh course list, checkpointed to <output_file>.partial, and
+    replaces `output_file` only when it completes, so changed and withdrawn courses
+    are picked up. resume=True continues an interrupted crawl from the checkpoint,
+    skipping the courses already in it. If a stage fails the others are cancelled,
+    the checkpoint is saved and the error is raised. A crawl that found no courses, missed
+    a department or course page, or came back far smaller than the current file is
+    incomplete: the checkpoint is kept, `output_file` is untouched and CrawlIncomplete
+    is raised.
+
+    `fetch_concurrency` fetchers run, but `controller` (a CrawlController, by default
+    one capped at fetch_concurrency) decides how many requests are in flight at once;
+    pass controller=False for a fixed fetch_concurrency.
+    """
+    checkpoint_file = checkpoint_path(output_file)
+    all_courses = load_courses(checkpoint_file) if resume else []
+    if all_courses:
+        logger.info(f"Resuming with {len(all_courses)} courses from {checkpoint_file}")
+    else:
+        logger.info("Starting a fresh crawl")
+
+    known_urls = {course['url'] for course in all_courses if course.get('url')}
+    parse_workers = parse_workers or os.cpu_count() or 1
+    stats = {'discovered': 0, 'parsed': 0, 'department_errors': 0, 'fetch_errors': 0, 'bytes': 0}
+
+    url_queue = asyncio.Queue(maxsize=queue_size)
+    html_queue = asyncio.Queue(maxsize=queue_size)
+    result_queue = asyncio.Queue(maxsize=queue_size)
+
+    start = time.perf_counter()
+    # An explicit refresh revalidates every cached page (If-None-Match/If-Modified-Since) instead
+    # of serving it unchecked; a resumed crawl trusts what the interrupted run just fetched
+    client = client or HttpClient(pool_size=fetch_concurrency, max_age=DEFAULT_MAX_AGE if resume else 0)
+    client.telemetry = telemetry
+    if controller is None:
+        controller = CrawlController(maximum=fetch_concurrency)
+    client.controller = controller or None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers) as pool:
         try:
-            with open('sfu_courses2.json', 'r', encoding='utf-8') as f:
-                all_courses = json.load(f)
-            logger.info(f"Loaded {len(all_courses)} existing courses from file")
-        except FileNotFoundError:
-            logger.info("No existing courses file found, starting fresh")
-
-        department_links = get_department_links(base_url)
-        
-        for department_url in department_links:
-            logger.info(f"Processing department: {department_url}")
-            time.sleep(1)  # Polite delay between requests
-            
-            # Get all course links for this department
-            course_links = get_course_links(department_url)
-            
-            # Process each course
-            for course_url in course_links:
-                # Skip if we already have this course
-                if any(course.get('url') == course_url for course in all_courses):
-                    logger.info(f"Skipping already processed course: {course_url}")
-                    continue
-                
-                logger.info(f"Processing course: {course_url}")
-                time.sleep(1)  # Polite delay between requests
-                
-                course_details = get_course_details(course_url)
-                if course_details:
-                    all_courses.append(course_details)
-                    logger.info(f"Added course details. Total courses: {len(all_courses)}")
-                    
-                    # Save progress periodically (every 10 courses)
-                    if len(all_courses) % 10 == 0:
-                        with open('sfu_courses2.json', 'w', encoding='utf-8') as f:
-                            json.dump(all_courses, f, indent=2, ensure_ascii=False)
-                else:
-                    logger.warning(f"Skipped course {course_url} due to missing details")
-
-        # Final save
-        with open('sfu_courses2.json', 'w', encoding='utf-8') as f:
-            json.dump(all_courses, f, indent=2, ensure_ascii=False)
-
-        logger.info(f"Scraping complete. Total courses collected: {len(all_courses)}")
-        return all_courses
+            writer = asyncio.create_task(write_stage(result_queue, all_courses, checkpoint_file, stats, telemetry))
+            parsers = [asyncio.create_task(parse_stage(pool, html_queue, result_queue, telemetry))
+                       for _ in range(parse_workers)]
+            fetchers = [asyncio.create_task(fetch_stage(client, url_queue, html_queue, stats, telemetry))
+                        for _ in range(fetch_concurrency)]
+            stages = fetchers + parsers + [writer]
+
+            async def run_pipeline():
+                await discover_stage(client, base_url, known_urls, url_queue, stats)
+                # Drain each stage in order by handing every worker a sentinel
+                for _ in fetchers:
+                    await url_queue.put(None)
+                await asyncio.gather(*fetchers)
+                for _ in parsers:
+                    await html_queue.put(None)
+                await asyncio.gather(*parsers)
+                await result_queue.put(None)
+                await writer
+
+            driver = asyncio.create_task(run_pipeline())
+            completed = False
+            problem = None
+            try:
+                # A failed stage (e.g. a broken parse pool) would leave the others blocked on full queues
+                done, _ = await asyncio.wait([driver] + stages, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+                problem = incomplete_reason(all_courses, stats, output_file)
+                completed = problem is None
+            finally:
+                for task in stages + [driver]:
+                    task.cancel()
+                await asyncio.gather(*stages, driver, return_exceptions=True)
+                start_write = time.perf_counter()
+                if completed:
+                    save_courses(all_courses, output_file)
+                    if os.path.exists(checkpoint_file):
+                        os.remove(checkpoint_file)
+                elif all_courses:
+                    # Save whatever we have so far for --resume
+                    save_courses(all_courses, checkpoint_file)
+                if telemetry:
+                    telemetry.add_stage('write', time.perf_counter() - start_write)
+        finally:
+            # The async session belongs to this event loop
+            await client.aclose()
+            client.controller = None
 
+    stats['elapsed'] = time.perf_counter() - start
+    stats['parse_workers'] = parse_workers
+    if controller:
+        stats['concurrency'] = controller.summary()
+        if telemetry:
+            controller.report_to(telemetry)
+    if problem:
+        raise CrawlIncomplete(f"Crawl incomplete, {output_file} left unchanged: {problem}")
+    return all_courses, stats
+
+
+def scrape_sfu_courses(year=YEAR, term=TERM, output_file=None, profile=False, resume=False):
+    """Scrape one term's calendar into the term store (terms/<year>-<term>-courses.json).
+
+    The file is replaced by the fresh crawl; resume=True continues an interrupted one.
+    Returns (courses, complete); on failure or an incomplete crawl the courses are the ones
+    scraped so far (kept in the .partial checkpoint) and the term file is left alone.
+    Writes a run report to crawl_reports/; profile=True adds a cProfile of the parse stage.
+    """
+    output_file = output_file or term_path(term_key(year, term))
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    telemetry = CrawlTelemetry('CoursetoJSON', profile=profile)
+    telemetry.meta['term'] = term_key(year, term)
+    try:
+        all_courses, stats = asyncio.run(crawl_catalog(calendar_url(year, term), output_file, telemetry=telemetry,
+                                                       resume=resume))
+        logger.info(f"Scraping complete. Total courses collected: {len(all_courses)} "
+                    f"({stats['parsed']} fetched in {stats['elapsed']:.1f}s)")
+        telemetry.meta['courses'] = len(all_courses)
+        telemetry.meta['new'] = stats['parsed']
+        if all_courses:
+            # Keep this scrape as a version so /rollback can return to it
+            CatalogHistory().commit(term_key(year, term), all_courses, source=os.path.basename(output_file))
+            build_from_file(term_key(year, term), output_file)
+        return all_courses, True
     except Exception as e:
         logger.error(f"Script failed with error: {str(e)}")
-        # Save whatever we have so far
-        if all_courses:
-            with open('sfu_courses2.json', 'w', encoding='utf-8') as f:
-                json.dump(all_courses, f, indent=2, ensure_ascii=False)
-        return all_courses
+        partial = load_courses(checkpoint_path(output_file))
+        if partial:
+            logger.info(f"{len(partial)} courses saved to {checkpoint_path(output_file)}; rerun with --resume")
+        return partial, False
+    finally:
+        report_run(telemetry)
 
 if __name__ == "__main__":
-    courses = scrape_sfu_courses()
-    
+    # python CoursetoJSON.py [year] [term] [--profile] [--resume], e.g. python CoursetoJSON.py 2025 fall
+    args = [arg for arg in sys.argv[1:] if arg not in ('--profile', '--resume')]
+    courses, complete = scrape_sfu_courses(*args[:2], profile='--profile' in sys.argv, resume='--resume' in sys.argv)
+    # /update only reloads the catalog on a zero exit status
+    sys.exit(0 if complete else 1)
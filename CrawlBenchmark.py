@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+import CoursetoJSON
+from CrawlController import CrawlController
+from CrawlTelemetry import CrawlTelemetry
+from HttpClient import HttpClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CALENDAR_PATH = '/students/calendar/2025/spring/courses'
+FIXTURE_DEPARTMENTS = 20
+FIXTURE_COURSES_PER_DEPT = 25
+# Boilerplate navigation markup so each page costs about as much to parse as a real one
+FIXTURE_PADDING = 400
+
+# Capacity fixture: the server works on CAPACITY requests at once, SERVICE_TIME seconds each;
+# up to QUEUE_LIMIT more wait their turn and anything past that gets a 429 with Retry-After
+CAPACITY = 8
+SERVICE_TIME = 0.05
+QUEUE_LIMIT = 16
+RETRY_AFTER = 1
+CAPACITY_REQUESTS = 800
+FIXED_CONCURRENCIES = (2, 8, 32, 64)
+ADAPTIVE_MAX = 64
+
+
+def fixture_page(body):
+    nav = ''.join(f'<li><a href="/students/nav/{i}.html">Link {i}</a></li>' for i in range(FIXTURE_PADDING))
+    return f'<html><head><title>SFU</title></head><body><nav><ol>{nav}</ol></nav>{body}</body></html>'
+
+
+def build_fixture_site():
+    """Render a synthetic calendar shaped like the real sfu.ca pages"""
+    pages = {}
+    dept_items = []
+    for d in range(FIXTURE_DEPARTMENTS):
+        dept = f'D{d:02d}'
+        dept_items.append(f'<li><a href="{CALENDAR_PATH}/{dept.lower()}.html">{dept}</a></li>')
+        options = []
+        for c in range(FIXTURE_COURSES_PER_DEPT):
+            number = 100 + c
+            href = f'{CALENDAR_PATH}/{dept.lower()}/{number}.html'
+            options.append(f'<option data-href="{href}">{dept} {number}</option>')
+            rows = ''.join(
+                f'<tr><td>D{s}00</td><td>Instructor {s}</td><td>Jan 6 – Apr 9, 2025: Tue, 10:30 a.m.–12:20 p.m.</td>'
+                f'<td>Burnaby</td></tr>' for s in range(1, 4)
+            )
+            pages[href] = fixture_page(
+                f'<section class="main"><h1>Course {dept} {number}'
+                f'<small class="course_number">{dept} {number} (3)</small></h1>'
+                f'<p>{"Synthetic course description. " * 20}Prerequisite: {dept} {number - 1}.</p>'
+                f'<div class="course-sections"><table><tr><th>Section</th></tr>{rows}</table></div></section>'
+            )
+        pages[f'{CALENDAR_PATH}/{dept.lower()}.html'] = fixture_page(f'<select>{"".join(options)}</select>')
+    pages[f'{CALENDAR_PATH}.html'] = fixture_page(f'<ul>{"".join(dept_items)}</ul>')
+    return pages
+
+
+def serve_fixture(port):
+    pages = build_fixture_site()
+
+    async def handle(request):
+        page = pages.get(request.path)
+        if page is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=page, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def serve_capacity(port, capacity, service_time, queue_limit, retry_after):
+    """A server that can only do `capacity` things at once, like an overloaded origin"""
+    in_system = 0
+    slots = None
+
+    async def handle(request):
+        nonlocal in_system, slots
+        slots = slots or asyncio.Semaphore(capacity)
+        if in_system >= capacity + queue_limit:
+            return web.Response(status=429, text='busy', headers={'Retry-After': str(retry_after)})
+        in_system += 1
+        try:
+            async with slots:
+                await asyncio.sleep(service_time)
+        finally:
+            in_system -= 1
+        return web.Response(text=request.path)
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+async def fetch_capacity(port, requests, concurrency, controller=None):
+    """Fetch `requests` distinct pages with `concurrency` workers; returns (elapsed, ok, telemetry, limit trace)"""
+    client = HttpClient(cache_dir=None, mode=None, pool_size=concurrency)
+    client.telemetry = CrawlTelemetry('capacity')
+    client.controller = controller
+    urls = asyncio.Queue()
+    for i in range(requests):
+        urls.put_nowait(f'http://127.0.0.1:{port}/item/{i}')
+    ok = 0
+    trace = []
+
+    async def worker():
+        nonlocal ok
+        while not urls.empty():
+            response = await client.aget(urls.get_nowait())
+            ok += response.status == 200
+
+    async def sample():
+        while True:
+            trace.append(controller.limit)
+            await asyncio.sleep(0.25)
+
+    start = time.perf_counter()
+    sampler = asyncio.create_task(sample()) if controller else None
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        if sampler:
+            sampler.cancel()
+        await client.aclose()
+    return time.perf_counter() - start, ok, client.telemetry, trace
+
+
+def concurrency_report(capacity=CAPACITY, service_time=SERVICE_TIME, queue_limit=QUEUE_LIMIT,
+                       requests=CAPACITY_REQUESTS):
+    """Crawl the capacity fixture at fixed concurrencies and under CrawlController, print pages/sec"""
+    port = free_port()
+    server = multiprocessing.Process(target=serve_capacity,
+                                     args=(port, capacity, service_time, queue_limit, RETRY_AFTER), daemon=True)
+    server.start()
+    logging.getLogger('HttpClient').setLevel(logging.ERROR)
+    results = []
+    try:
+        wait_for_port(port)
+        for concurrency in FIXED_CONCURRENCIES:
+            elapsed, ok, telemetry, _ = asyncio.run(fetch_capacity(port, requests, concurrency))
+            results.append((f'fixed {concurrency}', elapsed, ok, telemetry, None))
+        controller = CrawlController(maximum=ADAPTIVE_MAX)
+        elapsed, ok, telemetry, trace = asyncio.run(fetch_capacity(port, requests, ADAPTIVE_MAX, controller))
+        results.append(('adaptive', elapsed, ok, telemetry, controller))
+    finally:
+        server.terminate()
+        server.join()
+
+    optimal = capacity / service_time
+    print(f"server: {capacity} at once, {service_time * 1000:.0f} ms each, queue {queue_limit} "
+          f"-> at most {optimal:.0f} pages/s")
+    print(f"{'client':>12} {'pages/s':>8} {'of best':>8} {'ok':>5} {'429s':>5} {'mean ttfb':>10} {'limit':>6}")
+    for name, elapsed, ok, telemetry, controller in results:
+        throttled = telemetry.statuses.get('429', 0)
+        ttfb = telemetry.phases['ttfb'] / max(telemetry.counters['requests'], 1)
+        limit = f"{controller.mean_limit():.1f}" if controller else ''
+        print(f"{name:>12} {ok / elapsed:>8.1f} {ok / elapsed / optimal:>7.0%} {ok:>5} {throttled:>5} "
+              f"{ttfb * 1000:>8.0f}ms {limit:>6}")
+    print(f"adaptive limit every 0.25s: {' '.join(f'{limit:.0f}' for limit in trace)}")
+    print(f"controller: {controller.summary()}")
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Fixture server did not start on port {port}")
+
+
+def throughput_report(max_workers=None):
+    """Crawl the fixture site with 1..N parse processes and print courses/sec for each"""
+    max_workers = max_workers or os.cpu_count() or 1
+    port = free_port()
+    server = multiprocessing.Process(target=serve_fixture, args=(port,), daemon=True)
+    server.start()
+    # Per-course log lines would dominate the measurement
+    logging.getLogger(CoursetoJSON.__name__).setLevel(logging.WARNING)
+    results = []
+    try:
+        wait_for_port(port)
+        base_url = f'http://127.0.0.1:{port}{CALENDAR_PATH}.html'
+        workers = 1
+        while True:
+            with tempfile.TemporaryDirectory() as tmp:
+                output_file = os.path.join(tmp, 'courses.json')
+                courses, stats = asyncio.run(
+                    CoursetoJSON.crawl_catalog(base_url, output_file, parse_workers=workers,
+                                               client=HttpClient(cache_dir=None, mode=None))
+                )
+            results.append((workers, len(courses), stats['elapsed']))
+            if workers >= max_workers:
+                break
+            workers = min(workers * 2, max_workers)
+    finally:
+        server.terminate()
+        server.join()
+
+    base_rate = results[0][1] / results[0][2]
+    print(f"{'workers':>8} {'courses':>8} {'seconds':>8} {'courses/s':>10} {'speedup':>8}")
+    for workers, count, elapsed in results:
+        rate = count / elapsed
+        print(f"{workers:>8} {count:>8} {elapsed:>8.2f} {rate:>10.1f} {rate / base_rate:>7.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    # python CrawlBenchmark.py [max_workers] | python CrawlBenchmark.py concurrency [capacity]
+    if sys.argv[1:2] == ['concurrency']:
+        concurrency_report(int(sys.argv[2]) if len(sys.argv) > 2 else CAPACITY)
+    else:
+        throughput_report(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+INITIAL_LIMIT = 2
+MIN_LIMIT = 1
+MAX_LIMIT = 16
+# Additive increase is spread over a window: +INCREASE after about `limit` healthy responses
+INCREASE = 1.0
+DECREASE = 0.5
+# Smoothed TTFB this many times the best seen means requests are queueing at the server
+LATENCY_FACTOR = 2.0
+LATENCY_SMOOTHING = 0.2
+# Per-sample upward drift of the TTFB baseline, so one lucky fast response does not pin it forever
+BASELINE_DRIFT = 0.001
+CONGESTION_STATUSES = (429, 500, 502, 503, 504)
+MAX_PAUSE = 120.0
+
+
+class CrawlController:
+    """AIMD limit on requests in flight, fed by each response's status and TTFB.
+
+    Every healthy response while the limit is in use grows it by INCREASE / limit (about
+    one slot per round trip); a 429/5xx, a connection error or a smoothed TTFB above
+    LATENCY_FACTOR x the best seen cuts it by DECREASE. Only responses to requests started
+    after the last cut can cut again, so one overload burst costs one cut. A Retry-After
+    stops every new request, sync or async, until it has passed.
+
+    Callers take a slot with acquire()/aacquire(), which return the request's start time,
+    and hand that back to release() along with what the server said.
+    """
+
+    def __init__(self, initial=INITIAL_LIMIT, minimum=MIN_LIMIT, maximum=MAX_LIMIT,
+                 increase=INCREASE, decrease=DECREASE, latency_factor=LATENCY_FACTOR):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.baseline = None
+        self.latency = None
+        self.stats = {'requests': 0, 'increases': 0, 'decreases': 0, 'throttled': 0,
+                      'slow': 0, 'errors': 0, 'paused': 0.0, 'peak': self.limit}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._waiters = []
+        self._last_cut = float('-inf')
+        self._created = self._limit_since = time.monotonic()
+        self._limit_area = 0.0
+
+    def _admit(self):
+        """(True, None) if a slot was taken, else (False, seconds to wait or None for a release)"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return False, self.paused_until - now
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.stats['requests'] += 1
+            return True, None
+        return False, None
+
+    def acquire(self):
+        with self._changed:
+            while True:
+                admitted, wait = self._admit()
+                if admitted:
+                    return time.monotonic()
+                self._changed.wait(wait)
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                admitted, wait = self._admit()
+                if admitted:
+                    return time.monotonic()
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, started, status=None, ttfb=None, retry_after=None, error=False):
+        """Give back a slot and adjust the limit from the response (status None + error=True: no response)"""
+        with self._changed:
+            self.in_flight -= 1
+            self._record(started, status, ttfb, retry_after, error)
+            waiters, self._waiters = self._waiters, []
+            self._changed.notify_all()
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def _record(self, started, status, ttfb, retry_after, error):
+        now = time.monotonic()
+        if retry_after is not None:
+            until = now + min(max(retry_after, 0.0), MAX_PAUSE)
+            if until > self.paused_until:
+                self.stats['paused'] += until - max(now, self.paused_until)
+                self.paused_until = until
+                logger.info(f"Server asked for a {retry_after:.1f}s pause; holding new requests")
+
+        if error:
+            self.stats['errors'] += 1
+            congested = True
+        elif status in CONGESTION_STATUSES:
+            self.stats['throttled'] += 1
+            congested = True
+        else:
+            congested = False
+            if ttfb is not None:
+                self.baseline = ttfb if self.baseline is None else min(ttfb, self.baseline * (1 + BASELINE_DRIFT))
+                self.latency = ttfb if self.latency is None else self.latency + LATENCY_SMOOTHING * (ttfb - self.latency)
+                if self.latency > self.baseline * self.latency_factor:
+                    self.stats['slow'] += 1
+                    congested = True
+
+        if congested:
+            if started > self._last_cut:
+                self._set_limit(max(self.minimum, self.limit * self.decrease), now)
+                self._last_cut = now
+                self.stats['decreases'] += 1
+                # Let the cut show in fresh samples before latency can trigger another
+                if self.latency is not None and self.baseline is not None:
+                    self.latency = min(self.latency, self.baseline * self.latency_factor)
+        elif self.in_flight + 1 >= int(self.limit) and self.limit < self.maximum:
+            # Only grow a limit that is being used; an idle crawler learns nothing about the server
+            grown = min(self.maximum, self.limit + self.increase / self.limit)
+            if int(grown) > int(self.limit):
+                self.stats['increases'] += 1
+            self._set_limit(grown, now)
+
+    def _set_limit(self, limit, now):
+        self._limit_area += self.limit * (now - self._limit_since)
+        self._limit_since = now
+        self.limit = limit
+        self.stats['peak'] = max(self.stats['peak'], limit)
+
+    def mean_limit(self):
+        """Time-weighted average limit since the controller was created"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._created
+            area = self._limit_area + self.limit * (now - self._limit_since)
+        return area / elapsed if elapsed > 0 else self.limit
+
+    def summary(self):
+        return {
+            'limit': round(self.limit, 2),
+            'mean_limit': round(self.mean_limit(), 2),
+            'peak': round(self.stats['peak'], 2),
+            'requests': self.stats['requests'],
+            'increases': self.stats['increases'],
+            'decreases': self.stats['decreases'],
+            'throttled': self.stats['throttled'],
+            'slow': self.stats['slow'],
+            'errors': self.stats['errors'],
+            'paused': round(self.stats['paused'], 2),
+            'baseline_ttfb': round(self.baseline, 4) if self.baseline is not None else None
+        }
+
+    def report_to(self, telemetry):
+        """Copy the run's concurrency figures into a CrawlTelemetry's meta"""
+        summary = self.summary()
+        telemetry.meta['concurrency'] = f"{summary['mean_limit']:.1f} avg/{summary['peak']:.0f} peak"
+        telemetry.meta['backoffs'] = summary['decreases']
+        if summary['paused']:
+            telemetry.meta['retry_after_paused'] = f"{summary['paused']:.1f}s"
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
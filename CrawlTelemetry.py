@@ -0,0 +1,258 @@
+import cProfile
+import glob
+import heapq
+import io
+import json
+import logging
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.path.join(SCRIPT_DIR, 'crawl_reports')
+PHASES = ('dns', 'connect', 'ttfb', 'download')
+SLOWEST = 10
+MAX_ERRORS = 50
+PROFILE_LINES = 20
+# A stage this much slower than the previous run is flagged in the comparison
+REGRESSION = 0.2
+
+# Per-process profiler for parse workers when profiling is on
+_worker_profile = None
+
+
+def timed_call(fn, *args):
+    """(fn(*args), seconds); runs in pool workers so the parse time excludes queueing"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def profiled_call(profile_dir, fn, *args):
+    """timed_call under this worker's cProfile, dumped to profile_dir/<pid>.prof after each call"""
+    global _worker_profile
+    if _worker_profile is None:
+        _worker_profile = cProfile.Profile()
+    start = time.perf_counter()
+    _worker_profile.enable()
+    try:
+        result = fn(*args)
+    finally:
+        _worker_profile.disable()
+    elapsed = time.perf_counter() - start
+    _worker_profile.dump_stats(os.path.join(profile_dir, f"{os.getpid()}.prof"))
+    return result, elapsed
+
+
+class CrawlTelemetry:
+    """Where a scraper run's time went, written as a JSON run report.
+
+    HttpClient reports each request's DNS/connect/TTFB/download split, size, status,
+    retries and errors; the scraper times its own stages (parse, write, ...). Phase and
+    stage times are summed over requests/calls, so with concurrent fetches they add up
+    to more than the wall clock.
+    """
+
+    def __init__(self, scraper, profile=False):
+        self.scraper = scraper
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.stages = defaultdict(lambda: [0.0, 0])
+        self.counters = defaultdict(int)
+        self.statuses = defaultdict(int)
+        self.slowest = []
+        self.errors = []
+        self.meta = {}
+        self.profile_dir = tempfile.mkdtemp(prefix='crawl-profile-') if profile else None
+        # MajorRequirementScrape records from several fetch threads
+        self._lock = threading.Lock()
+
+    def record_request(self, url, timings, size=0, status=None, retries=0, error=None):
+        """One network fetch; timings maps PHASES (any may be missing) plus 'total' to seconds"""
+        with self._lock:
+            self.counters['requests'] += 1
+            self.counters['bytes'] += size
+            self.counters['retries'] += retries
+            for phase in PHASES:
+                self.phases[phase] += timings.get(phase) or 0.0
+            if status is not None:
+                self.statuses[str(status)] += 1
+            if error is not None or (status is not None and status >= 400):
+                self.counters['errors'] += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append({'url': url, 'status': status, 'error': error})
+            entry = (timings.get('total', 0.0), url, {k: round(v, 4) for k, v in timings.items() if v is not None})
+            if len(self.slowest) < SLOWEST:
+                heapq.heappush(self.slowest, entry)
+            elif entry[0] > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def record_cache_hit(self, url, size):
+        self.counters['cache_hits'] += 1
+        self.counters['cached_bytes'] += size
+
+    def record_retry(self, url, delay):
+        """A retry the client is about to sleep `delay` seconds for"""
+        self.add_stage('backoff', delay)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def add_stage(self, name, seconds, calls=1):
+        stage = self.stages[name]
+        stage[0] += seconds
+        stage[1] += calls
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def profile_stats(self):
+        """Merged parse-worker profiles, or None"""
+        files = glob.glob(os.path.join(self.profile_dir, '*.prof')) if self.profile_dir else []
+        return pstats.Stats(*files) if files else None
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            'scraper': self.scraper,
+            'started_at': self.started_at,
+            'elapsed': round(elapsed, 3),
+            'meta': self.meta,
+            'counters': dict(self.counters),
+            'statuses': dict(self.statuses),
+            'phases': {phase: round(seconds, 3) for phase, seconds in self.phases.items()},
+            'stages': {name: {'seconds': round(seconds, 3), 'calls': calls}
+                       for name, (seconds, calls) in sorted(self.stages.items())},
+            'slowest': [{'url': url, 'seconds': round(total, 4), 'timings': timings}
+                        for total, url, timings in sorted(self.slowest, reverse=True)],
+            'errors': self.errors
+        }
+
+    def write(self, directory=REPORT_DIR):
+        """Write the run report (and merged parse profile, if any); returns the report path"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        path = os.path.join(directory, f"{self.scraper}-{stamp}.json")
+        report = self.report()
+        stats = self.profile_stats()
+        if stats is not None:
+            profile_path = path[:-len('.json')] + '.parse.prof'
+            stats.dump_stats(profile_path)
+            report['profile'] = {'file': os.path.basename(profile_path), 'top': top_functions(stats)}
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Crawl report written to {path}")
+        return path
+
+
+def top_functions(stats, limit=PROFILE_LINES):
+    """[{'function', 'calls', 'tottime', 'cumtime'}] by cumulative time"""
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.basename(filename)}:{line}({name})", 'calls': calls,
+                     'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)})
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+def load_report(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def previous_report(path, directory=REPORT_DIR):
+    """The report of the same scraper's run before `path`, or None"""
+    report = load_report(path)
+    runs = sorted(glob.glob(os.path.join(directory, f"{report['scraper']}-*.json")))
+    earlier = [run for run in runs if os.path.basename(run) < os.path.basename(path)]
+    return earlier[-1] if earlier else None
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+
+def summary(report, previous=None):
+    """Human-readable summary of a run report, with changes against `previous` if given"""
+    c = report['counters']
+    out = io.StringIO()
+    when = time.strftime('%Y-%m-%d %H:%M', time.localtime(report['started_at']))
+    meta = ', '.join(f"{key} {value}" for key, value in report.get('meta', {}).items())
+    print(f"{report['scraper']} run {when}: {report['elapsed']:.1f}s{f' ({meta})' if meta else ''}", file=out)
+    print(f"  requests {c.get('requests', 0)}, cache hits {c.get('cache_hits', 0)}, "
+          f"revalidated {c.get('revalidated', 0)}, {format_bytes(c.get('bytes', 0))} downloaded, "
+          f"retries {c.get('retries', 0)}, errors {c.get('errors', 0)}", file=out)
+    if report['statuses']:
+        print(f"  statuses {dict(sorted(report['statuses'].items()))}", file=out)
+    print("  network  " + '  '.join(f"{phase} {seconds:.2f}s" for phase, seconds in report['phases'].items())
+          + "  (summed over requests)", file=out)
+    for name, stage in report['stages'].items():
+        print(f"  {name:<14} {stage['seconds']:>9.2f}s over {stage['calls']} calls", file=out)
+    if report['slowest']:
+        print("  slowest:", file=out)
+        for entry in report['slowest'][:5]:
+            print(f"    {entry['seconds']:>7.2f}s {entry['url']}", file=out)
+    for error in report['errors'][:5]:
+        print(f"  error: {error['url']} {error['status'] or ''} {error['error'] or ''}".rstrip(), file=out)
+    if report.get('profile'):
+        print(f"  parse profile ({report['profile']['file']}), by cumulative time:", file=out)
+        for row in report['profile']['top'][:8]:
+            print(f"    {row['cumtime']:>8.3f}s {row['calls']:>8} {row['function']}", file=out)
+
+    if previous:
+        print(f"  vs previous run ({time.strftime('%Y-%m-%d %H:%M', time.localtime(previous['started_at']))}):",
+              file=out)
+        rows = [('elapsed', previous['elapsed'], report['elapsed'])]
+        rows += [(phase, previous['phases'].get(phase, 0.0), seconds) for phase, seconds in report['phases'].items()]
+        rows += [(name, previous['stages'].get(name, {}).get('seconds', 0.0), stage['seconds'])
+                 for name, stage in report['stages'].items()]
+        for name, before, after in rows:
+            change = (after - before) / before if before else 0.0
+            flag = '  <-- slower' if before and change > REGRESSION else ''
+            print(f"    {name:<14} {before:>9.2f}s -> {after:>9.2f}s ({change:+.0%}){flag}", file=out)
+    return out.getvalue().rstrip()
+
+
+def report_run(telemetry, directory=REPORT_DIR):
+    """Write a finished run's report and print its summary against the previous run"""
+    path = telemetry.write(directory)
+    previous = previous_report(path, directory)
+    print(summary(load_report(path), load_report(previous) if previous else None))
+    return path
+
+
+def main():
+    """python CrawlTelemetry.py [report.json]: summarize a run (default: the latest) against the one before"""
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        runs = sorted(glob.glob(os.path.join(REPORT_DIR, '*.json')), key=os.path.getmtime)
+        if not runs:
+            print(f"No crawl reports in {REPORT_DIR}")
+            return
+        path = runs[-1]
+    previous = previous_report(path, os.path.dirname(os.path.abspath(path)))
+    print(summary(load_report(path), load_report(previous) if previous else None))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from CatalogUtils import course_level, parse_course_codes
+from PrereqGraph import format_requirement, iter_bits
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAM_DIR = os.path.join(SCRIPT_DIR, 'programs')
+# Units assumed for a course the catalog doesn't list this term
+DEFAULT_UNITS = 3.0
+MAX_SUGGESTIONS = 8
+
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+PATTERN = re.compile(r'\b([A-Z]{2,5})\s*(\d)XX\b|\b([A-Z]{2,5})\s*(\d{3})\+')
+
+
+def parse_program(text):
+    """Program text -> {'name', 'requirements': [...]}.
+
+    One requirement per line, in the calendar's own phrasing:
+        all of: CMPT 225, MACM 101           every listed course
+        one of / 2 of: CMPT 310, CMPT 320    that many of the listed courses
+        15 units from: CMPT 4xx, MATH 308    units from courses or patterns (CMPT 4xx, CMPT 300+)
+        45 units at 300-level or above       units at a level, any department
+        total 120 units                      units overall
+    """
+    program = {'name': None, 'requirements': []}
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        lowered = line.lower()
+        if lowered.startswith('name:'):
+            program['name'] = line.split(':', 1)[1].strip()
+            continue
+        match = re.fullmatch(r'total\s+(\d+(?:\.\d+)?)\s+units', lowered)
+        if match:
+            program['requirements'].append({'kind': 'total', 'units': float(match.group(1)), 'label': line})
+            continue
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)\s+units\s+at\s+([1-8])00-level\s+or\s+above', lowered)
+        if match:
+            program['requirements'].append({'kind': 'level', 'units': float(match.group(1)),
+                                            'level': int(match.group(2)) * 100, 'label': line})
+            continue
+        head, _, courses = line.partition(':')
+        head = head.strip().lower()
+        codes = parse_course_codes(PATTERN.sub('', courses.upper()))
+        patterns = [f"{m.group(1)}{m.group(2)}xx" if m.group(1) else f"{m.group(3)}{m.group(4)}+"
+                    for m in PATTERN.finditer(courses.upper())]
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)\s+units\s+from', head)
+        if match:
+            program['requirements'].append({'kind': 'units', 'units': float(match.group(1)), 'codes': codes,
+                                            'patterns': patterns, 'label': line})
+            continue
+        if head == 'all of':
+            program['requirements'].append({'kind': 'choose', 'count': len(codes), 'codes': codes, 'label': line})
+            continue
+        match = re.fullmatch(r'(\d+|one|two|three|four|five|six)\s+of', head)
+        if match:
+            count = NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+            program['requirements'].append({'kind': 'choose', 'count': count, 'codes': codes, 'label': line})
+            continue
+        raise ValueError(f"Line {number}: can't read requirement '{line}'")
+    return program
+
+
+def pattern_matches(pattern, code):
+    """'CMPT4xx' or 'CMPT300+' against 'CMPT 412'"""
+    dept, _, number = code.partition(' ')
+    if not pattern.startswith(dept) or not number[:3].isdigit():
+        return False
+    rest = pattern[len(dept):]
+    if rest.endswith('xx'):
+        return rest[0] == number[0]
+    return rest.endswith('+') and int(number[:3]) >= int(rest[:-1])
+
+
+def load_program(name_or_path):
+    path = name_or_path if os.path.exists(name_or_path) else os.path.join(PROGRAM_DIR, f"{name_or_path}.txt")
+    with open(path, 'r', encoding='utf-8') as f:
+        program = parse_program(f.read())
+    program['id'] = os.path.splitext(os.path.basename(path))[0]
+    program['name'] = program['name'] or program['id']
+    return program
+
+
+def available_programs():
+    if not os.path.isdir(PROGRAM_DIR):
+        return []
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(PROGRAM_DIR)
+                  if name.endswith('.txt') and not name.endswith('-plan.txt'))
+
+
+def parse_plan(text):
+    """'completed: CMPT 120, ...' then one '<term>: courses' line per planned term, in order"""
+    plan = {'completed': [], 'terms': []}
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        label, _, courses = line.partition(':') if ':' in line else ('planned', '', line)
+        codes = parse_course_codes(courses)
+        if label.strip().lower() in ('completed', 'done', 'taken'):
+            plan['completed'].extend(code for code in codes if code not in plan['completed'])
+        else:
+            plan['terms'].append((label.strip(), codes))
+    return plan
+
+
+class DegreePlanner:
+    """Checks plans against programs using the prerequisite graph's course ids as bitsets.
+
+    Every course set a program mentions (listed courses, CMPT 4xx patterns, level
+    thresholds) is compiled once to an int bitset over PrereqGraph ids, so checking a
+    plan is ANDs, popcounts and unit sums over the handful of courses in it.
+    """
+
+    def __init__(self, course_descriptions, graph):
+        self.graph = graph
+        # The graph's ids, extended (here only) for plan codes the catalog and prerequisites never mention
+        self.codes = list(graph.codes)
+        self.ids = dict(graph.ids)
+        self.units = [(course_descriptions.get(code) or {}).get('credits') or DEFAULT_UNITS for code in self.codes]
+        self.offered = graph.course_set(course_descriptions)
+        self.levels = {}
+        for node_id, code in enumerate(self.codes):
+            level = course_level(code)
+            if level:
+                self.levels[level] = self.levels.get(level, 0) | (1 << node_id)
+        self.compiled = {}
+
+    def _id(self, code):
+        node_id = self.ids.get(code)
+        if node_id is None:
+            node_id = len(self.codes)
+            self.ids[code] = node_id
+            self.codes.append(code)
+            self.units.append(DEFAULT_UNITS)
+            level = course_level(code)
+            if level:
+                self.levels[level] = self.levels.get(level, 0) | (1 << node_id)
+        return node_id
+
+    def course_bits(self, codes):
+        bits = 0
+        for code in codes:
+            bits |= 1 << self._id(code)
+        return bits
+
+    def at_or_above(self, level):
+        bits = 0
+        for course_level_value, level_bits in self.levels.items():
+            if course_level_value >= level:
+                bits |= level_bits
+        return bits
+
+    def pattern_bits(self, pattern, candidates=None):
+        """Bitset of the courses (catalog ones by default) matching 'CMPT4xx' or 'CMPT300+'"""
+        bits = 0
+        for node_id in iter_bits(self.offered if candidates is None else candidates):
+            if pattern_matches(pattern, self.codes[node_id]):
+                bits |= 1 << node_id
+        return bits
+
+    def requirement_bits(self, requirement, bits, extra):
+        """A compiled requirement's bitset plus the plan's courses outside the catalog that fit it"""
+        if not extra:
+            return bits
+        if requirement['kind'] == 'level':
+            return bits | (self.at_or_above(requirement['level']) & extra)
+        for pattern in requirement.get('patterns', []):
+            bits |= self.pattern_bits(pattern, extra)
+        return bits
+
+    def compile(self, program):
+        """Requirement bitsets for a program, built once per program"""
+        key = program['id'] if 'id' in program else id(program)
+        if key in self.compiled:
+            return self.compiled[key]
+        compiled = []
+        for requirement in program['requirements']:
+            bits = 0
+            if requirement['kind'] in ('choose', 'units'):
+                bits = self.course_bits(requirement['codes'])
+                for pattern in requirement.get('patterns', []):
+                    bits |= self.pattern_bits(pattern)
+            elif requirement['kind'] == 'level':
+                bits = self.at_or_above(requirement['level'])
+            compiled.append((requirement, bits))
+        self.compiled[key] = compiled
+        return compiled
+
+    def unit_sum(self, bits):
+        return sum(self.units[i] for i in iter_bits(bits))
+
+    def code_list(self, bits):
+        return sorted(self.codes[i] for i in iter_bits(bits))
+
+    def satisfied(self, node, taken):
+        """Whether a PrereqGraph requirement tree is met by the courses in `taken`"""
+        if node is None:
+            return True
+        if 'course' in node:
+            # Prerequisites name writing-designated sections ('CMPT 105W'); the catalog lists 'CMPT 105'
+            code = node['course']
+            node_id = self.ids.get(code.rstrip('WQB') if code[-1:].isalpha() else code)
+            return node_id is not None and bool(taken >> node_id & 1)
+        results = (self.satisfied(arg, taken) for arg in node['args'])
+        return all(results) if node['op'] == 'and' else any(results)
+
+    def validate(self, program, plan):
+        """Requirement-by-requirement status, prerequisite order problems and totals for a plan.
+
+        A course counts toward at most one course-list requirement (the first it fits,
+        in program order); unit totals and level minimums count every course.
+        """
+        completed = self.course_bits(plan['completed'])
+        taken = completed
+        order_issues = []
+        for label, codes in plan['terms']:
+            term_bits = self.course_bits(codes)
+            for code in codes:
+                expr = self.graph.prereq_expr.get(code)
+                if expr and not self.satisfied(expr, taken):
+                    order_issues.append({'term': label, 'course': code, 'requires': format_requirement(expr)})
+            taken |= term_bits
+
+        used = 0
+        results = []
+        extra = taken & ~self.offered
+        for requirement, bits in self.compile(program):
+            bits = self.requirement_bits(requirement, bits, extra)
+            kind = requirement['kind']
+            result = {'label': requirement['label'], 'kind': kind}
+            if kind == 'choose':
+                have = taken & bits & ~used
+                count = bin(have).count('1')
+                if count > requirement['count']:
+                    # Keep the first `count` so the extras stay free for later requirements
+                    have = sum(1 << i for i in sorted(iter_bits(have))[:requirement['count']])
+                    count = requirement['count']
+                used |= have
+                result.update(met=count >= requirement['count'], have=self.code_list(have),
+                              missing=requirement['count'] - count, options=self.code_list(bits & ~taken))
+            elif kind == 'units':
+                have = taken & bits & ~used
+                units = self.unit_sum(have)
+                used |= have
+                result.update(met=units >= requirement['units'], have=self.code_list(have),
+                              missing=max(requirement['units'] - units, 0.0), options=self.code_list(bits & ~taken))
+            elif kind == 'level':
+                units = self.unit_sum(taken & bits)
+                result.update(met=units >= requirement['units'], have=self.code_list(taken & bits),
+                              missing=max(requirement['units'] - units, 0.0), options=[])
+            else:
+                units = self.unit_sum(taken)
+                result.update(met=units >= requirement['units'], have=[],
+                              missing=max(requirement['units'] - units, 0.0), options=[])
+            results.append(result)
+
+        return {
+            'program': program['name'],
+            'met': all(result['met'] for result in results),
+            'units': self.unit_sum(taken),
+            'requirements': results,
+            'order_issues': order_issues,
+            'not_offered': self.code_list(taken & ~self.offered & ~completed),
+            'taken': taken
+        }
+
+    def suggest(self, program, validation, limit=MAX_SUGGESTIONS):
+        """Courses that would close unmet requirements, those takeable now first.
+
+        Among them, courses that lead to more of the still-needed courses rank higher.
+        """
+        taken = validation['taken']
+        needed = 0
+        reasons = {}
+        for (requirement, bits), result in zip(self.compile(program), validation['requirements']):
+            if result['met'] or requirement['kind'] not in ('choose', 'units'):
+                continue
+            open_bits = bits & ~taken & self.offered
+            needed |= open_bits
+            for node_id in iter_bits(open_bits):
+                reasons.setdefault(node_id, requirement['label'])
+
+        ranked = []
+        for node_id in iter_bits(needed):
+            eligible = self.satisfied(self.graph.prereq_expr.get(self.codes[node_id]), taken)
+            leads_to = bin(self.graph.unlocks[node_id] & needed).count('1')
+            ranked.append((not eligible, -leads_to, self.codes[node_id], node_id, eligible))
+        ranked.sort()
+        return [{'course': code, 'eligible': eligible, 'for': reasons[node_id]}
+                for _, _, code, node_id, eligible in ranked[:limit]]
+
+
+def format_validation(validation, suggestions):
+    lines = [f"{validation['program']}: {'all requirements met' if validation['met'] else 'requirements outstanding'} "
+             f"({validation['units']:g} units)"]
+    for result in validation['requirements']:
+        mark = 'x' if result['met'] else ' '
+        detail = ''
+        if not result['met']:
+            detail = (f" - need {result['missing']:g} more" +
+                      (f" units" if result['kind'] != 'choose' else ''))
+        have = f" [{', '.join(result['have'])}]" if result['have'] and result['kind'] != 'level' else ''
+        lines.append(f"  [{mark}] {result['label']}{detail}{have}")
+    for issue in validation['order_issues']:
+        lines.append(f"  ! {issue['term']}: {issue['course']} requires {issue['requires']}")
+    if validation['not_offered']:
+        lines.append(f"  ? not in this term's catalog (counted as {DEFAULT_UNITS:g} units): "
+                     f"{', '.join(validation['not_offered'])}")
+    if suggestions:
+        lines.append("  Suggested next:")
+        for suggestion in suggestions:
+            when = 'now' if suggestion['eligible'] else 'after prerequisites'
+            lines.append(f"    {suggestion['course']:<9} ({when}) for {suggestion['for']}")
+    return '\n'.join(lines)
+
+
+def main():
+    """python DegreePlanner.py <program name or file> <plan file> [rounds]"""
+    logging.basicConfig(level=logging.WARNING)
+    from PrereqGraph import PrereqGraph
+    from TermStore import TermCatalogStore
+
+    program = load_program(sys.argv[1] if len(sys.argv) > 1 else 'cmpt-major')
+    plan_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(PROGRAM_DIR, 'cmpt-sample-plan.txt')
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = parse_plan(f.read())
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    course_descriptions = TermCatalogStore().current()['course_descriptions']
+    start = time.perf_counter()
+    graph = PrereqGraph.build(course_descriptions)
+    planner = DegreePlanner(course_descriptions, graph)
+    planner.compile(program)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        validation = planner.validate(program, plan)
+        suggestions = planner.suggest(program, validation)
+    per_check = (time.perf_counter() - start) / rounds
+
+    print(format_validation(validation, suggestions))
+    print(f"\nGraph and planner built in {setup * 1000:.0f} ms (once per catalog load); "
+          f"validate + suggest: {per_check * 1000:.3f} ms")
+    if '--json' in sys.argv:
+        print(json.dumps({k: v for k, v in validation.items() if k != 'taken'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
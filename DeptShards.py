@@ -0,0 +1,230 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+from TermStore import CURRENT_TERM, TERM_DIR, catalog_path, load_catalog, parse_term, process_course_batch
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+# Every department's uncompressed shard back to back, so a reader can seek (or Range-request) one
+BUNDLE = 'departments.bin'
+ENCODINGS = ('br', 'gzip')
+
+
+def shard_dir(term):
+    return os.path.join(TERM_DIR, f"{term}-shards")
+
+
+def brotli_module():
+    """The brotli package if installed; shards are written without .br variants otherwise"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def compress(raw, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(raw, compresslevel=9, mtime=0)
+    brotli = brotli_module()
+    return brotli.compress(raw, quality=11) if brotli else None
+
+
+def write_bytes(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def department_shards(courses):
+    """{dept: (canonical JSON bytes of {course_code: info}, course count)}, in the bot's course_descriptions shape"""
+    by_dept = {}
+    for code, info in sorted(process_course_batch(courses).items()):
+        by_dept.setdefault(code.split()[0], {})[code] = info
+    return {dept: (json.dumps(entries, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                   len(entries))
+            for dept, entries in sorted(by_dept.items())}
+
+
+def write_shards(term, courses, version=None, directory=None):
+    """Write one shard per department plus .gz/.br variants, the bundle and the manifest.
+
+    A shard whose hash matches the previous manifest keeps its files, so a re-scrape only
+    recompresses the departments that changed. Returns the manifest.
+    """
+    directory = directory or shard_dir(term)
+    os.makedirs(directory, exist_ok=True)
+    previous = (read_manifest(directory) or {}).get('departments', {})
+    encodings = [e for e in ENCODINGS if e != 'br' or brotli_module()]
+    if 'br' not in encodings:
+        logger.warning("brotli is not installed; writing gzip variants only")
+
+    departments = {}
+    bundle = bytearray()
+    rewritten = 0
+    for dept, (raw, count) in department_shards(courses).items():
+        digest = hashlib.sha256(raw).hexdigest()
+        entry = {
+            'file': f"{dept}.json",
+            'sha256': digest,
+            'bytes': len(raw),
+            'offset': len(bundle),
+            'courses': count,
+            'encodings': {}
+        }
+        old = previous.get(dept)
+        unchanged = old is not None and old['sha256'] == digest
+        if not unchanged:
+            write_bytes(os.path.join(directory, entry['file']), raw)
+            rewritten += 1
+        for encoding in encodings:
+            name = f"{entry['file']}.{'gz' if encoding == 'gzip' else encoding}"
+            if unchanged and encoding in old['encodings'] and os.path.exists(os.path.join(directory, name)):
+                entry['encodings'][encoding] = old['encodings'][encoding]
+                continue
+            packed = compress(raw, encoding)
+            write_bytes(os.path.join(directory, name), packed)
+            entry['encodings'][encoding] = {'file': name, 'bytes': len(packed)}
+        departments[dept] = entry
+        bundle += raw
+
+    for dept in previous.keys() - departments.keys():
+        for name in [previous[dept]['file']] + [e['file'] for e in previous[dept]['encodings'].values()]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    write_bytes(os.path.join(directory, BUNDLE), bytes(bundle))
+    manifest = {
+        'term': term,
+        'version': version,
+        'created_at': int(time.time()),
+        'bundle': BUNDLE,
+        'departments': departments
+    }
+    write_bytes(os.path.join(directory, MANIFEST),
+                json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    logger.info(f"{term}: wrote {len(departments)} department shards ({rewritten} changed) to {directory}")
+    return manifest
+
+
+def build_from_file(term, path):
+    """Shard a catalog file, tagged with the same version the bot computes for it"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return write_shards(term, json.loads(raw), hashlib.sha1(raw).hexdigest()[:12])
+
+
+def build_from_catalog(term):
+    return build_from_file(term, catalog_path(term))
+
+
+class ShardReader:
+    """Loads single departments from a shard directory, reading only the manifest and that shard"""
+
+    def __init__(self, directory, verify=True):
+        self.directory = directory
+        self.verify = verify
+        self.bytes_read = 0
+        path = os.path.join(directory, MANIFEST)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.bytes_read += len(raw)
+        self.manifest = json.loads(raw)
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    def departments(self):
+        return list(self.manifest['departments'])
+
+    def department(self, dept):
+        """{course_code: info} for one department, or None if there is no such shard"""
+        entry = self.manifest['departments'].get(dept.upper())
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, self.manifest['bundle']), 'rb') as f:
+            f.seek(entry['offset'])
+            raw = f.read(entry['bytes'])
+        self.bytes_read += len(raw)
+        if self.verify and hashlib.sha256(raw).hexdigest() != entry['sha256']:
+            raise ValueError(f"Shard {dept} does not match the manifest; rebuild the shards")
+        return json.loads(raw)
+
+
+def benchmark(term, dept, repeat=5):
+    """Bytes read and time to look up one department: monolithic catalog vs its shard"""
+    path = catalog_path(term)
+    directory = shard_dir(term)
+    if read_manifest(directory) is None:
+        build_from_catalog(term)
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    def monolithic():
+        catalog = load_catalog(path)
+        return {code: catalog['course_descriptions'][code] for code in catalog['departments'][dept]}
+
+    def sharded():
+        reader = ShardReader(directory)
+        return reader.department(dept), reader.bytes_read
+
+    mono_time, mono = best(monolithic)
+    shard_time, (shard, shard_bytes) = best(sharded)
+    if mono != shard:
+        raise AssertionError(f"Shard for {dept} differs from the monolithic catalog")
+
+    entry = read_manifest(directory)['departments'][dept]
+    manifest_bytes = os.path.getsize(os.path.join(directory, MANIFEST))
+    print(f"{dept} in {term}: {entry['courses']} courses")
+    print(f"{'source':<22} {'bytes read':>12} {'ms':>9}")
+    print(f"{'monolithic catalog':<22} {os.path.getsize(path):>12,} {mono_time * 1000:>9.2f}")
+    print(f"{'manifest + shard':<22} {shard_bytes:>12,} {shard_time * 1000:>9.2f}")
+    print(f"Over the wire: shard {entry['bytes']:,} bytes" + ''.join(
+        f", {encoding} {variant['bytes']:,}" for encoding, variant in entry['encodings'].items()
+    ) + f" (manifest {manifest_bytes:,}, fetched once)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-department catalog shards")
+    parser.add_argument('--term', default=CURRENT_TERM, help="e.g. 'Fall 2025' or 2025-fall")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help="Shard the term's catalog file")
+    bench = sub.add_parser('bench', help="Compare a one-department lookup against the full catalog")
+    bench.add_argument('dept', nargs='?', default='CMPT')
+    args = parser.parse_args()
+
+    term = parse_term(args.term) or args.term
+    if args.command == 'build':
+        manifest = build_from_catalog(term)
+        print(f"{len(manifest['departments'])} shards for {term} (version {manifest['version']}) in {shard_dir(term)}")
+    else:
+        benchmark(term, args.dept.upper())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
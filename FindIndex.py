@@ -0,0 +1,278 @@
+import logging
+import re
+import sys
+import time
+from collections import defaultdict
+
+from CatalogUtils import DAY_NAMES, course_level, lecture_sections, parse_campuses, parse_meetings
+
+logger = logging.getLogger(__name__)
+
+# Start/end times are bucketed into 5-minute slots, fine enough to be exact for SFU's schedules
+SLOT_MINUTES = 5
+SLOTS = 24 * 60 // SLOT_MINUTES
+# Ratings are bucketed to one decimal place, as RateMyProfessor reports them
+RATING_STEPS = 50
+CAMPUS_WORDS = ('Burnaby', 'Surrey', 'Vancouver', 'Online')
+TIME_PATTERN = r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?'
+
+
+def iter_bits(bitmap):
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def parse_rating(rating):
+    """'4.2/5.0' -> 4.2; None for N/A, Not Found and errors"""
+    try:
+        return float(str(rating['rating']).split('/')[0])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _clock_minutes(hour, minute, meridiem):
+    hour = int(hour) % 12 if meridiem else int(hour)
+    if meridiem and meridiem.startswith('p'):
+        hour += 12
+    elif not meridiem and 1 <= hour <= 7:
+        # "after 2" means 2 p.m.; nothing runs at 2 a.m.
+        hour += 12
+    return hour * 60 + int(minute or 0)
+
+
+def parse_find_query(text, known_departments=()):
+    """'Burnaby Tue/Thu after 2pm 3 credits 200-level CMPT rated >= 4' -> filters dict.
+
+    Campuses and departments are alternatives (any of them); days must all be met.
+    Departments count when typed in capitals, or spelled out in lower case if 4+ letters.
+    """
+    lowered = text.lower()
+    filters = {}
+    campuses = {c for c in CAMPUS_WORDS if re.search(rf'\b{c.lower()}\b', lowered)}
+    if campuses:
+        filters['campuses'] = campuses
+    days = {abbr for abbr, name in DAY_NAMES.items() if re.search(rf'\b({name}s?|{abbr.lower()})\b', lowered)}
+    if days:
+        filters['days'] = days
+    match = re.search(rf'\b(?:after|from|starting(?: at)?)\s+{TIME_PATTERN}', lowered)
+    if match:
+        filters['after'] = _clock_minutes(*match.groups())
+    match = re.search(rf'\b(?:before|by|until|ending(?: by)?)\s+{TIME_PATTERN}', lowered)
+    if match:
+        filters['before'] = _clock_minutes(*match.groups())
+    match = re.search(r'\b(\d(?:\.\d)?)[\s-]*(?:credit|unit|cr)s?\b', lowered)
+    if match:
+        filters['credits'] = float(match.group(1))
+    match = re.search(r'\b([1-8])(?:00[\s-]*level|xx)\b', lowered)
+    if match:
+        filters['level'] = int(match.group(1)) * 100
+    match = re.search(r'\b(?:rated|rating)\s*(?:>=|≥|>|at least|over|above|of)?\s*(\d(?:\.\d)?)', lowered)
+    if match:
+        filters['min_rating'] = float(match.group(1))
+    known = set(known_departments)
+    depts = {word.upper() for word in re.findall(r'\b[A-Za-z]{2,5}\b', text)
+             if word.upper() in known and (word.isupper() or len(word) >= 4)}
+    if depts:
+        filters['depts'] = depts
+    return filters
+
+
+def describe_filters(filters):
+    """Filters back as a short phrase for titles: 'Burnaby · Tue/Thu · after 14:00 · 3 credits'"""
+    parts = []
+    if 'depts' in filters:
+        parts.append('/'.join(sorted(filters['depts'])))
+    if 'campuses' in filters:
+        parts.append('/'.join(sorted(filters['campuses'])))
+    if 'days' in filters:
+        parts.append('/'.join(day for day in DAY_NAMES if day in filters['days']))
+    for name, label in (('after', 'after'), ('before', 'ending by')):
+        if name in filters:
+            parts.append(f"{label} {filters[name] // 60}:{filters[name] % 60:02d}")
+    if 'credits' in filters:
+        parts.append(f"{filters['credits']:g} credits")
+    if 'level' in filters:
+        parts.append(f"{filters['level']}-level")
+    if 'min_rating' in filters:
+        parts.append(f"rated ≥ {filters['min_rating']:g}")
+    return ' · '.join(parts)
+
+
+class FindIndex:
+    """Bitmap indexes over every lecture section for attribute filters.
+
+    Each row is one lecture section (or one placeholder row for a course with none), and
+    each attribute value maps to a Python int with bit i set when row i has it. A query is
+    a handful of ANDs/ORs over ints of a few thousand bits; matching rows are mapped back
+    to their courses at the end. Time filters use cumulative bitmaps ("starts at or after
+    slot s", "ends by slot s") so a range is a single lookup.
+    """
+
+    def __init__(self, course_descriptions):
+        self.rows = []
+        self.campus = defaultdict(int)
+        self.day = defaultdict(int)
+        self.credits = defaultdict(int)
+        self.level = defaultdict(int)
+        self.dept = defaultdict(int)
+        self.instructor = defaultdict(int)
+        starts = [0] * SLOTS
+        ends = [0] * (SLOTS + 1)
+
+        for code, info in sorted(course_descriptions.items()):
+            dept = code.split()[0]
+            for section in lecture_sections(info['sections']) or [None]:
+                bit = 1 << len(self.rows)
+                self.rows.append((code, section))
+                self.dept[dept] |= bit
+                self.credits[info.get('credits')] |= bit
+                self.level[course_level(code)] |= bit
+                if section is None:
+                    continue
+                for campus in parse_campuses(section['location']):
+                    self.campus[campus] |= bit
+                meetings = parse_meetings(section['day/time'])
+                for days, _, _ in meetings:
+                    for day in days:
+                        self.day[day] |= bit
+                times = [(start, end) for _, start, end in meetings if start is not None]
+                if times:
+                    starts[min(start for start, _ in times) // SLOT_MINUTES] |= bit
+                    ends[-(-max(end for _, end in times) // SLOT_MINUTES)] |= bit
+                if section['instructor']:
+                    self.instructor[section['instructor']] |= bit
+
+        self.all = (1 << len(self.rows)) - 1
+        # starts_from[s]: earliest meeting starts in slot s or later; ends_by[s]: last one ends by slot s
+        self.starts_from = starts[:] + [0]
+        for slot in range(SLOTS - 1, -1, -1):
+            self.starts_from[slot] |= self.starts_from[slot + 1]
+        self.ends_by = ends[:]
+        for slot in range(1, SLOTS + 1):
+            self.ends_by[slot] |= self.ends_by[slot - 1]
+        self.rated_at_least = [0] * (RATING_STEPS + 1)
+        self.ratings = {}
+
+    def set_rating(self, name, rating):
+        """Record an instructor's rating (as a number, or None if unknown)"""
+        if name not in self.instructor or self.ratings.get(name) == rating:
+            return
+        rows = self.instructor[name]
+        for step in range(RATING_STEPS + 1):
+            self.rated_at_least[step] &= ~rows
+        self.ratings[name] = rating
+        if rating is not None:
+            for step in range(min(int(round(rating * 10)), RATING_STEPS) + 1):
+                self.rated_at_least[step] |= rows
+
+    def query(self, filters, rated=True):
+        """Bitmap of rows matching every filter; rated=False leaves out the rating filter"""
+        result = self.all
+        for name, index in (('campuses', self.campus), ('depts', self.dept)):
+            if name in filters:
+                alternatives = 0
+                for value in filters[name]:
+                    alternatives |= index.get(value, 0)
+                result &= alternatives
+        for day in filters.get('days', ()):
+            result &= self.day.get(day, 0)
+        if 'credits' in filters:
+            result &= self.credits.get(filters['credits'], 0)
+        if 'level' in filters:
+            result &= self.level.get(filters['level'], 0)
+        if 'after' in filters:
+            result &= self.starts_from[min(-(-filters['after'] // SLOT_MINUTES), SLOTS)]
+        if 'before' in filters:
+            result &= self.ends_by[min(filters['before'] // SLOT_MINUTES, SLOTS)]
+        if rated and 'min_rating' in filters:
+            result &= self.rated_at_least[min(int(round(filters['min_rating'] * 10)), RATING_STEPS)]
+        return result
+
+    def unrated_instructors(self, bitmap):
+        """Instructors of the matching rows whose rating has not been recorded yet"""
+        names = []
+        for row in iter_bits(bitmap):
+            section = self.rows[row][1]
+            name = section and section['instructor']
+            if name and name not in self.ratings and name not in names:
+                names.append(name)
+        return names
+
+    def matches(self, bitmap):
+        """{course_code: [matching sections]} in course order"""
+        courses = {}
+        for row in iter_bits(bitmap):
+            code, section = self.rows[row]
+            courses.setdefault(code, [])
+            if section is not None:
+                courses[code].append(section)
+        return courses
+
+
+def naive_find(course_descriptions, filters, ratings):
+    """The same query answered by rescanning and reparsing every section"""
+    results = {}
+    for code, info in sorted(course_descriptions.items()):
+        if 'depts' in filters and code.split()[0] not in filters['depts']:
+            continue
+        if 'credits' in filters and info.get('credits') != filters['credits']:
+            continue
+        if 'level' in filters and course_level(code) != filters['level']:
+            continue
+        for section in lecture_sections(info['sections']):
+            if 'campuses' in filters and not set(parse_campuses(section['location'])) & filters['campuses']:
+                continue
+            meetings = parse_meetings(section['day/time'])
+            days = {day for meeting_days, _, _ in meetings for day in meeting_days}
+            if not filters.get('days', set()) <= days:
+                continue
+            times = [(start, end) for _, start, end in meetings if start is not None]
+            if 'after' in filters and not (times and min(s for s, _ in times) >= filters['after']):
+                continue
+            if 'before' in filters and not (times and max(e for _, e in times) <= filters['before']):
+                continue
+            if 'min_rating' in filters and (ratings.get(section['instructor']) or 0) < filters['min_rating']:
+                continue
+            results.setdefault(code, []).append(section)
+    return results
+
+
+def benchmark(query, rounds=200):
+    from TermStore import TermCatalogStore
+    import random
+
+    catalog = TermCatalogStore().current()
+    courses = catalog['course_descriptions']
+    start = time.perf_counter()
+    index = FindIndex(courses)
+    build = time.perf_counter() - start
+
+    # Ratings for everyone, as if the cache were warm
+    rng = random.Random(0)
+    ratings = {name: round(rng.uniform(1.5, 5.0), 1) for name in index.instructor}
+    for name, rating in ratings.items():
+        index.set_rating(name, rating)
+
+    filters = parse_find_query(query, catalog['departments'])
+    start = time.perf_counter()
+    for _ in range(rounds):
+        found = index.matches(index.query(filters))
+    indexed = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(max(rounds // 20, 1)):
+        expected = naive_find(courses, filters, ratings)
+    naive = (time.perf_counter() - start) / max(rounds // 20, 1)
+    if found != expected:
+        raise AssertionError("Bitmap and naive results differ")
+
+    print(f"Query: {query!r} -> {filters}")
+    print(f"{len(index.rows)} section rows; index built in {build * 1000:.1f} ms")
+    print(f"{len(found)} courses, {sum(map(len, found.values()))} sections")
+    print(f"bitmap: {indexed * 1000:.3f} ms   rescan: {naive * 1000:.1f} ms   ({naive / indexed:.0f}x)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    benchmark(' '.join(sys.argv[1:]) or 'Burnaby Tue/Thu after 2 pm 3 credits 200-level rated >= 4')
@@ -0,0 +1,423 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import re
+import time
+
+import numpy as np
+
+from GradeStats import GRADE_FILE, GRADE_TO_GPA, MAX_GPA, PRIOR_WEIGHT
+from TermStore import parse_term, term_sort_key
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GRADE_DIR = os.path.join(SCRIPT_DIR, 'grade_data')
+SAMPLE_DIR = os.path.join(GRADE_DIR, 'sample')
+# Where `ingest` writes by default; nothing reads it until SFU_GRADE_STORE points at it
+INGEST_PATH = os.path.join(GRADE_DIR, 'grades.npz')
+# The store the bot and API use, named explicitly so a test ingest (e.g. of the
+# synthetic sample) never replaces data.txt's real statistics by just existing
+STORE_PATH = os.environ.get('SFU_GRADE_STORE') or None
+
+# Histogram columns, best to worst; N (did not complete the course) counts as a fail like F
+GRADES = ('A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F', 'N')
+GRADE_POINTS = np.array([GRADE_TO_GPA.get(grade, 0.0) for grade in GRADES])
+FAILING = np.array([grade in ('F', 'N') for grade in GRADES])
+
+# Accepted spellings of each field in CSV headers and JSON keys
+ALIASES = {
+    'term': ('term', 'semester', 'session'),
+    'course': ('course', 'course_code', 'code'),
+    'dept': ('dept', 'subject', 'department'),
+    'number': ('number', 'course_number', 'catalog', 'catalog_number'),
+    'section': ('section', 'section_code'),
+    'instructor': ('instructor', 'professor', 'prof', 'instructors'),
+}
+
+
+def field(raw, name):
+    for alias in ALIASES[name]:
+        value = raw.get(alias)
+        if value not in (None, ''):
+            return str(value).strip()
+    return None
+
+
+def grade_counts(raw):
+    """Per-grade counts from a row's grade columns, or from a nested 'grades' mapping"""
+    source = raw.get('grades') if isinstance(raw.get('grades'), dict) else raw
+    source = {str(key).strip().upper(): value for key, value in source.items()}
+    counts = []
+    for grade in GRADES:
+        try:
+            counts.append(int(float(source.get(grade) or 0)))
+        except (TypeError, ValueError):
+            counts.append(0)
+    return counts
+
+
+def normalize_row(raw):
+    """A dataset row -> (term, course_code, section, instructor, counts), or None if unusable"""
+    raw = {str(key).strip().lower() if str(key).strip().upper() not in GRADES else str(key).strip().upper(): value
+           for key, value in raw.items()}
+    term = parse_term(field(raw, 'term') or '')
+    code = field(raw, 'course')
+    if code is None and field(raw, 'dept') and field(raw, 'number'):
+        code = f"{field(raw, 'dept')} {field(raw, 'number')}"
+    if not term or not code:
+        return None
+    code = ' '.join(code.upper().replace('-', ' ').split()[:2])
+    counts = grade_counts(raw)
+    if not sum(counts):
+        return None
+    return term, code, (field(raw, 'section') or '').upper(), field(raw, 'instructor') or 'Unknown', counts
+
+
+def read_dataset(path):
+    """Raw rows from a CSV or JSON file (a list of rows, or {'rows': [...]})"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+    elif path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        yield from data['rows'] if isinstance(data, dict) else data
+    else:
+        raise ValueError(f"Unsupported grade dataset {path}: expected .csv or .json")
+
+
+def dataset_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.csv'), recursive=True) +
+                                glob.glob(os.path.join(path, '**', '*.json'), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def group_sums(index, n_groups, counts):
+    """Histogram per group: counts summed over the rows in each group, one bincount per grade"""
+    return np.stack([np.bincount(index, weights=counts[:, g], minlength=n_groups)
+                     for g in range(counts.shape[1])], axis=1).astype(np.int64)
+
+
+def summarize(histograms, prior_gpa):
+    """Median grade index, fail rate, mean GPA and difficulty for each histogram row.
+
+    Difficulty (0 easy - 5 hard) comes from the mean GPA shrunk toward `prior_gpa`
+    by PRIOR_WEIGHT grades, so one small offering can't top the scale.
+    """
+    totals = histograms.sum(axis=1)
+    safe = np.maximum(totals, 1)
+    # The median is the first grade (best to worst) at which half the class is reached
+    cumulative = histograms.cumsum(axis=1)
+    median = np.argmax(cumulative * 2 >= totals[:, None], axis=1)
+    gpa = (histograms * GRADE_POINTS).sum(axis=1) / safe
+    fail = (histograms[:, FAILING]).sum(axis=1) / safe * 100
+    shrunk = (totals * gpa + PRIOR_WEIGHT * prior_gpa) / (totals + PRIOR_WEIGHT)
+    difficulty = np.round((MAX_GPA - shrunk) / MAX_GPA * 5, 1)
+    return {'total': totals, 'median': median.astype(np.int8), 'fail': fail, 'gpa': gpa, 'difficulty': difficulty}
+
+
+def ingest(paths, out=INGEST_PATH):
+    """Load grade datasets and write every aggregate the bot reads to one .npz file.
+
+    Rows are deduplicated on (term, course, section, instructor), later files winning.
+    """
+    rows = {}
+    skipped = 0
+    files = dataset_files(paths)
+    for path in files:
+        for raw in read_dataset(path):
+            row = normalize_row(raw)
+            if row is None:
+                skipped += 1
+                continue
+            rows[row[:4]] = row
+    if not rows:
+        raise ValueError(f"No usable grade rows in {', '.join(files) or 'the given paths'}")
+
+    terms_raw, codes_raw, sections, instructors_raw, counts = zip(*rows.values())
+    counts = np.array(counts, dtype=np.int32)
+    terms = sorted(set(terms_raw), key=term_sort_key)
+    term_of = {term: i for i, term in enumerate(terms)}
+    term_index = np.array([term_of[term] for term in terms_raw], dtype=np.int16)
+    codes, course_index = np.unique(np.array(codes_raw), return_inverse=True)
+    instructors, instructor_index = np.unique(np.array(instructors_raw), return_inverse=True)
+    depts, dept_of_course = np.unique(np.array([code.split()[0] for code in codes]), return_inverse=True)
+
+    overall = summarize(counts.sum(axis=0, keepdims=True).astype(np.int64), 0.0)['gpa'][0]
+    # Course difficulties shrink toward their department's mean GPA, instructors' toward everyone's
+    dept_gpa = summarize(group_sums(dept_of_course[course_index], len(depts), counts), overall)['gpa']
+
+    columns = {
+        'grades': np.array(GRADES), 'terms': np.array(terms), 'codes': codes, 'instructors': instructors,
+        'depts': depts, 'row_term': term_index, 'row_course': course_index.astype(np.int32),
+        'row_instructor': instructor_index.astype(np.int32), 'row_section': np.array(sections), 'row_counts': counts,
+    }
+    n_terms, n_instructors = len(terms), len(instructors)
+    groupings = {
+        'course': (course_index, None),
+        'instructor': (instructor_index, None),
+        'course_term': (course_index.astype(np.int64) * n_terms + term_index, n_terms),
+        'course_instructor': (course_index.astype(np.int64) * n_instructors + instructor_index, n_instructors),
+    }
+    for name, (keys, width) in groupings.items():
+        # Group keys sorted by course first, so one course's rows are a contiguous slice
+        unique_keys, index = np.unique(keys, return_inverse=True)
+        histograms = group_sums(index, len(unique_keys), counts)
+        if name == 'instructor':
+            prior = np.full(len(unique_keys), overall)
+        else:
+            course = unique_keys // width if width else unique_keys
+            prior = dept_gpa[dept_of_course[course]]
+            columns[f"{name}_course"] = course.astype(np.int32)
+        if width:
+            columns[f"{name}_other"] = (unique_keys % width).astype(np.int32)
+        columns[f"{name}_hist"] = histograms.astype(np.int32)
+        for stat, values in summarize(histograms, prior).items():
+            columns[f"{name}_{stat}"] = values
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp_path = f"{out}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp_path, out)
+    logger.info(f"Ingested {len(rows)} offerings ({skipped} rows skipped) from {len(files)} files: "
+                f"{len(codes)} courses, {n_instructors} instructors, {n_terms} terms -> {out}")
+    return GradeStore(columns)
+
+
+class GradeStore:
+    """Ingested grade distributions: raw offering rows plus precomputed aggregates.
+
+    Every statistic is computed at ingest; lookups only index into the arrays. Course-keyed
+    aggregates are sorted by course, so a course's terms or instructors are one slice.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.grades = [str(grade) for grade in columns['grades']]
+        self.terms = [str(term) for term in columns['terms']]
+        self.codes = columns['codes']
+        self.instructors = columns['instructors']
+        self.course_of = {str(code): i for i, code in enumerate(self.codes)}
+        self.instructor_of = {str(name): i for i, name in enumerate(self.instructors)}
+
+    @classmethod
+    def load(cls, path=STORE_PATH):
+        """The store at `path`, or None if none is configured or nothing has been ingested"""
+        if path is None:
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls({name: data[name] for name in data.files})
+        except FileNotFoundError:
+            logger.warning(f"Grade store not found: {path}")
+            return None
+
+    def stats(self, grouping, i):
+        c = self.columns
+        return {
+            'median_grade': self.grades[c[f"{grouping}_median"][i]],
+            'fail_percentage': float(c[f"{grouping}_fail"][i]),
+            'mean_gpa': round(float(c[f"{grouping}_gpa"][i]), 2),
+            'difficulty': float(c[f"{grouping}_difficulty"][i]),
+            'grades': int(c[f"{grouping}_total"][i]),
+        }
+
+    def course(self, course_code):
+        i = self.course_of.get(course_code)
+        return None if i is None else self.stats('course', i)
+
+    def instructor(self, name):
+        i = self.instructor_of.get(name)
+        return None if i is None else self.stats('instructor', i)
+
+    def _course_slice(self, grouping, course_code):
+        i = self.course_of.get(course_code)
+        if i is None:
+            return range(0)
+        courses = self.columns[f"{grouping}_course"]
+        return range(np.searchsorted(courses, i, 'left'), np.searchsorted(courses, i, 'right'))
+
+    def by_term(self, course_code):
+        """[(term, stats)] for a course, oldest term first"""
+        others = self.columns['course_term_other']
+        return [(self.terms[others[j]], self.stats('course_term', j)) for j in self._course_slice('course_term', course_code)]
+
+    def by_instructor(self, course_code):
+        """[(instructor, stats)] for a course, most grades first"""
+        others = self.columns['course_instructor_other']
+        rows = [(str(self.instructors[others[j]]), self.stats('course_instructor', j))
+                for j in self._course_slice('course_instructor', course_code)]
+        return sorted(rows, key=lambda row: -row[1]['grades'])
+
+    def course_table(self):
+        """(codes, medians, fail %, counts, difficulty) columns for GradeStats.GradeTable"""
+        c = self.columns
+        return ([str(code) for code in self.codes], [self.grades[m] for m in c['course_median']],
+                c['course_fail'], c['course_total'], c['course_difficulty'])
+
+
+def naive_aggregate(paths):
+    """Per-course medians, fail rates and GPAs by re-reading and looping in Python (for comparison)"""
+    histograms = {}
+    for path in dataset_files(paths):
+        for raw in read_dataset(path):
+            row = normalize_row(raw)
+            if row is None:
+                continue
+            totals = histograms.setdefault(row[1], [0] * len(GRADES))
+            for g, count in enumerate(row[4]):
+                totals[g] += count
+    results = {}
+    for code, histogram in histograms.items():
+        total = sum(histogram)
+        running, median = 0, None
+        for g, count in enumerate(histogram):
+            running += count
+            if median is None and running * 2 >= total:
+                median = GRADES[g]
+        gpa = sum(count * GRADE_TO_GPA.get(grade, 0.0) for grade, count in zip(GRADES, histogram)) / total
+        fail = sum(count for grade, count in zip(GRADES, histogram) if grade in ('F', 'N')) / total * 100
+        results[code] = (median, fail, gpa)
+    return results
+
+
+def sample_histogram(median, fail, size, rng):
+    """A plausible grade histogram for a class of `size` around a median letter and fail rate"""
+    passing = [grade for grade in GRADES if grade not in ('F', 'N')]
+    centre = passing.index(median) if median in passing else passing.index('B')
+    failures = round(size * fail / 100)
+    histogram = dict.fromkeys(GRADES, 0)
+    for _ in range(size - failures):
+        histogram[passing[min(max(round(rng.gauss(centre, 1.6)), 0), len(passing) - 1)]] += 1
+    histogram['F'] = failures - failures // 4
+    histogram['N'] = failures // 4
+    return histogram
+
+
+def write_sample(directory=SAMPLE_DIR, depts=('CMPT', 'MACM', 'MATH', 'STAT', 'PSYC', 'ENGL'), seed=0):
+    """Regenerate the sample corpus: synthetic offerings for a few departments' data.txt courses.
+
+    Instructors are placeholders and distributions are drawn around data.txt's medians and
+    fail rates; the corpus exists to exercise the ingest formats, not as real data.
+    """
+    rng = random.Random(seed)
+    courses = {}
+    with open(GRADE_FILE, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5 and parts[0] in depts and int(parts[4]) >= 20 and re.fullmatch(r'\d{3}', parts[1]):
+                courses.setdefault(f"{parts[0]} {parts[1]}", (parts[2].split('/')[0], float(parts[3])))
+    instructors = [f"Instructor {chr(ord('A') + i // 10)}{i % 10}" for i in range(40)]
+    offerings = []
+    for code, (median, fail) in sorted(courses.items()):
+        staff = rng.sample(instructors, 3)
+        for term in ('Fall 2024', 'Spring 2025', 'Summer 2025'):
+            for section in range(rng.choice((1, 1, 2))):
+                offerings.append({'term': term, 'course': code, 'section': f"D{section + 1}00",
+                                  'instructor': rng.choice(staff),
+                                  'grades': sample_histogram(median, fail, rng.randint(25, 180), rng)})
+
+    os.makedirs(directory, exist_ok=True)
+    # 2024 terms as a CSV export with one column per grade, 2025 as JSON with nested grade counts
+    with open(os.path.join(directory, 'grades-2024.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Semester', 'Subject', 'Catalog', 'Section', 'Instructor', *GRADES])
+        for offering in offerings:
+            if offering['term'].endswith('2024'):
+                dept, number = offering['course'].split()
+                writer.writerow([offering['term'], dept, number, offering['section'], offering['instructor'],
+                                 *(offering['grades'][grade] for grade in GRADES)])
+    with open(os.path.join(directory, 'grades-2025.json'), 'w', encoding='utf-8') as f:
+        json.dump({'rows': [offering for offering in offerings if offering['term'].endswith('2025')]}, f, indent=1)
+    return len(offerings)
+
+
+def benchmark(paths, rounds=20):
+    out = os.path.join(GRADE_DIR, f"bench-{os.getpid()}.npz")
+    try:
+        start = time.perf_counter()
+        store = ingest(paths, out)
+        ingest_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(rounds):
+            GradeStore.load(out)
+        load_time = (time.perf_counter() - start) / rounds
+        size = os.path.getsize(out)
+    finally:
+        if os.path.exists(out):
+            os.remove(out)
+    start = time.perf_counter()
+    expected = naive_aggregate(paths)
+    naive_time = time.perf_counter() - start
+
+    for code, (median, fail, gpa) in expected.items():
+        stats = store.course(code)
+        if stats['median_grade'] != median or abs(stats['fail_percentage'] - fail) > 1e-9 or abs(stats['mean_gpa'] - round(gpa, 2)) > 1e-9:
+            raise AssertionError(f"Store and naive aggregates differ for {code}")
+
+    codes = list(store.course_of)
+    start = time.perf_counter()
+    for code in codes:
+        store.course(code)
+        store.by_term(code)
+        store.by_instructor(code)
+    lookup_time = (time.perf_counter() - start) / len(codes)
+
+    print(f"{len(store.columns['row_counts'])} offerings, {len(codes)} courses, {len(store.instructors)} instructors, "
+          f"{len(store.terms)} terms; store {size / 1024:.1f} KB")
+    print(f"  ingest, all four groupings (once):  {ingest_time * 1000:8.1f} ms")
+    print(f"  load store (bot startup):           {load_time * 1000:8.2f} ms")
+    print(f"  recompute course stats from rows:   {naive_time * 1000:8.1f} ms per query (courses only)")
+    print(f"  store: course + terms + instructors {lookup_time * 1000:8.3f} ms per query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade-distribution ingest")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_cmd = commands.add_parser('ingest', help="Ingest CSV/JSON datasets (files or directories)")
+    ingest_cmd.add_argument('paths', nargs='+')
+    ingest_cmd.add_argument('--out', default=INGEST_PATH)
+    show = commands.add_parser('show', help="Per-term and per-instructor stats for a course")
+    show.add_argument('course', nargs='+')
+    show.add_argument('--store', default=STORE_PATH or INGEST_PATH)
+    commands.add_parser('sample', help="Regenerate the synthetic sample corpus in grade_data/sample")
+    bench = commands.add_parser('bench', help="Time ingest and lookups against a naive aggregation")
+    bench.add_argument('paths', nargs='*', default=[SAMPLE_DIR])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.command == 'ingest':
+        ingest(args.paths, args.out)
+        if os.path.abspath(args.out) != os.path.abspath(STORE_PATH or ''):
+            print(f"Set SFU_GRADE_STORE={args.out} for the bot to use it")
+    elif args.command == 'sample':
+        print(f"Wrote {write_sample()} offerings to {SAMPLE_DIR}")
+    elif args.command == 'bench':
+        logging.getLogger().setLevel(logging.WARNING)
+        benchmark(args.paths)
+    else:
+        store = GradeStore.load(args.store)
+        code = ' '.join(' '.join(args.course).upper().split()[:2])
+        if store is None or store.course(code) is None:
+            print(f"No ingested grades for {code}")
+            return
+        print(f"{code}: {store.course(code)}")
+        for term, stats in store.by_term(code):
+            print(f"  {term:<12} {stats}")
+        for name, stats in store.by_instructor(code):
+            print(f"  {name:<24} {stats}")
+
+
+if __name__ == '__main__':
+    main()
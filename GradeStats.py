@@ -0,0 +1,223 @@
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GRADE_FILE = os.path.join(SCRIPT_DIR, 'data.txt')
+
+GRADE_TO_GPA = {
+    'A+': 4.33, 'A': 4.00, 'A-': 3.67,
+    'B+': 3.33, 'B': 3.00, 'B-': 2.67,
+    'C+': 2.33, 'C': 2.00, 'C-': 1.67,
+    'D': 1.00, 'F': 0.00
+}
+MAX_GPA = 4.33
+# Pseudo-count pulling small classes toward their department's mean when ranking
+PRIOR_WEIGHT = 20.0
+
+
+def course_number(number):
+    """'100W' -> 100; placeholder numbers like 'X99' -> -1"""
+    match = re.match(r'\d+', number)
+    return int(match.group(0)) if match else -1
+
+
+def grade_to_gpa(median_grade):
+    """'B+' -> 3.33; split medians like 'A-/A' average both grades; unknown -> nan"""
+    points = [GRADE_TO_GPA[g] for g in median_grade.split('/') if g in GRADE_TO_GPA]
+    return sum(points) / len(points) if points else float('nan')
+
+
+class GradeTable:
+    """data.txt as NumPy columns, one row per course.
+
+    Rankings are computed over whole columns: a department mean via bincount, a
+    count-weighted (shrunk) GPA per course and its percentile across the table.
+    """
+
+    def __init__(self, codes, medians, fail, counts, difficulty=None):
+        self.codes = np.asarray(codes, dtype=object)
+        self.medians = np.asarray(medians, dtype=object)
+        self.fail = np.asarray(fail, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.gpa = np.array([grade_to_gpa(m) for m in self.medians], dtype=np.float64)
+        # 0 (easy) - 5 (hard), once per load; ingested courses bring their own from the full distribution
+        self.difficulty = np.round((MAX_GPA - self.gpa) / MAX_GPA * 5, 1)
+        if difficulty is not None:
+            given = np.asarray(difficulty, dtype=np.float64)
+            self.difficulty = np.where(np.isnan(given), self.difficulty, given)
+        self.depts = np.array([code.split()[0] for code in self.codes], dtype=object)
+        self.numbers = np.array([course_number(code.split()[1]) for code in self.codes], dtype=np.int64)
+        self.levels = np.where(self.numbers >= 0, self.numbers // 100 * 100, -1)
+        self.row_of = {code: i for i, code in enumerate(self.codes)}
+        # 'ENSC 100W' is also reachable as 'ENSC 100', the code the catalog uses
+        for i, code in enumerate(self.codes):
+            if self.numbers[i] >= 0:
+                self.row_of.setdefault(f"{self.depts[i]} {self.numbers[i]}", i)
+
+        self.dept_names, self.dept_index = np.unique(self.depts.astype(str), return_inverse=True)
+        self._rank()
+
+    @classmethod
+    def load(cls, path=GRADE_FILE, store=None):
+        """Courses from `store`, a loaded GradeIngest.GradeStore, if given, then data.txt for the rest"""
+        codes, medians, fail, counts, difficulty = [], [], [], [], []
+        if store is not None:
+            for column, values in zip((codes, medians, fail, counts, difficulty), store.course_table()):
+                column.extend(values)
+            logger.info(f"Loaded ingested grade distributions for {len(codes)} courses")
+        seen = set(codes)
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 4:
+                        continue
+                    code = f"{parts[0]} {parts[1]}"
+                    if code in seen:
+                        continue
+                    seen.add(code)
+                    codes.append(code)
+                    medians.append(parts[2])
+                    fail.append(float(parts[3]))
+                    counts.append(int(parts[4]) if len(parts) > 4 else 0)
+                    difficulty.append(np.nan)
+        except FileNotFoundError:
+            logger.warning(f"Grade statistics file not found: {path}")
+        logger.info(f"Loaded grade statistics for {len(codes)} courses")
+        return cls(codes, medians, fail, counts, difficulty)
+
+    def _rank(self):
+        valid = ~np.isnan(self.gpa)
+        weights = np.where(valid, self.counts, 0).astype(np.float64)
+        gpa = np.where(valid, self.gpa, 0.0)
+        n_depts = len(self.dept_names)
+
+        dept_weight = np.bincount(self.dept_index, weights=weights, minlength=n_depts)
+        dept_gpa_sum = np.bincount(self.dept_index, weights=weights * gpa, minlength=n_depts)
+        dept_fail_sum = np.bincount(self.dept_index, weights=weights * self.fail, minlength=n_depts)
+        global_gpa = (weights * gpa).sum() / weights.sum() if weights.sum() else 0.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.dept_gpa = np.where(dept_weight > 0, dept_gpa_sum / dept_weight, global_gpa)
+            self.dept_fail = np.where(dept_weight > 0, dept_fail_sum / dept_weight, 0.0)
+        self.dept_students = dept_weight.astype(np.int64)
+
+        prior = self.dept_gpa[self.dept_index]
+        self.score = np.where(valid, (weights * gpa + PRIOR_WEIGHT * prior) / (weights + PRIOR_WEIGHT), np.nan)
+        # Percentile of ease across the whole table (100 = easiest)
+        order = np.argsort(np.where(valid, self.score, -np.inf), kind='stable')
+        ranks = np.empty(len(order), dtype=np.float64)
+        ranks[order] = np.arange(len(order))
+        n_valid = max(int(valid.sum()), 1)
+        self.percentile = np.where(valid, (ranks - (len(order) - n_valid)) / max(n_valid - 1, 1) * 100, np.nan)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def row(self, course_code):
+        return self.row_of.get(' '.join(course_code.upper().split()[:2]))
+
+    def lookup(self, course_code):
+        """Single-course stats in the shape get_course_digger_info has always returned"""
+        i = self.row(course_code)
+        if i is None:
+            return {'median_grade': 'N/A', 'fail_percentage': 'N/A', 'course_difficulty': 'N/A'}
+        difficulty = self.difficulty[i]
+        return {
+            'median_grade': self.medians[i],
+            'fail_percentage': f"{self.fail[i]:.1f}%",
+            'course_difficulty': 'N/A' if np.isnan(difficulty) else str(difficulty),
+            'sample_size': int(self.counts[i])
+        }
+
+    def as_dict(self):
+        """{course_code: (median_grade, fail_percentage)} for callers that only need single lookups"""
+        return {code: (self.medians[i], float(self.fail[i])) for code, i in self.row_of.items()}
+
+    def mask(self, dept=None, level=None, min_count=0):
+        keep = ~np.isnan(self.score)
+        if dept:
+            matches = np.nonzero(self.dept_names == dept.upper())[0]
+            if not len(matches):
+                return np.zeros(len(self.codes), dtype=bool)
+            keep &= self.dept_index == matches[0]
+        if level:
+            keep &= self.levels == level
+        if min_count:
+            keep &= self.counts >= min_count
+        return keep
+
+    def rank_courses(self, dept=None, level=None, easiest=True, limit=10, min_count=0):
+        """Row indices of the easiest (or hardest) courses matching the filters"""
+        rows = np.nonzero(self.mask(dept, level, min_count))[0]
+        if not len(rows):
+            return rows
+        # Primary key score, ties broken by fail rate
+        keys = (self.fail[rows], -self.score[rows]) if easiest else (-self.fail[rows], self.score[rows])
+        return rows[np.lexsort(keys)[:limit]]
+
+    def rank_departments(self, easiest=True, limit=10, min_students=100):
+        rows = np.nonzero(self.dept_students >= min_students)[0]
+        order = np.argsort(-self.dept_gpa[rows] if easiest else self.dept_gpa[rows], kind='stable')
+        return rows[order[:limit]]
+
+
+def parse_ranking_query(text):
+    """'CMPT 300-level' -> ('CMPT', 300); 'departments' -> ('departments', None)"""
+    text = (text or '').strip()
+    if re.fullmatch(r'(?i)dep(?:artment|t)s?', text):
+        return 'departments', None
+    dept = re.search(r'\b([A-Za-z]{2,5})\b', re.sub(r'(?i)\blevel\b', '', text))
+    level = re.search(r'\b([1-9])00\b', text)
+    return (dept.group(1).upper() if dept else None), (int(level.group(1)) * 100 if level else None)
+
+
+def naive_rank(path, dept, level, limit=10):
+    """The per-line approach: reread data.txt and sort in Python. Kept for the benchmark."""
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 4 or parts[0] != dept:
+                continue
+            number = course_number(parts[1])
+            if level and number // 100 * 100 != level:
+                continue
+            rows.append((grade_to_gpa(parts[2]), -float(parts[3]), f"{parts[0]} {parts[1]}"))
+    rows.sort(reverse=True)
+    return [code for _, _, code in rows[:limit]]
+
+
+def benchmark(dept='CMPT', level=300, rounds=200):
+    table = GradeTable.load()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        naive_rank(GRADE_FILE, dept, level)
+    naive = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        table.rank_courses(dept, level)
+    vectorized = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        table.rank_departments()
+    departments = (time.perf_counter() - start) / rounds
+    print(f"{len(table)} courses, query {dept} {f'{level}-level' if level else 'all levels'}")
+    print(f"  naive per-line scan:   {naive * 1000:8.3f} ms")
+    print(f"  vectorized ranking:    {vectorized * 1000:8.3f} ms  ({naive / vectorized:.0f}x)")
+    print(f"  department ranking:    {departments * 1000:8.3f} ms")
+    for i in table.rank_courses(dept, level, limit=5):
+        print(f"  {table.codes[i]:<10} {table.medians[i]:<5} fail {table.fail[i]:5.1f}%  "
+              f"n={table.counts[i]:<5} p{table.percentile[i]:.0f}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    query = parse_ranking_query(' '.join(sys.argv[1:]) or 'CMPT 300')
+    benchmark(query[0] or 'CMPT', query[1])
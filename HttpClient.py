@@ -0,0 +1,397 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# SFU_HTTP_MODE=record saves every response to the cassette; replay serves only from it, offline
+HTTP_MODE = os.environ.get('SFU_HTTP_MODE') or None
+HTTP_CACHE_DIR = os.environ.get('SFU_HTTP_CACHE', os.path.join(SCRIPT_DIR, 'http_cache'))
+HTTP_CASSETTE_DIR = os.environ.get('SFU_HTTP_CASSETTE', os.path.join(SCRIPT_DIR, 'http_cassette'))
+
+DEFAULT_TIMEOUT = 20.0
+DEFAULT_MAX_AGE = 24 * 3600
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 8
+USER_AGENT = 'SFUCourseBot/1.0'
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HttpError(Exception):
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+
+class ReplayMiss(Exception):
+    """A replay-mode request that was never recorded"""
+
+
+class Response:
+    """The parts of a requests/aiohttp response our callers use, whether fetched or cached"""
+
+    def __init__(self, url, status, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def status(self):
+        return self.status_code
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HttpError(self.status_code, self.url)
+
+
+def request_key(method, url, body=None):
+    payload = f"{method.upper()} {url}\n".encode('utf-8') + (body or b'')
+    return hashlib.sha256(payload).hexdigest()[:40]
+
+
+def encode_body(json_body=None, data=None):
+    if json_body is not None:
+        return json.dumps(json_body, sort_keys=True).encode('utf-8')
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return data
+
+
+def retry_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return BACKOFF * (2 ** attempt)
+
+
+def timing_trace_config():
+    """aiohttp hooks that stamp each request's trace_request_ctx dict with phase start/end times"""
+    import aiohttp
+
+    def mark(name):
+        async def callback(session, context, params):
+            if isinstance(context.trace_request_ctx, dict):
+                context.trace_request_ctx[name] = time.perf_counter()
+        return callback
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(mark('start'))
+    trace.on_dns_resolvehost_start.append(mark('dns_start'))
+    trace.on_dns_resolvehost_end.append(mark('dns_end'))
+    trace.on_connection_create_start.append(mark('connect_start'))
+    trace.on_connection_create_end.append(mark('connect_end'))
+    trace.on_request_end.append(mark('headers'))
+    return trace
+
+
+def phase_timings(marks, done):
+    """DNS / connect / TTFB / download seconds from timing_trace_config's marks.
+
+    Connection setup includes the DNS lookup, so DNS is taken out of connect; TTFB is
+    from the request being sent on a ready connection to the response headers.
+    """
+    start = marks.get('start', done)
+    dns = marks['dns_end'] - marks['dns_start'] if 'dns_end' in marks else None
+    connect = marks['connect_end'] - marks['connect_start'] - (dns or 0.0) if 'connect_end' in marks else None
+    headers = marks.get('headers')
+    ready = marks.get('connect_end', start)
+    return {
+        'dns': dns,
+        'connect': connect,
+        'ttfb': headers - ready if headers else None,
+        'download': done - headers if headers else None,
+        'total': done - start
+    }
+
+
+class ResponseCache:
+    """Responses on disk keyed by request: <key>.json metadata next to a gzipped <key>.gz body"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _paths(self, key):
+        directory = os.path.join(self.root, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.gz")
+
+    def get(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                content = gzip.decompress(f.read())
+        except (FileNotFoundError, json.JSONDecodeError, OSError, EOFError):
+            return None, None
+        return meta, Response(meta['url'], meta['status'], meta['headers'], content, from_cache=True)
+
+    def put(self, key, method, response):
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            'url': response.url,
+            'method': method,
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            'fetched_at': time.time()
+        }
+        suffix = f".{os.getpid()}.tmp"
+        with open(body_path + suffix, 'wb') as f:
+            f.write(gzip.compress(response.content, compresslevel=6, mtime=0))
+        os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + suffix, meta_path)
+
+    def touch(self, key):
+        meta_path, _ = self._paths(key)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta['fetched_at'] = time.time()
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+class HttpClient:
+    """One fetch layer for the scrapers and rating lookups.
+
+    Sync calls share a pooled requests.Session, async calls a lazily created aiohttp
+    session; both get a default timeout, retries with backoff on connection errors and
+    429/5xx, and the same on-disk cache. A cached 200 younger than `max_age` is served
+    without a request; an older one is revalidated with If-None-Match/If-Modified-Since.
+
+    With `controller` set (a CrawlController), every network request waits for a slot
+    and reports its status, TTFB and Retry-After back to it.
+
+    mode='record' fetches everything and writes it to the cassette directory;
+    mode='replay' never touches the network and raises ReplayMiss for unrecorded requests.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_age=DEFAULT_MAX_AGE, mode=HTTP_MODE,
+                 timeout=DEFAULT_TIMEOUT, retries=RETRIES, pool_size=POOL_SIZE, cassette_dir=HTTP_CASSETTE_DIR):
+        if mode not in (None, 'record', 'replay'):
+            raise ValueError(f"Unknown HTTP mode '{mode}'")
+        self.mode = mode
+        self.max_age = max_age
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        root = cassette_dir if mode else cache_dir
+        self.cache = ResponseCache(root) if root else None
+        self._session = None
+        self._async_session = None
+        self.stats = {'network': 0, 'cache_hits': 0, 'revalidated': 0, 'retries': 0}
+        # A CrawlTelemetry, set by scrapers that want per-request timings
+        self.telemetry = None
+        # A CrawlController, set by scrapers to pace network requests by the server's responses
+        self.controller = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=self.retries, backoff_factor=BACKOFF, status_forcelist=RETRY_STATUSES,
+                          allowed_methods=frozenset(['GET', 'POST']), respect_retry_after_header=True,
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+            self._session = requests.Session()
+            self._session.headers['User-Agent'] = USER_AGENT
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def _lookup(self, key, max_age, url):
+        """(cached response or None, conditional headers, fresh?)"""
+        if self.cache is None or self.mode == 'record':
+            return None, {}, False
+        meta, cached = self.cache.get(key)
+        if cached is None:
+            if self.mode == 'replay':
+                raise ReplayMiss(f"No recorded response for {url}")
+            return None, {}, False
+        if self.mode == 'replay' or time.time() - meta['fetched_at'] < max_age:
+            self.stats['cache_hits'] += 1
+            if self.telemetry:
+                self.telemetry.record_cache_hit(url, len(cached.content))
+            return cached, {}, True
+        conditional = {}
+        if 'ETag' in cached.headers:
+            conditional['If-None-Match'] = cached.headers['ETag']
+        if 'Last-Modified' in cached.headers:
+            conditional['If-Modified-Since'] = cached.headers['Last-Modified']
+        return cached, conditional, False
+
+    def _store(self, key, method, response, cached):
+        if response.status_code == 304 and cached is not None:
+            self.stats['revalidated'] += 1
+            if self.telemetry:
+                self.telemetry.count('revalidated')
+            self.cache.touch(key)
+            return cached
+        if self.cache is not None and response.status_code == 200:
+            self.cache.put(key, method, response)
+        return response
+
+    def request(self, method, url, max_age=None, headers=None, json=None, data=None, timeout=None):
+        body = encode_body(json, data)
+        key = request_key(method, url, body)
+        cached, conditional, fresh = self._lookup(key, self.max_age if max_age is None else max_age, url)
+        if fresh:
+            return cached
+
+        self.stats['network'] += 1
+        started = self.controller.acquire() if self.controller else None
+        start = time.perf_counter()
+        try:
+            raw = self.session.request(method, url, headers={**(headers or {}), **conditional},
+                                       data=body, timeout=timeout or self.timeout)
+        except Exception as e:
+            if self.controller:
+                self.controller.release(started, error=True)
+            if self.telemetry:
+                self.telemetry.record_request(url, {'total': time.perf_counter() - start}, error=repr(e))
+            raise
+        if self.controller:
+            # urllib3 retried any 429/5xx itself; the controller still has to hear about them
+            history = getattr(getattr(raw.raw, 'retries', None), 'history', ())
+            status = next((h.status for h in history if h.status in RETRY_STATUSES), raw.status_code)
+            retry_after = raw.headers.get('Retry-After')
+            self.controller.release(started, status, raw.elapsed.total_seconds(),
+                                    retry_delay(0, retry_after) if retry_after else None)
+        if self.telemetry:
+            # requests only exposes time-to-headers; urllib3 keeps the retries it made
+            total = time.perf_counter() - start
+            headers_at = raw.elapsed.total_seconds()
+            retries = getattr(raw.raw, 'retries', None)
+            self.telemetry.record_request(
+                url, {'ttfb': headers_at, 'download': max(total - headers_at, 0.0), 'total': total},
+                len(raw.content), raw.status_code, len(retries.history) if retries else 0
+            )
+        response = Response(raw.url, raw.status_code, dict(raw.headers), raw.content)
+        return self._store(key, method, response, cached)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('headers', {})
+        if kwargs.get('json') is not None:
+            kwargs['headers'] = {**kwargs['headers'], 'Content-Type': 'application/json'}
+        return self.request('POST', url, **kwargs)
+
+    async def aget(self, url, max_age=None, headers=None):
+        """Async GET with the same cache and retry policy, for the crawler"""
+        key = request_key('GET', url)
+        cached, conditional, fresh = self._lookup(key, self.max_age if max_age is None else max_age, url)
+        if fresh:
+            return cached
+
+        if self._async_session is None:
+            import aiohttp
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT},
+                trace_configs=[timing_trace_config()]
+            )
+
+        import aiohttp
+        for attempt in range(self.retries + 1):
+            self.stats['network'] += 1
+            marks = {}
+            started = await self.controller.aacquire() if self.controller else None
+            status = ttfb = retry_after = None
+            try:
+                async with self._async_session.get(url, headers={**(headers or {}), **conditional},
+                                                   trace_request_ctx=marks) as raw:
+                    content = await raw.read()
+                    timings = phase_timings(marks, time.perf_counter())
+                    status, ttfb = raw.status, timings['ttfb']
+                    if raw.headers.get('Retry-After'):
+                        retry_after = retry_delay(attempt, raw.headers['Retry-After'])
+                    if self.telemetry:
+                        self.telemetry.record_request(url, timings, len(content), raw.status, retries=int(attempt > 0))
+                    if raw.status not in RETRY_STATUSES or attempt >= self.retries:
+                        response = Response(str(raw.url), raw.status, dict(raw.headers), content)
+                        return self._store(key, 'GET', response, cached)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self.telemetry:
+                    self.telemetry.record_request(url, phase_timings(marks, time.perf_counter()), error=repr(e),
+                                                  retries=int(attempt > 0))
+                if attempt >= self.retries:
+                    raise
+                logger.warning(f"Retrying {url} after {type(e).__name__}: {e}")
+            finally:
+                # Release before backing off, so the slot is not held through the sleep
+                if self.controller:
+                    self.controller.release(started, status, ttfb, retry_after, error=status is None)
+            self.stats['retries'] += 1
+            if retry_after is not None and self.controller:
+                # The controller holds every request until Retry-After has passed; aacquire waits it out
+                delay = 0.0
+            else:
+                delay = retry_after if retry_after is not None else retry_delay(attempt)
+            if self.telemetry:
+                self.telemetry.record_retry(url, delay)
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_default_client = None
+
+
+def default_client():
+    """Process-wide client for sync callers, configured from the SFU_HTTP_* environment"""
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient()
+    return _default_client
+
+
+def install_ratemyprofessor(client=None):
+    """Point the ratemyprofessor package's module-level `requests` at our client.
+
+    The package calls requests.get/post directly with no session or timeout; this
+    gives its lookups pooling, retries, caching and record/replay.
+    """
+    import ratemyprofessor
+    import ratemyprofessor.professor
+    import ratemyprofessor.school
+    client = client or default_client()
+    for module in (ratemyprofessor, ratemyprofessor.professor, ratemyprofessor.school):
+        module.requests = client
+    return ratemyprofessor
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+MODEL_NAME = "gemini-1.5-flash"
+
+
+class GeminiBackend:
+    """Google Gemini text generation. The client is only imported and configured on first use."""
+    name = 'gemini'
+    answers = True
+
+    def __init__(self, api_key=GEMINI_API_KEY, model_name=MODEL_NAME):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as ga
+            ga.configure(api_key=self.api_key)
+            self._model = ga.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt):
+        response = await self._get_model().generate_content_async(prompt)
+        return response.text
+
+
+class StubBackend:
+    """Offline backend for tests and benchmarks.
+
+    `responder` maps a prompt to the reply text; without one the prompt is echoed back
+    and `answers` is False, so callers should not show the reply to users.
+    `delay` simulates model latency in seconds.
+    """
+    name = 'stub'
+
+    def __init__(self, responder=None, delay=0.0):
+        self.responder = responder
+        self.delay = delay
+        self.calls = 0
+
+    @property
+    def answers(self):
+        return self.responder is not None
+
+    async def generate(self, prompt):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.responder:
+            return self.responder(prompt)
+        return f"[stub] {prompt[:200]}"
+
+
+def get_backend(name=None, **kwargs):
+    """Build a backend by name, defaulting to $SFU_LLM_BACKEND, then Gemini when a key is configured."""
+    name = name or os.environ.get('SFU_LLM_BACKEND') or ('gemini' if GEMINI_API_KEY else 'stub')
+    if name == 'gemini':
+        return GeminiBackend(**kwargs)
+    if name == 'stub':
+        return StubBackend(**kwargs)
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,307 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# Knobs a scenario can be run under; each named config overrides some of them
+BASE_CONFIG = {
+    'rating_concurrency': 8,    # size of the bot's RateMyProfessor limiter
+    'warm_cache': False,        # professor ratings already cached before users arrive
+    'threads': None,            # default executor size for asyncio.to_thread (None = Python's default)
+    'upstream_latency': 0.15,   # mean seconds per fake RateMyProfessor call
+    'send_latency': 0.03,       # seconds per fake Discord send
+}
+CONFIGS = {
+    'serial': {'rating_concurrency': 1},
+    'default': {},
+    'threads32': {'threads': 32},
+    'warm': {'warm_cache': True},
+}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class FakeUpstream:
+    """Stands in for the ratemyprofessor package: blocking calls with jittered latency"""
+
+    def __init__(self, latency, seed=0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.latency * self.rng.uniform(0.5, 1.5)
+        time.sleep(delay)
+        with self.lock:
+            self.in_flight -= 1
+
+    def get_school_by_name(self, name):
+        self._call()
+        return SimpleNamespace(id=1482, name=name)
+
+    def get_professor_by_school_and_name(self, school, name):
+        self._call()
+        return SimpleNamespace(rating=4.0, difficulty=3.0, would_take_again=75.0, num_ratings=20)
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.bot = True    # keeps the bot's own command processing off these messages
+        self.name = f"user{user_id}"
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class FakeMessage:
+    def __init__(self, author, channel, content):
+        self.author = author
+        self.channel = channel
+        self.content = content
+
+
+class FakeContext:
+    """A user's command invocation; replies are recorded so the user can react to them"""
+
+    def __init__(self, author, channel, send_latency):
+        self.author = author
+        self.channel = channel
+        self.send_latency = send_latency
+        self.replies = []
+        self.edits = 0
+        self.replied = asyncio.Event()
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        self.replies.append(content or kwargs)
+        self.replied.set()
+        return self
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(self.send_latency)
+        self.edits += 1
+        return self
+
+    def typing(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def wait_for_replies(self, count, timeout):
+        deadline = time.perf_counter() + timeout
+        while len(self.replies) < count:
+            self.replied.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(self.replied.wait(), remaining)
+
+
+async def monitor_loop_lag(samples, stop, interval=0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def apply_config(bot_module, config, upstream):
+    """Point the bot's limiter, caches and upstreams at this run's configuration"""
+    from MessageScheduler import MessageScheduler
+    from RatingService import RatingService
+    bot_module.rate_limit_lock = asyncio.Semaphore(config['rating_concurrency'])
+    bot_module.ratemyprofessor_client = lambda: upstream
+    bot_module.shared_ratings = None
+    bot_module.sfu_school = None
+    bot_module.professor_cache.clear()
+    bot_module.rating_service = RatingService(bot_module.load_professor_rating, bot_module.professor_cache,
+                                              timeout=None)
+    bot_module.scheduler = MessageScheduler()
+    if config['threads']:
+        asyncio.get_running_loop().set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(max_workers=config['threads']))
+    if config['warm_cache']:
+        for info in bot_module.course_descriptions.values():
+            for section in info['sections']:
+                bot_module.rating_service.store(section['instructor'], {
+                    'rating': '4.0/5.0', 'difficulty': '3.0/5.0', 'would_take_again': '75%', 'num_ratings': 20
+                })
+
+
+async def run_scenario(config, users=500, channels=None, ramp=2.0, think=(0.2, 1.0), timeout=300.0, seed=0):
+    """Simulate `users` members running the /courses dialog against the real command handler.
+
+    Messages are delivered through the bot's own dispatch, so every pending wait_for
+    check runs on every message exactly as it would on the gateway.
+    """
+    import CourseBotv3 as bot_module
+
+    rng = random.Random(seed)
+    bot = bot_module.bot
+    bot.loop = asyncio.get_running_loop()
+    await bot_module.reload_catalog()
+    upstream = FakeUpstream(config['upstream_latency'], seed)
+    apply_config(bot_module, config, upstream)
+
+    targets = [(code.split()[0], code) for code, info in bot_module.course_descriptions.items() if info['sections']]
+    channel_pool = [FakeChannel(10_000 + i) for i in range(channels or users)]
+    latencies, sessions, failures = [], [], 0
+    # The course reply: first send (skeleton) and last edit (all ratings in)
+    first_byte, complete, edits = [], [], []
+    lag = []
+    stop = asyncio.Event()
+
+    async def user(i):
+        nonlocal failures
+        author = FakeUser(i)
+        ctx = FakeContext(author, channel_pool[i % len(channel_pool)], config['send_latency'])
+        dept, code = rng.choice(targets)
+        await asyncio.sleep(rng.uniform(0, ramp))
+
+        start = time.perf_counter()
+        command = asyncio.ensure_future(bot_module.courses.callback(ctx))
+        try:
+            await ctx.wait_for_replies(1, timeout)
+            latencies.append(time.perf_counter() - start)
+            for step, content in enumerate((dept, code), start=2):
+                await asyncio.sleep(rng.uniform(*think))
+                sent = time.perf_counter()
+                bot.dispatch('message', FakeMessage(author, ctx.channel, content))
+                await ctx.wait_for_replies(step, timeout)
+                latencies.append(time.perf_counter() - sent)
+            first_byte.append(latencies[-1])
+            await command
+            complete.append(time.perf_counter() - sent)
+            edits.append(ctx.edits)
+            sessions.append(time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            failures += 1
+            command.cancel()
+
+    rss_before = rss_mb()
+    monitor = asyncio.ensure_future(monitor_loop_lag(lag, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[user(i) for i in range(users)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    replies = len(latencies)
+    return {
+        'users': users,
+        'completed': len(sessions),
+        'failed': failures,
+        'elapsed': elapsed,
+        'sessions_per_s': len(sessions) / elapsed,
+        'replies_per_s': replies / elapsed,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': max(latencies, default=0.0),
+        'first_byte_p95': percentile(first_byte, 0.95),
+        'complete_p50': percentile(complete, 0.50),
+        'complete_p95': percentile(complete, 0.95),
+        'edits_per_reply': sum(edits) / max(len(edits), 1),
+        'lag_p99': percentile(lag, 0.99),
+        'lag_max': max(lag, default=0.0),
+        'upstream_calls': upstream.calls,
+        'upstream_max_in_flight': upstream.max_in_flight,
+        'rss_growth_mb': rss_mb() - rss_before,
+    }
+
+
+def run_config(name, args):
+    """Run one config in a fresh interpreter so memory numbers don't bleed between runs"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, '--users', str(args.users),
+               '--ramp', str(args.ramp), '--seed', str(args.seed)]
+    if args.channels:
+        command += ['--channels', str(args.channels)]
+    if args.upstream_latency is not None:
+        command += ['--upstream-latency', str(args.upstream_latency)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    print(f"{'config':<10} {'done':>6} {'fail':>5} {'secs':>7} {'sess/s':>7} {'p50':>7} {'p95':>7} "
+          f"{'p99':>7} {'max':>7} {'ttfb95':>7} {'done50':>7} {'done95':>7} {'edits':>6} "
+          f"{'lag p99':>8} {'lag max':>8} {'rmp':>6} {'rmp||':>6} {'+RSS MB':>8}")
+    for name, r in results:
+        print(f"{name:<10} {r['completed']:>6} {r['failed']:>5} {r['elapsed']:>7.1f} {r['sessions_per_s']:>7.1f} "
+              f"{r['latency_p50']:>7.2f} {r['latency_p95']:>7.2f} {r['latency_p99']:>7.2f} {r['latency_max']:>7.2f} "
+              f"{r['first_byte_p95']:>7.2f} {r['complete_p50']:>7.2f} {r['complete_p95']:>7.2f} "
+              f"{r['edits_per_reply']:>6.1f} "
+              f"{r['lag_p99'] * 1000:>6.1f}ms {r['lag_max'] * 1000:>6.1f}ms {r['upstream_calls']:>6} "
+              f"{r['upstream_max_in_flight']:>6} {r['rss_growth_mb']:>8.1f}")
+    print("Latencies are seconds from a user's message to the bot's reply; rmp|| is peak concurrent upstream calls.\n"
+          "ttfb95/done50/done95: course reply's first send and its last rating edit; edits: edits per course reply.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many Discord users running /courses at once")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--channels', type=int, default=None, help="Spread users over this many channels (default: one each)")
+    parser.add_argument('--ramp', type=float, default=2.0, help="Seconds over which users arrive")
+    parser.add_argument('--configs', default=','.join(CONFIGS), help=f"Comma-separated, from {', '.join(CONFIGS)}")
+    parser.add_argument('--upstream-latency', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        config = dict(BASE_CONFIG, **CONFIGS[args.child])
+        if args.upstream_latency is not None:
+            config['upstream_latency'] = args.upstream_latency
+        result = asyncio.run(run_scenario(config, args.users, args.channels, args.ramp, seed=args.seed))
+        print(json.dumps(result))
+        return
+
+    results = []
+    for name in args.configs.split(','):
+        print(f"Running {name} with {args.users} users...", file=sys.stderr)
+        results.append((name, run_config(name.strip(), args)))
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,13 @@
-import requests
+import concurrent.futures
 import json
 import logging
+import sys
+
+from TermStore import term_key
+from OutlineStore import OutlineWriter
+from HttpClient import default_client
+from CrawlTelemetry import CrawlTelemetry, report_run
+from CrawlController import CrawlController
 
 # Configure logging to output to the terminal
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -9,15 +16,23 @@ handler = logging.StreamHandler()
 logger.addHandler(handler)
 
 BASE_URL = 'https://www.sfu.ca/bin/wcm/course-outlines'
-API_PARAMS = {
-    'year': '2025',
-    'term': 'spring'
-}
+YEAR = '2025'
+TERM = 'spring'
+# Most outline requests in flight; CrawlController picks how many actually are
+MAX_CONCURRENCY = 8
 
 def fetch_json(url):
-    response = requests.get(url)
+    client = default_client()
+    try:
+        response = client.get(url)
+    except Exception as e:
+        logging.error(f'Failed to fetch data from {url}: {str(e)}')
+        return None
     if response.status_code == 200:
         try:
+            if client.telemetry:
+                with client.telemetry.stage('parse'):
+                    return response.json()
             return response.json()
         except json.JSONDecodeError:
             logging.error(f'Failed to parse JSON from {url}')
@@ -26,47 +41,73 @@ def fetch_json(url):
         logging.error(f'Failed to fetch data from {url}: {response.status_code}')
         return None
 
-def main():
-    data = {}
+def fetch_all(pool, urls):
+    """fetch_json over `urls` on the pool's threads, results in the same order"""
+    return list(pool.map(fetch_json, urls))
+
+def main(year=YEAR, term=TERM, max_concurrency=MAX_CONCURRENCY):
+    api_params = {
+        'year': str(year),
+        'term': term.lower()
+    }
+    # Each section's outline is appended as one record as it arrives; see OutlineStore.py
+    writer = OutlineWriter(term_key(year, term))
+    departments_seen = 0
+    # Request timings, parse and write times go to a run report in crawl_reports/
+    telemetry = CrawlTelemetry('MajorRequirementScrape')
+    telemetry.meta['term'] = term_key(year, term)
+    client = default_client()
+    client.telemetry = telemetry
+    # Requests within a department go out concurrently, as many at once as the API keeps up with
+    controller = CrawlController(maximum=max_concurrency)
+    client.controller = controller
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency)
 
     # Fetch departments
-    departments_url = f'{BASE_URL}?{API_PARAMS["year"]}/{API_PARAMS["term"]}'
+    departments_url = f'{BASE_URL}?{api_params["year"]}/{api_params["term"]}'
     departments = fetch_json(departments_url)
 
-    if departments:
-        for department in departments:
+    try:
+        for department in departments or []:
             department_name = department.get('text', 'unknown')
             logging.info(f'Processing department: {department_name}')
-            data[department_name] = {}
-
-            courses_url = f'{BASE_URL}?{API_PARAMS["year"]}/{API_PARAMS["term"]}/{department_name}'
-            courses = fetch_json(courses_url)
-
-            if courses:
-                for course in courses:
-                    course_number = course.get('value', 'unknown')
-                    course_title = course.get('text', 'unknown')
-                    logging.info(f'Processing course: {course_title} ({course_number}) under {department_name}')
-                    data[department_name][f'{course_title} ({course_number})'] = {}
+            departments_seen += 1
 
-                    # Fetch sections
-                    sections_url = f'{BASE_URL}?{API_PARAMS["year"]}/{API_PARAMS["term"]}/{department_name}/{course_number}'
-                    sections = fetch_json(sections_url)
+            courses_url = f'{BASE_URL}?{api_params["year"]}/{api_params["term"]}/{department_name}'
+            courses = fetch_json(courses_url) or []
+            course_base = f'{BASE_URL}?{api_params["year"]}/{api_params["term"]}/{department_name}'
 
-                    if sections:
-                        for section in sections:
-                            section_code = section.get('value', 'unknown')
-                            section_title = section.get('text', 'unknown')
-                            logging.info(f'Processing section: {section_title} ({section_code}) under {course_title} ({course_number})')
-                            section_url = f'{BASE_URL}?{API_PARAMS["year"]}/{API_PARAMS["term"]}/{department_name}/{course_number}/{section_code}'
-                            section_details = fetch_json(section_url)
+            # Fetch every course's section list, then every section's outline
+            course_numbers = [course.get('value', 'unknown') for course in courses]
+            section_lists = fetch_all(pool, [f'{course_base}/{number}' for number in course_numbers])
+            wanted = []
+            for course, course_number, sections in zip(courses, course_numbers, section_lists):
+                course_title = course.get('text', 'unknown')
+                logging.info(f'Processing course: {course_title} ({course_number}) under {department_name}')
+                for section in sections or []:
+                    section_code = section.get('value', 'unknown')
+                    section_title = section.get('text', 'unknown')
+                    logging.info(f'Processing section: {section_title} ({section_code}) under {course_title} ({course_number})')
+                    wanted.append((course_number, section_code))
 
-                            if section_details:
-                                data[department_name][f'{course_title} ({course_number})'][section_code] = section_details
+            outlines = fetch_all(pool, [f'{course_base}/{number}/{code}' for number, code in wanted])
+            for (course_number, section_code), section_details in zip(wanted, outlines):
+                if section_details:
+                    with telemetry.stage('write'):
+                        writer.add(department_name, course_number, section_code, section_details)
+    finally:
+        pool.shutdown()
+        client.controller = None
 
-    with open('sfu_courses_api.json', 'w') as f:
-        json.dump(data, f, indent=4)
-        logging.info('Data successfully written to sfu_courses_api.json')
+    with telemetry.stage('write'):
+        count = writer.close()
+    logging.info(f'{count} outlines successfully written to {writer.paths[0]}')
+    telemetry.meta['departments'] = departments_seen
+    telemetry.meta['outlines'] = count
+    controller.report_to(telemetry)
+    client.telemetry = None
+    report_run(telemetry)
 
 if __name__ == '__main__':
-    main()
+    # python MajorRequirementScrape.py [year] [term]
+    main(*sys.argv[1:3])
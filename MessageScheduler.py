@@ -0,0 +1,324 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Interactive replies always go before queued bulk listings in the same channel
+INTERACTIVE = 0
+BULK = 1
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+# Discord's documented per-channel message limit, used until response headers say otherwise
+DEFAULT_LIMIT = 5
+DEFAULT_WINDOW = 5.0
+MAX_RETRIES = 3
+
+MESSAGE_ROUTE = re.compile(r'/channels/(\d+)/messages$')
+EDIT_ROUTE = re.compile(r'/channels/(\d+)/messages/\d+$')
+
+
+def embed_chars(embed):
+    """Characters Discord counts toward the 6000-per-message embed limit"""
+    total = len(embed.title or '') + len(embed.description or '')
+    total += len(embed.footer.text or '') if embed.footer else 0
+    total += len(embed.author.name or '') if embed.author else 0
+    for field in embed.fields:
+        total += len(field.name or '') + len(field.value or '')
+    return total
+
+
+def retry_after_from(error, default=DEFAULT_WINDOW):
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After') or headers.get('X-RateLimit-Reset-After')
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return default
+
+
+def chain_future(source, target):
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class RateBucket:
+    """Send budget for one route, seeded with defaults and corrected from X-RateLimit-* headers"""
+
+    def __init__(self, limit=DEFAULT_LIMIT, window=DEFAULT_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def delay(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        return 0.0 if self.remaining > 0 else self.reset_at - now
+
+    def consume(self):
+        self.remaining -= 1
+
+    def update(self, headers, now):
+        try:
+            if 'X-RateLimit-Limit' in headers:
+                self.limit = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Remaining' in headers:
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Reset-After' in headers:
+                self.reset_at = now + float(headers['X-RateLimit-Reset-After'])
+        except (TypeError, ValueError):
+            pass
+
+    def penalize(self, retry_after, now):
+        self.remaining = 0
+        self.reset_at = now + retry_after
+
+
+class OutboundMessage:
+    def __init__(self, content, embeds, priority, future):
+        self.content = content
+        self.embeds = embeds
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+
+    @property
+    def coalescible(self):
+        return self.priority == BULK and self.content is None and self.embeds
+
+
+class PendingEdit:
+    def __init__(self, message, content, embeds, future):
+        self.message = message
+        self.content = content
+        self.embeds = embeds
+        self.future = future
+        self.attempts = 0
+
+
+class MessageScheduler:
+    """Single outbound queue for all bot messages.
+
+    Each channel has a priority queue and a worker that waits on that channel's rate
+    bucket before sending. Consecutive embed-only bulk messages are merged into one
+    message of up to 10 embeds, so a department listing costs a fraction of the sends.
+    Edits have their own per-channel bucket and queue, where a newer edit of a message
+    replaces one still waiting, so only the latest state is ever sent.
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, window=DEFAULT_WINDOW, clock=time.monotonic):
+        self.default_limit = limit
+        self.default_window = window
+        self.clock = clock
+        self.queues = {}
+        self.workers = {}
+        self.buckets = {}
+        self.counter = itertools.count()
+        self.edits = {}
+        self.edit_workers = {}
+        self.stats = {'messages': 0, 'items': 0, 'rate_limited': 0, 'edits': 0, 'edits_coalesced': 0}
+
+    def bucket(self, channel_id):
+        bucket = self.buckets.get(channel_id)
+        if bucket is None:
+            bucket = self.buckets[channel_id] = RateBucket(self.default_limit, self.default_window)
+        return bucket
+
+    def submit(self, destination, content=None, *, embed=None, embeds=None, priority=INTERACTIVE):
+        """Queue a message and return a future for the sent Message (shared by coalesced items)"""
+        embeds = list(embeds or []) + ([embed] if embed is not None else [])
+        future = asyncio.get_running_loop().create_future()
+        channel = getattr(destination, 'channel', destination)
+        channel_id = getattr(channel, 'id', id(channel))
+
+        queue = self.queues.setdefault(channel_id, [])
+        heapq.heappush(queue, (priority, next(self.counter), OutboundMessage(content, embeds, priority, future)))
+        worker = self.workers.get(channel_id)
+        if worker is None or worker.done():
+            self.workers[channel_id] = asyncio.ensure_future(self._drain(channel_id, destination))
+        return future
+
+    async def send(self, destination, content=None, *, embed=None, embeds=None, priority=INTERACTIVE):
+        return await self.submit(destination, content, embed=embed, embeds=embeds, priority=priority)
+
+    def _take_batch(self, queue):
+        _, _, first = heapq.heappop(queue)
+        batch = [first]
+        if not first.coalescible:
+            return batch
+        count = len(first.embeds)
+        chars = sum(embed_chars(e) for e in first.embeds)
+        while queue and queue[0][2].coalescible:
+            candidate = queue[0][2]
+            extra_chars = sum(embed_chars(e) for e in candidate.embeds)
+            if (count + len(candidate.embeds) > MAX_EMBEDS_PER_MESSAGE or
+                    chars + extra_chars > MAX_EMBED_CHARS_PER_MESSAGE):
+                break
+            heapq.heappop(queue)
+            batch.append(candidate)
+            count += len(candidate.embeds)
+            chars += extra_chars
+        return batch
+
+    async def _drain(self, channel_id, destination):
+        queue = self.queues[channel_id]
+        bucket = self.bucket(channel_id)
+        while queue:
+            wait = bucket.delay(self.clock())
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            batch = self._take_batch(queue)
+            embeds = [e for item in batch for e in item.embeds]
+            content = batch[0].content
+            bucket.consume()
+            try:
+                kwargs = {'embeds': embeds} if embeds else {}
+                message = await destination.send(content, **kwargs)
+            except Exception as e:
+                if getattr(e, 'status', None) == 429:
+                    self.stats['rate_limited'] += 1
+                    retry_after = retry_after_from(e, self.default_window)
+                    bucket.penalize(retry_after, self.clock())
+                    logger.warning(f"Rate limited in channel {channel_id}, retrying in {retry_after:.2f}s")
+                    for item in batch:
+                        item.attempts += 1
+                        if item.attempts > MAX_RETRIES:
+                            item.future.set_exception(e)
+                        else:
+                            heapq.heappush(queue, (item.priority, next(self.counter), item))
+                    continue
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            self.stats['messages'] += 1
+            self.stats['items'] += len(batch)
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_result(message)
+        self.workers.pop(channel_id, None)
+
+    def submit_edit(self, message, content=None, *, embed=None, embeds=None):
+        """Queue an edit of a sent message; returns a future resolved once its latest state is sent"""
+        embeds = list(embeds or []) + ([embed] if embed is not None else [])
+        channel = getattr(message, 'channel', message)
+        channel_id = getattr(channel, 'id', id(channel))
+        queue = self.edits.setdefault(channel_id, {})
+        pending = queue.get(id(message))
+        if pending is not None:
+            # Not sent yet: send the newer state instead, and let both callers share the result
+            pending.content, pending.embeds = content, embeds
+            self.stats['edits_coalesced'] += 1
+            return pending.future
+        future = asyncio.get_running_loop().create_future()
+        queue[id(message)] = PendingEdit(message, content, embeds, future)
+        worker = self.edit_workers.get(channel_id)
+        if worker is None or worker.done():
+            self.edit_workers[channel_id] = asyncio.ensure_future(self._drain_edits(channel_id))
+        return future
+
+    async def edit(self, message, content=None, *, embed=None, embeds=None):
+        return await self.submit_edit(message, content, embed=embed, embeds=embeds)
+
+    async def _drain_edits(self, channel_id):
+        queue = self.edits[channel_id]
+        # Discord limits edits on a separate route from sends
+        bucket = self.bucket(('edit', channel_id))
+        while queue:
+            wait = bucket.delay(self.clock())
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            key = next(iter(queue))
+            pending = queue.pop(key)
+            bucket.consume()
+            try:
+                kwargs = {'embeds': pending.embeds} if pending.embeds else {}
+                if pending.content is not None:
+                    kwargs['content'] = pending.content
+                message = await pending.message.edit(**kwargs)
+            except Exception as e:
+                if getattr(e, 'status', None) == 429 and pending.attempts < MAX_RETRIES:
+                    self.stats['rate_limited'] += 1
+                    bucket.penalize(retry_after_from(e, self.default_window), self.clock())
+                    pending.attempts += 1
+                    newer = queue.get(key)
+                    if newer is None:
+                        queue[key] = pending
+                    else:
+                        # The newer state goes out instead; this edit's caller gets that result
+                        newer.future.add_done_callback(lambda done, future=pending.future: chain_future(done, future))
+                    continue
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+                continue
+
+            self.stats['edits'] += 1
+            if not pending.future.done():
+                pending.future.set_result(message)
+        self.edit_workers.pop(channel_id, None)
+
+    def observe_headers(self, channel_id, headers):
+        self.bucket(channel_id).update(headers, self.clock())
+
+    def observe_rate_limit(self, method, url, retry_after):
+        """Hold a channel's bucket after Discord answered one of our sends or edits with a 429"""
+        path = urlsplit(str(url)).path
+        match = MESSAGE_ROUTE.search(path)
+        key = int(match.group(1)) if match and method == 'POST' else None
+        match = EDIT_ROUTE.search(path)
+        if match and method == 'PATCH':
+            key = ('edit', int(match.group(1)))
+        if key is None:
+            return
+        self.stats['rate_limited'] += 1
+        self.bucket(key).penalize(retry_after, self.clock())
+
+    def install(self, bot):
+        """Learn about 429s discord.py hit on the bot's behalf.
+
+        discord.py retries rate-limited requests itself and exposes no response headers,
+        but it logs every 429 with its method, URL and retry delay on the 'discord.http'
+        logger. A handler there pauses the matching bucket so queued messages wait instead
+        of piling onto the same limit; otherwise the scheduler relies on its own buckets.
+        """
+        log = logging.getLogger('discord.http')
+        if not any(isinstance(h, RateLimitLogHandler) and h.scheduler is self for h in log.handlers):
+            log.addHandler(RateLimitLogHandler(self))
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Feeds discord.py's 'responded with 429' warnings to a MessageScheduler"""
+
+    def __init__(self, scheduler):
+        super().__init__(logging.WARNING)
+        self.scheduler = scheduler
+
+    def emit(self, record):
+        if not str(record.msg).startswith('We are being rate limited.') or len(record.args or ()) != 3:
+            return
+        method, url, retry_after = record.args
+        try:
+            self.scheduler.observe_rate_limit(method, url, float(retry_after))
+        except Exception:
+            self.handleError(record)
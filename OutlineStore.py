@@ -0,0 +1,412 @@
+import argparse
+import bisect
+import html
+import json
+import logging
+import mmap
+import os
+import random
+import re
+import struct
+import subprocess
+import sys
+import time
+
+from TermStore import CURRENT_TERM, TERM_DIR, parse_term
+
+logger = logging.getLogger(__name__)
+
+# Index entries: a NUL-padded 'CMPT 225 D100' key, then the record's offset and length
+KEY_BYTES = 24
+ENTRY = struct.Struct(f'<{KEY_BYTES}sQI')
+# Header: magic, entry count, then the size and file name of the records file the offsets point into
+NAME_BYTES = 64
+HEADER = struct.Struct(f'<8sQQ{NAME_BYTES}s')
+MAGIC = b'OUTLIDX2'
+
+
+def outline_paths(term, generation=None):
+    """(records, index) for a term: terms/<term>-outlines.<generation>.jsonl and terms/<term>-outlines.idx.
+
+    Every write gets a new records file; the index names the one it belongs to.
+    """
+    base = os.path.join(TERM_DIR, f"{term}-outlines")
+    records = f"{base}.{generation}.jsonl" if generation is not None else None
+    return records, f"{base}.idx"
+
+
+def records_paths(term):
+    """Every records file written for a term, current or left over"""
+    base = f"{term}-outlines."
+    try:
+        names = os.listdir(TERM_DIR)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(TERM_DIR, name) for name in names if name.startswith(base) and name.endswith('.jsonl')]
+
+
+def remove_store(term):
+    for path in records_paths(term) + [outline_paths(term)[1]]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def outline_key(dept, number, section=''):
+    """('cmpt', '225', 'd100') -> b'CMPT 225 D100'; without a section, the prefix of a course's keys"""
+    key = f"{dept} {number} {section}".upper().encode('utf-8')
+    if len(key) > KEY_BYTES:
+        raise ValueError(f"Outline key too long: {key!r}")
+    return key
+
+
+def parse_course_key(course):
+    """The scraper's '<title> (<number>)' course key -> '<number>'"""
+    return course.rsplit('(', 1)[-1].rstrip(')') if course.endswith(')') else course
+
+
+def plain_text(value):
+    """Outline fields are HTML fragments; tags dropped, entities decoded, whitespace collapsed"""
+    text = re.sub(r'<br\s*/?>|</p>|</li>', '\n', value or '', flags=re.IGNORECASE)
+    text = html.unescape(re.sub(r'<[^>]+>', '', text))
+    return '\n'.join(' '.join(line.split()) for line in text.splitlines() if line.strip())
+
+
+def iter_nested(data):
+    """(dept, number, section, outline) from MajorRequirementScrape's old nested JSON"""
+    for dept, courses in data.items():
+        for course, sections in courses.items():
+            for section, outline in sections.items():
+                yield dept, parse_course_key(course), section, outline
+
+
+class OutlineWriter:
+    """Appends outlines to a JSON Lines record file, then writes a sorted offset index.
+
+    Only (key, offset, length) triples are kept in memory, so a scrape never holds the
+    whole term's outlines. Records go to a new generation-named file no index points at
+    yet; the index, which names that file and its size, is written under a temporary
+    name and renamed into place on close. That one rename publishes the pair, so a
+    reader gets either the old index with the old records or the new with the new.
+    """
+
+    def __init__(self, term):
+        self.term = term
+        self.generation = f"{time.time_ns():x}-{os.getpid()}"
+        self.records_path, self.index_path = outline_paths(term, self.generation)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        self.tmp_index = f"{self.index_path}.{os.getpid()}.tmp"
+        self.records = open(self.records_path, 'wb')
+        self.entries = {}
+        self.offset = 0
+
+    def add(self, dept, number, section, outline):
+        key = outline_key(dept, number, section)
+        record = json.dumps(outline, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.records.write(record + b'\n')
+        # A section scraped twice keeps its latest record
+        self.entries[key] = (self.offset, len(record))
+        self.offset += len(record) + 1
+
+    def close(self):
+        self.records.flush()
+        os.fsync(self.records.fileno())
+        self.records.close()
+        with open(self.tmp_index, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.entries), self.offset,
+                                os.path.basename(self.records_path).encode('utf-8')))
+            for key in sorted(self.entries):
+                f.write(ENTRY.pack(key, *self.entries[key]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.tmp_index, self.index_path)
+        # Open stores keep their mapping of an unlinked file; new opens read the new index
+        for path in records_paths(self.term):
+            if path != self.records_path:
+                os.remove(path)
+        logger.info(f"Wrote {len(self.entries)} outlines to {self.records_path}")
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.records.close()
+            for path in (self.records_path, self.tmp_index):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class OutlineStore:
+    """Read-only, memory-mapped view of a term's outline records.
+
+    Lookups binary-search the fixed-width index in place and decode only the one
+    matching record, so memory stays flat however many outlines the term has; the
+    OS pages in the few index and record pages a lookup touches.
+    """
+
+    def __init__(self, term):
+        self.term = term
+        self.index_path = outline_paths(term)[1]
+        for attempt in range(2):
+            with open(self.index_path, 'rb') as f:
+                self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.stamp = index_stamp(os.fstat(f.fileno()))
+            magic, self.count, size, name = HEADER.unpack_from(self.index, 0)
+            if magic != MAGIC:
+                self.index.close()
+                raise ValueError(f"{self.index_path} is not an outline index (rescrape or convert to rebuild it)")
+            self.records_path = os.path.join(os.path.dirname(self.index_path), name.rstrip(b'\0').decode('utf-8'))
+            try:
+                with open(self.records_path, 'rb') as f:
+                    self.records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+                break
+            except FileNotFoundError:
+                # A writer published a new pair and removed these records between our two opens
+                self.index.close()
+                if attempt:
+                    raise
+        if len(self.records) != size:
+            self.close()
+            raise ValueError(f"{self.records_path} is {len(self.records)} bytes, its index expects {size}")
+        # Lookups jump around the files; readahead would only pull in neighbouring records
+        for mapped in (self.index, self.records):
+            if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+                mapped.madvise(mmap.MADV_RANDOM)
+        # A sequence view of the sorted keys for bisect, read straight from the map
+        self.keys = _IndexKeys(self)
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, position):
+        key, offset, length = ENTRY.unpack_from(self.index, HEADER.size + position * ENTRY.size)
+        return key.rstrip(b'\0'), offset, length
+
+    def get(self, dept, number, section):
+        """The outline for one section, or None"""
+        key = outline_key(dept, number, section)
+        position = bisect.bisect_left(self.keys, key)
+        if position < self.count:
+            found, offset, length = self.entry(position)
+            if found == key:
+                return json.loads(self.records[offset:offset + length])
+        return None
+
+    def sections(self, dept, number):
+        """Section codes with outlines for a course, in order"""
+        prefix = outline_key(dept, number)
+        sections = []
+        position = bisect.bisect_left(self.keys, prefix)
+        while position < self.count:
+            key = self.entry(position)[0]
+            if not key.startswith(prefix):
+                break
+            sections.append(key[len(prefix):].decode('utf-8'))
+            position += 1
+        return sections
+
+    def close(self):
+        self.index.close()
+        if isinstance(self.records, mmap.mmap):
+            self.records.close()
+
+
+class _IndexKeys:
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count
+
+    def __getitem__(self, position):
+        return self.store.entry(position)[0]
+
+
+def index_stamp(stat):
+    # Each publish renames a new file over the index, so the inode changes even within one mtime tick
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def open_store(term=CURRENT_TERM, cache={}):
+    """The term's OutlineStore, reopened when the scraper has rewritten it; None if never scraped"""
+    store = cache.get(term)
+    index_path = outline_paths(term)[1]
+    try:
+        stamp = index_stamp(os.stat(index_path))
+    except OSError:
+        return None
+    if store is None or store.stamp != stamp:
+        if store is not None:
+            store.close()
+        store = cache[term] = OutlineStore(term)
+    return store
+
+
+def convert(json_path, term):
+    """Rewrite an old nested outlines JSON dump as a record file and index"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with OutlineWriter(term) as writer:
+        for dept, number, section, outline in iter_nested(data):
+            writer.add(dept, number, section, outline)
+    return len(writer.entries)
+
+
+def synthetic_outline(dept, number, section, info, rng):
+    """An outline shaped like the course-outlines API's section details, sized like real ones"""
+    paragraph = ' '.join(rng.choice(info['description'].split() or ['outline']) for _ in range(120))
+    return {
+        'info': {'dept': dept, 'number': number, 'section': section, 'title': info['name'],
+                 'description': info['description'], 'units': str(int(info.get('credits') or 3)),
+                 'deliveryMethod': 'In Person', 'courseDetails': paragraph, 'gradingNotes': paragraph[:400],
+                 'requiredReadingNotes': paragraph[:200], 'term': 'Spring 2025'},
+        'instructor': [{'name': f"Instructor {rng.randrange(2000)}", 'email': 'instructor@sfu.ca',
+                        'officeHours': 'Tue 10:30-11:30', 'roleCode': 'PI'}],
+        'courseSchedule': [{'days': day, 'startTime': '10:30', 'endTime': '11:20', 'campus': 'Burnaby',
+                            'buildingCode': 'AQ', 'roomNumber': str(rng.randrange(3000, 5200)),
+                            'sectionCode': 'LEC', 'startDate': 'Mon Jan 6 00:00:00 PST 2025',
+                            'endDate': 'Wed Apr 9 00:00:00 PDT 2025'} for day in ('Mo', 'We', 'Fr')],
+        'grades': [{'description': part, 'weight': str(weight)}
+                   for part, weight in (('Assignments', 30), ('Midterm', 30), ('Final Exam', 40))],
+        'requiredText': [{'details': f"{info['name']}, {rng.randrange(1, 9)}th edition."}],
+    }
+
+
+def build_synthetic(term, scale):
+    """Write a nested JSON dump and a record store of synthetic outlines for every catalog section.
+
+    scale > 1 repeats each section under suffixed section codes to grow the term.
+    """
+    from TermStore import TermCatalogStore
+    rng = random.Random(0)
+    nested = {}
+    keys = []
+    with OutlineWriter(term) as writer:
+        for code, info in sorted(TermCatalogStore().current()['course_descriptions'].items()):
+            dept, number = code.split(' ', 1)
+            for copy in range(scale):
+                for section in info['sections']:
+                    section_code = section['section'] + (f"-{copy}" if copy else '')
+                    outline = synthetic_outline(dept, number, section_code, info, rng)
+                    writer.add(dept, number, section_code, outline)
+                    nested.setdefault(dept, {}).setdefault(f"{info['name']} ({number})", {})[section_code] = outline
+                    keys.append((dept, number, section_code))
+    json_path = os.path.join(TERM_DIR, f"{term}-outlines.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(nested, f)
+    return json_path, keys
+
+
+def private_mb():
+    """Resident memory not backed by a file (the heap); mapped file pages are page cache the OS can drop"""
+    try:
+        with open('/proc/self/statm') as f:
+            fields = f.read().split()
+        return (int(fields[1]) - int(fields[2])) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def measure(mode, term, json_path, keys_path, lookups):
+    """Child process: open outlines one way, then time random section lookups"""
+    from LoadTest import percentile, rss_mb
+    with open(keys_path, 'r', encoding='utf-8') as f:
+        keys = [tuple(key) for key in json.load(f)]
+    rng = random.Random(1)
+    sample = [rng.choice(keys) for _ in range(lookups)]
+    rss_before = rss_mb()
+    private_before = private_mb()
+    start = time.perf_counter()
+    if mode == 'json':
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = {}
+        for dept, courses in data.items():
+            for course, sections in courses.items():
+                index[(dept, parse_course_key(course))] = sections
+        lookup = lambda dept, number, section: index[(dept, number)][section]
+    else:
+        store = OutlineStore(term)
+        lookup = store.get
+    opened = time.perf_counter() - start
+
+    timings = []
+    for dept, number, section in sample:
+        start = time.perf_counter()
+        outline = lookup(dept, number, section)
+        timings.append(time.perf_counter() - start)
+        if outline['info']['section'] != section:
+            raise AssertionError(f"Wrong outline for {dept} {number} {section}")
+    return {'open_ms': opened * 1000, 'p50_us': percentile(timings, 0.5) * 1e6,
+            'p99_us': percentile(timings, 0.99) * 1e6, 'rss_mb': rss_mb() - rss_before,
+            'private_mb': private_mb() - private_before}
+
+
+def benchmark(scales, lookups):
+    term = 'bench-synthetic'
+    print(f"{'outlines':>9} {'file MB':>8} {'mode':>6} {'open ms':>9} {'p50 us':>8} {'p99 us':>8} {'+RSS MB':>8} {'+heap MB':>9}")
+    for scale in scales:
+        json_path, keys = build_synthetic(term, scale)
+        keys_path = os.path.join(TERM_DIR, f"{term}-keys.json")
+        with open(keys_path, 'w', encoding='utf-8') as f:
+            json.dump(keys, f)
+        size = os.path.getsize(json_path) / 2 ** 20
+        try:
+            for mode in ('json', 'store'):
+                # Each in a fresh process so RSS isn't shared between the two
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), 'measure', mode, term,
+                                         json_path, keys_path, str(lookups)],
+                                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output)
+                print(f"{len(keys):>9} {size:>8.1f} {mode:>6} {result['open_ms']:>9.1f} {result['p50_us']:>8.1f} "
+                      f"{result['p99_us']:>8.1f} {result['rss_mb']:>8.1f} {result['private_mb']:>9.1f}")
+        finally:
+            remove_store(term)
+            for path in (json_path, keys_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outline record store tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('show', help="Print one section's outline: show CMPT 225 D100 [term]")
+    show.add_argument('dept')
+    show.add_argument('number')
+    show.add_argument('section', nargs='?')
+    show.add_argument('term', nargs='?', default=None)
+    convert_cmd = commands.add_parser('convert', help="Convert a nested outlines JSON dump")
+    convert_cmd.add_argument('json_path')
+    convert_cmd.add_argument('term', nargs='?', default=None)
+    bench = commands.add_parser('bench', help="JSON blob vs record store: open time, lookup latency, memory")
+    bench.add_argument('--scale', type=int, nargs='+', default=[1, 4])
+    bench.add_argument('--lookups', type=int, default=2000)
+    child = commands.add_parser('measure')
+    for name in ('mode', 'term', 'json_path', 'keys_path'):
+        child.add_argument(name)
+    child.add_argument('lookups', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.command == 'show':
+        store = OutlineStore(parse_term(args.term) if args.term else CURRENT_TERM)
+        if args.section is None:
+            print(' '.join(store.sections(args.dept, args.number)))
+        else:
+            print(json.dumps(store.get(args.dept, args.number, args.section), indent=2))
+    elif args.command == 'convert':
+        count = convert(args.json_path, parse_term(args.term) if args.term else CURRENT_TERM)
+        print(f"Converted {count} outlines")
+    elif args.command == 'bench':
+        logging.getLogger().setLevel(logging.WARNING)
+        benchmark(args.scale, args.lookups)
+    else:
+        logging.getLogger().setLevel(logging.WARNING)
+        print(json.dumps(measure(args.mode, args.term, args.json_path, args.keys_path, args.lookups)))
+
+
+if __name__ == '__main__':
+    main()
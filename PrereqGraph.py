@@ -0,0 +1,417 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from CatalogUtils import normalize_course_code
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Where `python PrereqGraph.py` dumps the built graph for inspection (gitignored)
+GRAPH_DUMP = os.path.join(SCRIPT_DIR, 'build', 'prereq_graph.json')
+
+# "Recommended Prerequisite:" is advice, not a requirement
+PREREQ_LABEL = re.compile(r'(?<!Recommended )\bPrerequisites?:', re.IGNORECASE)
+COREQ_LABEL = re.compile(r'(?<!Recommended )\bCorequisites?:', re.IGNORECASE)
+# Sentences after the requirement that describe something else
+CLAUSE_END = re.compile(
+    r'^(Students\b|Recommended|Corequisite|Prerequisite|Quantitative|'
+    r'Breadth|Writing|Equivalent|This course|Course fee|Note)', re.IGNORECASE
+)
+ADVISORY = re.compile(r'^(Recommended|Students\b|It is recommended)', re.IGNORECASE)
+# e.g. "X with B+ may be substituted for Y", "Y may be taken concurrently", "Z is also recommended"
+SIDE_NOTE = re.compile(
+    r'substitut|concurrently|\bas (?:an? )?corequisite|recommended|identical to|receive credit', re.IGNORECASE
+)
+# Corequisite alternatives inside a prerequisite ("... or Corequisite: MATH 152 or 155", "or corequisite
+# EDUC 403", "(one of which may be taken as a corequisite)") run to the next ';', ', OR' or sentence end
+COREQ_NOTE = re.compile(r'\([^()]*\bco-?requisites?\b[^()]*\)', re.IGNORECASE)
+COREQ_BRANCH = re.compile(
+    r'(?:[,;]?\s*\b(?:or|and)\b)?\s*\b(?:as\s+(?:an?\s+)?)?co-?requisites?\b:?(?:(?!,\s*(?-i:OR)\b)[^;.])*',
+    re.IGNORECASE
+)
+# "An alternative to the above prerequisite is both of ..." is an or with what came before
+ALTERNATIVE = re.compile(r'^An alternative to the above prerequisites? is\s+', re.IGNORECASE)
+GRADE_PHRASE = re.compile(
+    r'(?:with\s+)?(?:a\s+)?(?:minimum\s+)?grade\s+of\s+(?:at\s+least\s+)?([A-D][+-]?|P)(?:\s+or\s+(?:better|higher))?',
+    re.IGNORECASE
+)
+TOKEN_PATTERN = re.compile(
+    r'(?P<alt>\b[A-Z]{2,5}\s*\(\s*or\s+[A-Z]{2,5}\s*\)\s*\d{3}[A-Z]?\b)'
+    r'|(?P<course>\b[A-Z]{2,5}\s+\d{3}[A-Z]?\b)'
+    r'|(?P<number>\b\d{3}[A-Z]?\b(?!\s*units?))'
+    r'|(?P<grade>\x00GRADE(?P<grade_value>[A-DP][+-]?)\x00)'
+    r'|(?P<oneof>(?i:\b(?:one|any)\s+of\b))'
+    r'|(?P<and>\band\b)'
+    r'|(?P<semicolon>;)'
+    r'|(?P<or>\bor\b)'
+    r'|(?P<comma>,)'
+    r'|(?P<lparen>\()'
+    r'|(?P<rparen>\))'
+    r'|(?P<period>\.(?=\s|$))'
+)
+
+
+def extract_clause(description, label=PREREQ_LABEL):
+    """Return the requirement text following `label`, stopping at unrelated sentences"""
+    match = label.search(description or '')
+    if not match:
+        return ''
+    sentences = re.split(r'(?<=\.)\s+', description[match.end():].strip())
+    kept = []
+    for i, sentence in enumerate(sentences):
+        lowered = sentence.lower()
+        # "Prerequisite: Recommended: ..." or "Prerequisite: Students who ..." is advice, not a requirement
+        if i == 0 and ADVISORY.match(sentence):
+            break
+        if i > 0 and CLAUSE_END.match(sentence) and not lowered.startswith('all with'):
+            break
+        # Later sentences that substitute, relax, recommend or cross-list; the stated requirement stands
+        if i > 0 and SIDE_NOTE.search(sentence):
+            break
+        kept.append(ALTERNATIVE.sub('or ', sentence) if i > 0 else sentence)
+    clause = ' '.join(kept)
+    if label is PREREQ_LABEL:
+        # What may be taken at the same time is a corequisite (COREQ_LABEL finds it), not something to finish first
+        clause = COREQ_BRANCH.sub('', COREQ_NOTE.sub('', clause)).strip()
+    return clause
+
+
+def tokenize_requirement(text):
+    """Tokens for the requirement grammar; minimum grades are stamped onto the courses they follow"""
+    text = GRADE_PHRASE.sub(lambda m: f' \x00GRADE{m.group(1).upper()}\x00 ', text)
+    tokens = []
+    dept = None
+    since_grade = []
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        value = match.group(0)
+        if kind == 'alt':
+            # "ECON (or BUEC) 333" -> (ECON 333 or BUEC 333)
+            first, second, number = re.match(r'([A-Z]+)\s*\(\s*or\s+([A-Z]+)\s*\)\s*(\S+)', value).groups()
+            dept = first
+            leaves = [{'course': f"{first} {number}"}, {'course': f"{second} {number}"}]
+            since_grade.extend(leaves)
+            tokens += [('lparen', None), ('course', leaves[0]), ('or', None), ('course', leaves[1]), ('rparen', None)]
+        elif kind == 'course':
+            dept = value.split()[0]
+            leaf = {'course': ' '.join(value.split())}
+            since_grade.append(leaf)
+            tokens.append(('course', leaf))
+        elif kind == 'number':
+            if dept is None:
+                continue
+            leaf = {'course': f"{dept} {value}"}
+            since_grade.append(leaf)
+            tokens.append(('course', leaf))
+        elif kind == 'grade':
+            grade = match.group('grade_value')
+            for leaf in since_grade:
+                leaf.setdefault('min_grade', grade)
+            since_grade = []
+        else:
+            tokens.append((kind, None))
+    return tokens
+
+
+def _combine(op, args):
+    args = [arg for arg in args if arg is not None]
+    if not args:
+        return None
+    if len(args) == 1:
+        return args[0]
+    flat = []
+    for arg in args:
+        if arg.get('op') == op:
+            flat.extend(arg['args'])
+        else:
+            flat.append(arg)
+    return {'op': op, 'args': flat}
+
+
+def _parse_sequence(tokens, pos, force_or=False):
+    """Parse items joined by and/or/commas until ')' or end; returns (node, pos)"""
+    items, ops = [], []
+    pending = None
+    while pos < len(tokens):
+        kind, value = tokens[pos]
+        if kind == 'rparen':
+            break
+        pos += 1
+        if kind == 'course':
+            item = {'course': value['course'], **({'min_grade': value['min_grade']} if 'min_grade' in value else {})}
+        elif kind == 'lparen':
+            item, pos = _parse_sequence(tokens, pos)
+            if pos < len(tokens) and tokens[pos][0] == 'rparen':
+                pos += 1
+        elif kind == 'oneof':
+            # "one of A, B or C" runs to the end of the enclosing group
+            item, pos = _parse_sequence(tokens, pos, force_or=True)
+        elif kind in ('and', 'or', 'comma', 'semicolon', 'period'):
+            if force_or and items and kind in ('and', 'semicolon', 'period'):
+                # "one of A, B or C, and D": the list ends at the first "and" or sentence end
+                return _combine('or', items), pos - 1
+            if items and pending is None:
+                pending = kind
+            elif kind in ('and', 'or') and pending in ('comma', 'semicolon', 'period'):
+                # "A, and B" / "A; or B" / "A. Or B" - the word decides the punctuation
+                pending = kind
+            continue
+        else:
+            continue
+        if item is None:
+            continue
+        if items:
+            ops.append(pending or 'and')
+        items.append(item)
+        pending = None
+
+    if not items:
+        return None, pos
+    if force_or:
+        return _combine('or', items), pos
+
+    # A semicolon or full stop without a word after it separates requirements
+    ops = ['and' if op in ('semicolon', 'period') else op for op in ops]
+    # A comma takes the meaning of the next explicit conjunction: "A, B, C or D" is all-or
+    for i in range(len(ops) - 1, -1, -1):
+        if ops[i] == 'comma':
+            ops[i] = ops[i + 1] if i + 1 < len(ops) else 'and'
+    # "and" binds tighter than "or"
+    groups, current = [], [items[0]]
+    for op, item in zip(ops, items[1:]):
+        if op == 'or':
+            groups.append(_combine('and', current))
+            current = [item]
+        else:
+            current.append(item)
+    groups.append(_combine('and', current))
+    return _combine('or', groups), pos
+
+
+def parse_requirement(text):
+    """Parse requirement text into a tree of {'op': 'and'|'or', 'args': [...]} and
+    {'course': 'MATH 151', 'min_grade': 'C-'} leaves, or None when it names no courses."""
+    tokens = tokenize_requirement(text)
+    node, _ = _parse_sequence(tokens, 0)
+    return node
+
+
+def without_course(node, course_code):
+    """The tree with `course_code` leaves removed, or None if nothing is left"""
+    if node is None or node.get('course') == course_code:
+        return None
+    if 'course' in node:
+        return node
+    return _combine(node['op'], [without_course(arg, course_code) for arg in node['args']])
+
+
+def requirement_courses(node):
+    if node is None:
+        return []
+    if 'course' in node:
+        return [node['course']]
+    courses = []
+    for arg in node['args']:
+        for course in requirement_courses(arg):
+            if course not in courses:
+                courses.append(course)
+    return courses
+
+
+def format_requirement(node, top=True):
+    if node is None:
+        return 'None'
+    if 'course' in node:
+        grade = f" (min {node['min_grade']})" if node.get('min_grade') else ''
+        return f"{node['course']}{grade}"
+    text = f" {node['op']} ".join(format_requirement(arg, top=False) for arg in node['args'])
+    return text if top else f"({text})"
+
+
+def iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class PrereqGraph:
+    """Prerequisite graph over course ids with transitive closures stored as int bitsets.
+
+    `requires[i]` has bit j set when course j appears anywhere in course i's prerequisite
+    tree, in any OR branch (so it is every course that may lead to i, not what all of i needs);
+    `unlocks[j]` is the reverse. Both are computed once in build(), so queries are
+    a dict lookup plus a bit scan.
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.ids = {}
+        self.prereq_expr = {}
+        self.coreq_expr = {}
+        self.direct = []
+        self.direct_reverse = []
+        self.requires = []
+        self.unlocks = []
+
+    def _id(self, code):
+        node_id = self.ids.get(code)
+        if node_id is None:
+            node_id = len(self.codes)
+            self.ids[code] = node_id
+            self.codes.append(code)
+            self.direct.append([])
+            self.direct_reverse.append([])
+        return node_id
+
+    @classmethod
+    def build(cls, course_descriptions):
+        graph = cls()
+        for course_code in course_descriptions:
+            graph._id(course_code)
+        for course_code, info in course_descriptions.items():
+            description = info.get('description') or ''
+            source = graph.ids[course_code]
+            # A course mentioned in its own clause ("No credit for X if Y is completed") is never a requirement
+            prereq = without_course(parse_requirement(extract_clause(description, PREREQ_LABEL)), course_code)
+            coreq = without_course(parse_requirement(extract_clause(description, COREQ_LABEL)), course_code)
+            if prereq:
+                graph.prereq_expr[course_code] = prereq
+            if coreq:
+                graph.coreq_expr[course_code] = coreq
+            for required in requirement_courses(prereq):
+                target = graph._id(required)
+                if target != source and target not in graph.direct[source]:
+                    graph.direct[source].append(target)
+                    graph.direct_reverse[target].append(source)
+        graph.requires = graph._closure(graph.direct)
+        graph.unlocks = graph._closure(graph.direct_reverse)
+        return graph
+
+    def _closure(self, adjacency):
+        """Transitive closure bitsets via Tarjan SCCs; handles the odd cyclic requirement in the data."""
+        n = len(adjacency)
+        index = [None] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack, sccs = [], []
+        counter = 0
+        for root in range(n):
+            if index[root] is not None:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                recurse = False
+                for i in range(child, len(adjacency[node])):
+                    target = adjacency[node][i]
+                    if index[target] is None:
+                        work.append((node, i + 1))
+                        work.append((target, 0))
+                        recurse = True
+                        break
+                    if on_stack[target]:
+                        low[node] = min(low[node], index[target])
+                if recurse:
+                    continue
+                if low[node] == index[node]:
+                    scc = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        scc.append(member)
+                        if member == node:
+                            break
+                    sccs.append(scc)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+        # Tarjan emits SCCs sinks-first, so every target's closure is ready before it's needed
+        closure = [0] * n
+        for scc in sccs:
+            bits = 0
+            for member in scc:
+                for target in adjacency[member]:
+                    bits |= (1 << target) | closure[target]
+            if len(scc) > 1:
+                for member in scc:
+                    bits |= 1 << member
+            for member in scc:
+                closure[member] = bits & ~(1 << member) if len(scc) == 1 else bits
+        return closure
+
+    def prerequisites(self, course_code):
+        """(direct prerequisite codes, every course anywhere below it: the union of all OR branches)"""
+        node_id = self.ids.get(course_code)
+        if node_id is None:
+            return [], []
+        return ([self.codes[i] for i in self.direct[node_id]],
+                sorted(self.codes[i] for i in iter_bits(self.requires[node_id])))
+
+    def unlocked_by(self, course_code):
+        """(courses listing course_code directly, all courses it transitively leads to)"""
+        node_id = self.ids.get(course_code)
+        if node_id is None:
+            return [], []
+        return ([self.codes[i] for i in self.direct_reverse[node_id]],
+                sorted(self.codes[i] for i in iter_bits(self.unlocks[node_id])))
+
+    def course_set(self, course_codes):
+        """Bitset of the given codes; unknown codes are ignored"""
+        bits = 0
+        for code in course_codes:
+            node_id = self.ids.get(code)
+            if node_id is not None:
+                bits |= 1 << node_id
+        return bits
+
+    def to_json(self):
+        return {
+            'codes': self.codes,
+            'direct': self.direct,
+            'prereq_expr': self.prereq_expr,
+            'coreq_expr': self.coreq_expr,
+        }
+
+
+def main():
+    """Build the graph from the catalog and answer a query: python PrereqGraph.py [COURSE]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from TermStore import TermCatalogStore
+
+    course_descriptions = TermCatalogStore().current()['course_descriptions']
+    start = time.perf_counter()
+    graph = PrereqGraph.build(course_descriptions)
+    logger.info(f"Built prerequisite graph: {len(graph.codes)} courses, "
+                f"{sum(map(len, graph.direct))} edges in {time.perf_counter() - start:.3f}s")
+
+    os.makedirs(os.path.dirname(GRAPH_DUMP), exist_ok=True)
+    with open(GRAPH_DUMP, 'w', encoding='utf-8') as f:
+        json.dump(graph.to_json(), f)
+    print(f"Graph written to {GRAPH_DUMP}")
+
+    code = normalize_course_code(' '.join(sys.argv[1:]) or 'CMPT 307')
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        direct, transitive = graph.prerequisites(code)
+    elapsed = (time.perf_counter() - start) / rounds * 1e6
+    print(f"{code} requires: {format_requirement(graph.prereq_expr.get(code))}")
+    print(f"  anywhere in its prerequisite tree ({len(transitive)}): {', '.join(transitive)}")
+    direct, unlocked = graph.unlocked_by(code)
+    print(f"  unlocks ({len(unlocked)}): {', '.join(unlocked[:30])}")
+    print(f"  lookup: {elapsed:.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
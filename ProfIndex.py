@@ -0,0 +1,175 @@
+import bisect
+import difflib
+import logging
+import re
+import sys
+import time
+import unicodedata
+from collections import defaultdict
+
+from CatalogUtils import format_meetings, parse_campuses, parse_meetings
+
+logger = logging.getLogger(__name__)
+
+# Section instructor cells that are not a person
+PLACEHOLDERS = {'tba', 'tbd', 'staff', 'sessional', 's sessional', 'sessional instructor', 'instructor tba', 'faculty'}
+# Below this similarity a misspelled name is not taken as a match
+FUZZY_CUTOFF = 0.75
+# A misspelling this much more similar than the runner-up is taken without asking
+CLEAR_MARGIN = 0.1
+
+
+def normalize_name(name):
+    """'  Isabelle Côté ' -> 'isabelle cote'; accents, case and punctuation don't count"""
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r"[^a-z0-9' ]+", ' ', text).replace("'", '').split())
+
+
+def split_instructors(field):
+    """A scraped instructor cell -> its people; co-taught sections list one per line"""
+    names = []
+    seen = set()
+    for line in (field or '').split('\n'):
+        name = ' '.join(line.split())
+        key = normalize_name(name)
+        if key and key not in PLACEHOLDERS and key not in seen:
+            seen.add(key)
+            names.append(name)
+    return names
+
+
+class ProfIndex:
+    """Reverse section index: normalized instructor name -> everything they teach.
+
+    Built once per catalog load. Each entry is one section with its meetings and
+    campuses already formatted, so a lookup is a dict hit plus, for partial or
+    misspelled names, a search over the few thousand name tokens; sections are
+    never rescanned per request.
+    """
+
+    def __init__(self, course_descriptions):
+        self.names = {}
+        self.teaching = defaultdict(list)
+        tokens = defaultdict(set)
+        for code, info in sorted(course_descriptions.items()):
+            for section in info['sections']:
+                names = split_instructors(section['instructor'])
+                if not names:
+                    continue
+                entry = {
+                    'course': code,
+                    'name': info.get('name', ''),
+                    'section': section['section'],
+                    'schedule': format_meetings(parse_meetings(section['day/time'])),
+                    'campuses': parse_campuses(section['location']),
+                    'with': names
+                }
+                for name in names:
+                    key = normalize_name(name)
+                    # The first spelling seen is shown; 'Côté' and 'Cote' share a key
+                    self.names.setdefault(key, name)
+                    self.teaching[key].append(entry)
+                    for token in key.split():
+                        tokens[token].add(key)
+        self.tokens = dict(tokens)
+        self.sorted_tokens = sorted(self.tokens)
+
+    def _token_keys(self, token):
+        """Instructors with a name token equal to, starting with, or close to `token`"""
+        if token in self.tokens:
+            return set(self.tokens[token])
+        keys = set()
+        start = bisect.bisect_left(self.sorted_tokens, token)
+        for known in self.sorted_tokens[start:]:
+            if not known.startswith(token):
+                break
+            keys |= self.tokens[known]
+        if not keys and len(token) >= 3:
+            for known in difflib.get_close_matches(token, self.sorted_tokens, n=5, cutoff=FUZZY_CUTOFF):
+                keys |= self.tokens[known]
+        return keys
+
+    def resolve(self, query, limit=5):
+        """(how, [(key, similarity)] best first) where how is 'exact', 'words' or 'fuzzy'.
+
+        'words' are names containing every word of the query (or a word starting with
+        it); 'fuzzy' are close spellings, tried only when nothing matches that way.
+        """
+        key = normalize_name(query)
+        if not key:
+            return None, []
+        if key in self.names:
+            return 'exact', [(key, 1.0)]
+        how = 'words'
+        candidates = None
+        for token in key.split():
+            matches = self._token_keys(token)
+            candidates = matches if candidates is None else candidates & matches
+        if not candidates:
+            how = 'fuzzy'
+            candidates = set(difflib.get_close_matches(key, self.names, n=limit, cutoff=FUZZY_CUTOFF))
+        scored = [(name, difflib.SequenceMatcher(None, key, name).ratio()) for name in candidates]
+        scored.sort(key=lambda item: (-item[1], -len(self.teaching[item[0]]), item[0]))
+        return how if scored else None, scored[:limit]
+
+    def match(self, query):
+        """(key or None, [other candidate keys]); a key only when the match is unambiguous"""
+        how, found = self.resolve(query)
+        if not found:
+            return None, []
+        if len(found) == 1 or (how == 'fuzzy' and found[0][1] - found[1][1] >= CLEAR_MARGIN):
+            return found[0][0], [key for key, _ in found[1:]]
+        return None, [key for key, _ in found]
+
+    def profile(self, key):
+        """Display name and sections grouped by course, in course order"""
+        courses = {}
+        for entry in self.teaching.get(key, []):
+            courses.setdefault(entry['course'], []).append(entry)
+        return self.names.get(key), courses
+
+
+def naive_teaching(course_descriptions, query):
+    """The same lookup done by scanning every course's sections for the name"""
+    key = normalize_name(query)
+    found = []
+    for code, info in sorted(course_descriptions.items()):
+        for section in info['sections']:
+            if any(normalize_name(name) == key for name in split_instructors(section['instructor'])):
+                found.append((code, section['section']))
+    return found
+
+
+def benchmark(query, rounds=2000):
+    from TermStore import TermCatalogStore
+
+    courses = TermCatalogStore().current()['course_descriptions']
+    start = time.perf_counter()
+    index = ProfIndex(courses)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        key, _ = index.match(query)
+        name, teaching = index.profile(key)
+    indexed = (time.perf_counter() - start) / rounds
+    if key is None:
+        raise SystemExit(f"No single instructor matches {query!r}")
+    naive_rounds = max(rounds // 100, 1)
+    start = time.perf_counter()
+    for _ in range(naive_rounds):
+        expected = naive_teaching(courses, name)
+    naive = (time.perf_counter() - start) / naive_rounds
+    if [(e['course'], e['section']) for entries in teaching.values() for e in entries] != expected:
+        raise AssertionError("Index and naive results differ")
+
+    print(f"{len(index.names)} instructors, {sum(map(len, index.teaching.values()))} sections; "
+          f"index built in {build * 1000:.1f} ms")
+    print(f"{query!r} -> {name}: {len(expected)} sections in {len(teaching)} courses")
+    print(f"index: {indexed * 1000:.3f} ms   rescan: {naive * 1000:.1f} ms   ({naive / indexed:.0f}x)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    benchmark(' '.join(sys.argv[1:]) or 'david mitchel')
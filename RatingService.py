@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# A cached rating is served as-is for RATING_TTL, then served stale while it's refreshed
+RATING_TTL = 24 * 3600
+# A professor whose lookup just failed isn't retried for this long
+FAILURE_TTL = 60.0
+FETCH_TIMEOUT = 8.0
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def placeholder_rating(text):
+    return {'rating': text, 'difficulty': text, 'would_take_again': text, 'num_ratings': text}
+
+
+UNAVAILABLE = placeholder_rating('Unavailable')
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after `threshold` consecutive failures.
+
+    Open, every call is refused for `reset_timeout` seconds. Then one probe is let
+    through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self):
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info("Rating upstream recovered; circuit closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                logger.warning(f"Rating upstream failing ({self.failures} in a row); circuit open")
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class RatingService:
+    """Professor ratings with stale-while-revalidate, negative caching and a circuit breaker.
+
+    `fetch(name)` is the async upstream lookup. A fresh cached rating is returned
+    straight away; an expired one is also returned straight away while a background
+    task refreshes it. On a miss the caller waits for the fetch (shared by concurrent
+    callers, bounded by `timeout` unless it is None). While the breaker is open, or a name failed within
+    `failure_ttl`, misses get UNAVAILABLE immediately. Failures are never stored in
+    `cache`, which the API and /find read directly.
+    """
+
+    def __init__(self, fetch, cache=None, ttl=RATING_TTL, failure_ttl=FAILURE_TTL, timeout=FETCH_TIMEOUT,
+                 breaker=None, clock=time.monotonic):
+        self.fetch = fetch
+        self.cache = cache if cache is not None else {}
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.timeout = timeout
+        self.clock = clock
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.fetched_at = {}
+        self.failed_at = {}
+        self.in_flight = {}
+        self.stats = {'fresh': 0, 'stale': 0, 'fetched': 0, 'failed': 0, 'refused': 0}
+
+    def store(self, name, rating):
+        self.cache[name] = rating
+        self.fetched_at[name] = self.clock()
+        self.failed_at.pop(name, None)
+
+    def is_stale(self, name):
+        return self.clock() - self.fetched_at.get(name, float('-inf')) >= self.ttl
+
+    async def get(self, name):
+        cached = self.cache.get(name)
+        if cached is not None:
+            if self.is_stale(name):
+                self.stats['stale'] += 1
+                self._refresh(name)
+            else:
+                self.stats['fresh'] += 1
+            return cached
+
+        if self.clock() - self.failed_at.get(name, float('-inf')) < self.failure_ttl:
+            self.stats['refused'] += 1
+            return UNAVAILABLE
+        task = self._refresh(name)
+        if task is None:
+            self.stats['refused'] += 1
+            return UNAVAILABLE
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            return UNAVAILABLE
+
+    def _refresh(self, name):
+        """The running fetch for `name`, starting one if the breaker allows; None if refused"""
+        task = self.in_flight.get(name)
+        if task is None:
+            if not self.breaker.allow():
+                return None
+            task = asyncio.ensure_future(self._fetch(name))
+            self.in_flight[name] = task
+            task.add_done_callback(lambda done: self._done(name, done))
+        return task
+
+    def _done(self, name, task):
+        self.in_flight.pop(name, None)
+        # Background refreshes have no one awaiting them; their errors are already logged
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, name):
+        try:
+            rating = await asyncio.wait_for(self.fetch(name), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['failed'] += 1
+            self.failed_at[name] = self.clock()
+            self.breaker.record_failure()
+            logger.error(f"Error getting professor rating for {name}: {e!r}")
+            raise
+        self.stats['fetched'] += 1
+        self.breaker.record_success()
+        self.store(name, rating)
+        return rating
+
+
+class FlakyUpstream:
+    """Fake RateMyProfessor: per-call latency, plus errors or hangs while `failing` is set"""
+
+    def __init__(self, latency=0.05, seed=0):
+        self.latency = latency
+        self.failing = False
+        self.hang = False
+        self.calls = 0
+        self.rng = random.Random(seed)
+
+    async def __call__(self, name):
+        self.calls += 1
+        if self.failing:
+            if self.hang:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(self.latency)
+            raise ConnectionError("upstream returned 503")
+        await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        return {'rating': f"{self.rng.uniform(2, 5):.1f}/5.0", 'difficulty': '3.0/5.0',
+                'would_take_again': '70%', 'num_ratings': 12}
+
+
+async def simulate():
+    """Walk a service through an outage against the fake upstream and print what callers saw"""
+    upstream = FlakyUpstream()
+    service = RatingService(upstream, ttl=2.0, failure_ttl=0.5, timeout=0.3,
+                            breaker=CircuitBreaker(threshold=3, reset_timeout=1.0))
+    names = [f"Professor {i}" for i in range(20)]
+
+    async def round_trip(label, batch):
+        start = time.perf_counter()
+        calls = upstream.calls
+        results = await asyncio.gather(*[service.get(name) for name in batch])
+        unavailable = sum(result is UNAVAILABLE for result in results)
+        print(f"{label:<42} {(time.perf_counter() - start) * 1000:>7.1f} ms  "
+              f"{len(batch) - unavailable:>2} rated  {unavailable:>2} unavailable  "
+              f"{upstream.calls - calls:>2} upstream calls  breaker {service.breaker.state}")
+
+    await round_trip("cold: first lookups", names[:10])
+    await round_trip("warm: served from cache", names[:10])
+    await asyncio.sleep(2.0)
+    await round_trip("expired: served stale, refreshed behind", names[:10])
+    await asyncio.sleep(0.1)
+
+    upstream.failing = upstream.hang = True
+    await round_trip("outage, upstream hangs: new names", names[10:13])
+    await round_trip("outage, breaker open: new names", names[13:18])
+    await round_trip("outage, breaker open: cached names", names[:10])
+    upstream.hang = False
+    await asyncio.sleep(1.0)
+    await round_trip("half-open: probe gets a 503", names[18:19])
+    upstream.failing = False
+    await asyncio.sleep(1.0)
+    await round_trip("half-open: probe succeeds", names[19:20])
+    await round_trip("recovered: names refused during outage", names[13:18])
+    print(f"stats: {service.stats}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    asyncio.run(simulate())
@@ -0,0 +1,83 @@
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from SharedCache import SharedRatingCache, write_catalog_snapshot
+from TermStore import CURRENT_TERM, catalog_path, load_catalog
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_SCRIPT = os.path.join(SCRIPT_DIR, 'CourseBotv3.py')
+SHARED_CACHE = os.path.join(SCRIPT_DIR, 'shared_cache.sqlite3')
+CATALOG_SNAPSHOT = os.path.join(SCRIPT_DIR, 'catalog_snapshot.pickle')
+RESTART_DELAY = 5.0
+
+
+def shard_ranges(shard_count, processes):
+    """Split shard ids 0..shard_count-1 into `processes` contiguous ranges"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def spawn(shard_ids, shard_count, env):
+    child_env = dict(env, SFU_SHARD_COUNT=str(shard_count), SFU_SHARD_IDS=','.join(map(str, shard_ids)))
+    logger.info(f"Starting shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    return subprocess.Popen([sys.executable, BOT_SCRIPT], env=child_env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the course bot as several shard processes")
+    parser.add_argument('--shards', type=int, required=True, help="Total shard count")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache', default=SHARED_CACHE, help="SQLite file for the shared rating cache")
+    parser.add_argument('--snapshot', default=CATALOG_SNAPSHOT, help="Read-only catalog snapshot path")
+    args = parser.parse_args()
+
+    # Build the shared state once so shards start from it instead of each re-parsing
+    SharedRatingCache(args.cache)
+    source = catalog_path(CURRENT_TERM)
+    write_catalog_snapshot(load_catalog(source), source, args.snapshot)
+    logger.info(f"Wrote catalog snapshot for {CURRENT_TERM} to {args.snapshot}")
+
+    env = dict(os.environ, SFU_SHARED_CACHE=args.cache, SFU_CATALOG_SNAPSHOT=args.snapshot)
+    children = {tuple(ids): spawn(ids, args.shards, env) for ids in shard_ranges(args.shards, args.processes)}
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            child.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while children:
+        for ids, child in list(children.items()):
+            code = child.poll()
+            if code is None:
+                continue
+            if stopping:
+                del children[ids]
+            else:
+                logger.error(f"Shards {ids[0]}-{ids[-1]} exited with {code}; restarting in {RESTART_DELAY:.0f}s")
+                time.sleep(RESTART_DELAY)
+                children[ids] = spawn(list(ids), args.shards, env)
+        time.sleep(0.5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = 30.0
+POLL_INTERVAL = 0.1
+
+
+class SharedRatingCache:
+    """Professor ratings shared by every shard process through one SQLite file in WAL mode.
+
+    Besides the ratings table there is a leases table: the first process to miss on a
+    name takes a short lease and fetches it, the others wait for the row to appear.
+    Within a process, concurrent misses for the same name share a single task.
+    """
+
+    def __init__(self, path, lease_ttl=LEASE_TTL, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._in_flight = {}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratings (name TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # One connection per thread; asyncio.to_thread may run us on any pool thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, name, max_age=None):
+        """Cached payload for `name`, or None if missing or older than `max_age` seconds"""
+        row = self._connect().execute("SELECT payload, fetched_at FROM ratings WHERE name = ?", (name,)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def put(self, name, payload):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO ratings (name, payload, fetched_at) VALUES (?, ?, ?)",
+            (name, json.dumps(payload), time.time())
+        )
+
+    def try_lease(self, name):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM leases WHERE name = ? AND expires_at < ?", (name, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+            (name, self.owner, now + self.lease_ttl)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, name):
+        self._connect().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    async def get_or_fetch(self, name, fetch, max_age=None):
+        """Cached payload for `name`, calling `fetch()` at most once across the cluster.
+
+        `fetch` is an async callable; if it raises, nothing is cached and the error propagates.
+        A row older than `max_age` seconds counts as missing and is refetched.
+        """
+        task = self._in_flight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._get_or_fetch(name, fetch, max_age))
+            self._in_flight[name] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(name, None))
+        return await asyncio.shield(task)
+
+    async def _get_or_fetch(self, name, fetch, max_age=None):
+        while True:
+            payload = await asyncio.to_thread(self.get, name, max_age)
+            if payload is not None:
+                return payload
+            if await asyncio.to_thread(self.try_lease, name):
+                try:
+                    payload = await fetch()
+                    await asyncio.to_thread(self.put, name, payload)
+                    return payload
+                finally:
+                    await asyncio.to_thread(self.release, name)
+            # Another process holds the lease: wait for its row, or for the lease to expire
+            await asyncio.sleep(self.poll_interval)
+
+
+def write_catalog_snapshot(catalog, source_path, snapshot_path):
+    """Pickle a built catalog next to the mtime of the file it came from"""
+    snapshot = {'source': source_path, 'mtime': os.path.getmtime(source_path), 'catalog': catalog}
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+
+
+def load_catalog_snapshot(snapshot_path, source_path):
+    """The snapshotted catalog, or None if it's missing or older than source_path"""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+        return None
+    if snapshot.get('source') != source_path or snapshot.get('mtime') != os.path.getmtime(source_path):
+        return None
+    return snapshot['catalog']
@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+class StartupReport:
+    """Milestones since process start; time_to_first_response is the number we track"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        """Record a milestone the first time it happens; later calls are ignored"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.start
+        return self.marks[name]
+
+    @property
+    def time_to_first_response(self):
+        return self.marks.get('first_response')
+
+    def summary(self):
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in sorted(self.marks.items(), key=lambda m: m[1]))
+
+
+class ResponseTimes:
+    """Recent per-command latencies: to the first reply sent, and to the last edit of it.
+
+    Commands that answer progressively send what they have locally first and edit in
+    slower data as it arrives, so the two numbers move independently.
+    """
+
+    def __init__(self, keep=500):
+        self.samples = defaultdict(lambda: {'first_byte': deque(maxlen=keep), 'complete': deque(maxlen=keep)})
+
+    def record(self, command, first_byte, complete):
+        self.samples[command]['first_byte'].append(first_byte)
+        self.samples[command]['complete'].append(complete)
+
+    def summary(self):
+        """{command: {'count', 'first_byte_p50', 'first_byte_p95', 'complete_p50', 'complete_p95'}} in seconds"""
+        result = {}
+        for command, samples in self.samples.items():
+            row = {'count': len(samples['complete'])}
+            for name, values in samples.items():
+                ordered = sorted(values)
+                for label, p in (('p50', 0.5), ('p95', 0.95)):
+                    row[f"{name}_{label}"] = ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else None
+            result[command] = row
+        return result
+
+
+def import_times(module, top=15):
+    """Run `python -X importtime -c 'import module'` and return the slowest top-level imports.
+
+    Rows are (cumulative_us, self_us, name), counting only direct imports of `module`
+    and of the modules it imports itself, so nested dependencies aren't double counted.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) <= 3:
+            rows.append((int(match.group(2)), int(match.group(1)), match.group(4)))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+class ProbeContext:
+    """Stands in for a user's message arriving the moment the bot connects"""
+
+    def __init__(self, command):
+        self.command = command
+        self.channel = self
+        self.id = 0
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+        return self
+
+
+PROBE = """
+import asyncio, logging, time
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+import CourseBotv3 as bot
+imported = time.perf_counter() - start
+from StartupReport import ProbeContext
+
+async def main():
+    bot.start_warm_up()
+    ctx = ProbeContext(bot.bot.get_command('courses'))
+    try:
+        await bot.catalog_ready_check(ctx)
+    except bot.WarmingUp:
+        pass
+    first = bot.startup.time_to_first_response
+    await bot.catalog_ready.wait()
+    print(imported, first, bot.startup.marks['catalog_loaded'])
+
+asyncio.run(main())
+"""
+
+
+def measure_cold_start():
+    """(import, first response, catalog loaded) seconds in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=SCRIPT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return tuple(float(value) for value in result.stdout.split())
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else 'CourseBotv3'
+    print(f"Slowest imports under `import {module}` (-X importtime)")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, own, name in import_times(module):
+        print(f"{cumulative / 1000:10.1f}ms {own / 1000:8.1f}ms  {name}")
+
+    if module == 'CourseBotv3':
+        imported, first, loaded = measure_cold_start()
+        print()
+        print(f"import CourseBotv3          {imported:6.2f}s")
+        print(f"time to first response      {first:6.2f}s   (\"warming up\" reply)")
+        print(f"catalog loaded              {loaded:6.2f}s   (background)")
+
+
+if __name__ == '__main__':
+    main()
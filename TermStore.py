@@ -0,0 +1,201 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from CatalogUtils import parse_credits
+from SharedCache import load_catalog_snapshot, write_catalog_snapshot
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TERM_DIR = os.path.join(SCRIPT_DIR, 'terms')
+# Catalog file from before the store was term-partitioned; still served for its term
+LEGACY_CATALOG = os.path.join(SCRIPT_DIR, 'sfu_courses2.json')
+LEGACY_TERM = '2025-spring'
+
+CURRENT_TERM = os.environ.get('SFU_TERM', '2025-spring')
+# Set by ShardLauncher.py: shards load the current term from one prebuilt read-only snapshot
+CATALOG_SNAPSHOT = os.environ.get('SFU_CATALOG_SNAPSHOT')
+MAX_LOADED_TERMS = 3
+THREAD_COUNT = 6
+
+SEASONS = ['spring', 'summer', 'fall']
+
+
+def term_key(year, term):
+    return f"{int(year)}-{term.lower()}"
+
+
+def split_term(key):
+    year, season = key.split('-', 1)
+    return year, season
+
+
+def parse_term(text):
+    """'Spring 2025', '2025 spring', '2025-spring', 'spring2025' -> '2025-spring', else None"""
+    lowered = (text or '').lower()
+    year = re.search(r'(20\d{2})', lowered)
+    season = re.search(r'(spring|summer|fall)', lowered)
+    if not year or not season:
+        return None
+    return term_key(year.group(1), season.group(1))
+
+
+def term_sort_key(key):
+    year, season = split_term(key)
+    return int(year), SEASONS.index(season) if season in SEASONS else len(SEASONS)
+
+
+def term_path(key, kind='courses'):
+    return os.path.join(TERM_DIR, f"{key}-{kind}.json")
+
+
+def catalog_path(key):
+    path = term_path(key)
+    if not os.path.exists(path) and key == LEGACY_TERM and os.path.exists(LEGACY_CATALOG):
+        return LEGACY_CATALOG
+    return path
+
+
+def available_terms():
+    terms = set()
+    if os.path.isdir(TERM_DIR):
+        for name in os.listdir(TERM_DIR):
+            match = re.match(r'^(\d{4}-(?:spring|summer|fall))-courses\.json$', name)
+            if match:
+                terms.add(match.group(1))
+    if os.path.exists(LEGACY_CATALOG):
+        terms.add(LEGACY_TERM)
+    return sorted(terms, key=term_sort_key)
+
+
+def process_course_batch(batch):
+    results = {}
+    for course in batch:
+        match = re.search(r'\[([A-Z]+)\s*(\d+)', course['course_name'])
+        if match:
+            dept, number = match.groups()
+            dept = dept.strip()
+            number = number.strip()
+            course_code = f"{dept} {number}"
+            results[course_code] = {
+                'name': course['course_name'].split('[')[0].strip(),
+                'description': course['description'],
+                'sections': course['sections'],
+                'credits': parse_credits(course['course_name'])
+            }
+    return results
+
+
+def build_catalog(courses, version=None):
+    """Index a scraped course list into {'departments', 'course_descriptions', 'version'}"""
+    batch_size = len(courses) // THREAD_COUNT + 1
+    batches = [courses[i:i + batch_size] for i in range(0, len(courses), batch_size)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=THREAD_COUNT) as executor:
+        results = list(executor.map(process_course_batch, batches))
+
+    departments = defaultdict(list)
+    course_descriptions = {}
+    for result in results:
+        for course_code, info in result.items():
+            dept = course_code.split()[0]
+            departments[dept].append(course_code)
+            course_descriptions[course_code] = info
+
+    return {'departments': departments, 'course_descriptions': course_descriptions, 'version': version}
+
+
+def load_catalog(file_path):
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return build_catalog(json.loads(raw), hashlib.sha1(raw).hexdigest()[:12])
+
+
+class TermCatalogStore:
+    """Per-term catalogs loaded on first access.
+
+    The current term is always kept; other terms are evicted least-recently-used once
+    more than `max_loaded` catalogs are in memory.
+    """
+
+    def __init__(self, current_term=CURRENT_TERM, max_loaded=MAX_LOADED_TERMS):
+        self.current_term = current_term
+        self.max_loaded = max(max_loaded, 1)
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def loaded_terms(self):
+        return list(self._loaded)
+
+    def get(self, key, reload=False):
+        """Catalog for `key`, loading it from disk if needed or if its file has changed since.
+
+        Raises FileNotFoundError for unknown terms.
+        """
+        with self._lock:
+            if not reload and key in self._loaded and not self.is_stale(key):
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+        catalog = self._load(key)
+        catalog['term'] = key
+        logger.info(f"Loaded {len(catalog['course_descriptions'])} courses for {key}")
+
+        with self._lock:
+            self._loaded[key] = catalog
+            self._loaded.move_to_end(key)
+            self._evict()
+        return catalog
+
+    def _load(self, key):
+        path = catalog_path(key)
+        # Taken before reading, so a rewrite during the load is caught by the next is_stale()
+        mtime = os.path.getmtime(path)
+        if not CATALOG_SNAPSHOT or key != self.current_term:
+            catalog = load_catalog(path)
+        else:
+            catalog = load_catalog_snapshot(CATALOG_SNAPSHOT, path)
+            if catalog is None:
+                catalog = load_catalog(path)
+                write_catalog_snapshot(catalog, path, CATALOG_SNAPSHOT)
+        catalog['mtime'] = mtime
+        return catalog
+
+    def is_stale(self, key, mtime=None):
+        """True if the term's file has been rewritten since `mtime` (default: since it was loaded here).
+
+        Another shard process's /update or /rollback changes the file, not this process's copy.
+        """
+        if mtime is None:
+            catalog = self._loaded.get(key)
+            if catalog is None:
+                return False
+            mtime = catalog.get('mtime')
+        try:
+            return os.path.getmtime(catalog_path(key)) != mtime
+        except OSError:
+            return False
+
+    def discard(self, key):
+        """Forget a term so the next access rereads it (e.g. after a re-scrape)"""
+        with self._lock:
+            self._loaded.pop(key, None)
+
+    def current(self, reload=False):
+        return self.get(self.current_term, reload=reload)
+
+    def _evict(self):
+        while len(self._loaded) > self.max_loaded:
+            for key in self._loaded:
+                if key != self.current_term:
+                    del self._loaded[key]
+                    logger.info(f"Evicted catalog for {key}")
+                    break
+            else:
+                return
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+import unittest
+
+import discord
+
+from MessageScheduler import BULK, MAX_EMBEDS_PER_MESSAGE, MessageScheduler
+
+
+class FakeRateLimitError(Exception):
+    status = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"429 Too Many Requests (retry after {retry_after:.2f}s)")
+        self.retry_after = retry_after
+
+
+class FakeChannel:
+    """Channel that enforces a fixed-window send limit and raises 429s like Discord"""
+
+    def __init__(self, channel_id, limit, window, scheduler=None):
+        self.id = channel_id
+        self.limit = limit
+        self.window = window
+        self.scheduler = scheduler
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.sent = []
+        self.rate_limited = 0
+
+    async def send(self, content=None, embeds=None, embed=None):
+        await asyncio.sleep(0.001)
+        now = time.monotonic()
+        if now - self.window_start >= self.window:
+            self.window_start, self.used = now, 0
+        if self.used >= self.limit:
+            self.rate_limited += 1
+            raise FakeRateLimitError(self.window - (now - self.window_start))
+        self.used += 1
+        self.sent.append((content, len(embeds or []) + (embed is not None)))
+        if self.scheduler:
+            self.scheduler.observe_headers(self.id, {
+                'X-RateLimit-Limit': str(self.limit),
+                'X-RateLimit-Remaining': str(self.limit - self.used),
+                'X-RateLimit-Reset-After': f"{self.window - (now - self.window_start):.3f}"
+            })
+        return object()
+
+
+def listing(n):
+    return [discord.Embed(title=f"COURSE {i}", description="x" * 300) for i in range(n)]
+
+
+class MessageSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    """Time is scaled down: windows of a fraction of a second instead of Discord's 5s"""
+
+    async def test_bulk_listing_has_no_429s_and_fewer_calls_than_direct_sends(self):
+        limit, window, embeds = 5, 0.2, 60
+        direct = FakeChannel(1, limit, window)
+        for embed in listing(embeds):
+            try:
+                await direct.send(embed=embed)
+            except FakeRateLimitError:
+                pass
+        self.assertGreater(direct.rate_limited, 0)
+
+        scheduler = MessageScheduler(limit=limit, window=window)
+        channels = [FakeChannel(i, limit, window, scheduler) for i in range(3)]
+        await asyncio.gather(*[scheduler.submit(channel, embed=embed, priority=BULK)
+                               for channel in channels for embed in listing(embeds)])
+        for channel in channels:
+            self.assertEqual(channel.rate_limited, 0)
+            self.assertEqual(sum(count for _, count in channel.sent), embeds)
+            # A direct send is one API call per embed
+            self.assertLess(len(channel.sent), embeds)
+            # Coalesced: embed-only bulk items fill whole messages
+            self.assertEqual([count for _, count in channel.sent], [MAX_EMBEDS_PER_MESSAGE] * (embeds // 10))
+        self.assertEqual(scheduler.stats['rate_limited'], 0)
+        self.assertEqual(scheduler.stats['items'], embeds * len(channels))
+
+    async def test_interactive_reply_is_not_coalesced_or_queued_behind_bulk(self):
+        # One send per window, so the worker is waiting on the bucket when the reply arrives
+        scheduler = MessageScheduler(limit=1, window=0.05)
+        channel = FakeChannel(1, 1, 0.05, scheduler)
+        bulk = [scheduler.submit(channel, embed=embed, priority=BULK) for embed in listing(40)]
+        await bulk[0]
+        self.assertEqual(len(channel.sent), 1)
+
+        await scheduler.send(channel, "interactive reply", embed=discord.Embed(title="reply"))
+        self.assertEqual(channel.sent[1], ("interactive reply", 1))
+        self.assertEqual(len(channel.sent), 2)
+
+        await asyncio.gather(*bulk)
+        self.assertEqual(channel.rate_limited, 0)
+        self.assertEqual(sum(count for content, count in channel.sent if content is None), 40)
+
+    async def test_interactive_reply_queued_with_bulk_goes_first(self):
+        scheduler = MessageScheduler(limit=5, window=0.2)
+        channel = FakeChannel(1, 5, 0.2, scheduler)
+        bulk = [scheduler.submit(channel, embed=embed, priority=BULK) for embed in listing(20)]
+        await scheduler.send(channel, "interactive reply")
+        await asyncio.gather(*bulk)
+        self.assertEqual(channel.sent[0], ("interactive reply", 0))
+        self.assertEqual([count for _, count in channel.sent[1:]], [10, 10])
+
+    async def test_logged_429_pauses_the_channel_bucket(self):
+        scheduler = MessageScheduler()
+        scheduler.install(None)
+        log = logging.getLogger('discord.http')
+        handler = log.handlers[-1]
+        self.addCleanup(log.removeHandler, handler)
+        log.warning(
+            'We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.',
+            'POST', 'https://discord.com/api/v10/channels/42/messages', 2.5)
+        self.assertEqual(scheduler.stats['rate_limited'], 1)
+        self.assertGreater(scheduler.bucket(42).delay(scheduler.clock()), 2.0)
+        self.assertEqual(scheduler.bucket(43).delay(scheduler.clock()), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import OutlineStore as outline_store
+from OutlineStore import OutlineStore, OutlineWriter, open_store
+
+
+class OutlineStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        patcher = mock.patch.object(outline_store, 'TERM_DIR', self.dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, outlines):
+        with OutlineWriter('2025-spring') as writer:
+            for (dept, number, section), outline in outlines.items():
+                writer.add(dept, number, section, outline)
+
+    def test_store_opened_before_a_rewrite_keeps_reading_its_own_records(self):
+        self.write({('cmpt', '225', 'd100'): {'title': 'old'}})
+        old = OutlineStore('2025-spring')
+        self.write({('cmpt', '120', 'd100'): {'title': 'a much longer new record'},
+                    ('cmpt', '225', 'd100'): {'title': 'new'}})
+        new = OutlineStore('2025-spring')
+        self.addCleanup(old.close)
+        self.addCleanup(new.close)
+        self.assertEqual(old.get('cmpt', '225', 'd100'), {'title': 'old'})
+        self.assertEqual(new.get('cmpt', '225', 'd100'), {'title': 'new'})
+        # Only the published generation's records are left on disk
+        self.assertEqual(outline_store.records_paths('2025-spring'), [new.records_path])
+
+    def test_open_store_reopens_after_a_rewrite(self):
+        self.write({('cmpt', '225', 'd100'): {'title': 'old'}})
+        cache = {}
+        store = open_store('2025-spring', cache)
+        self.write({('cmpt', '225', 'd100'): {'title': 'new'}})
+        reopened = open_store('2025-spring', cache)
+        self.addCleanup(reopened.close)
+        self.assertIsNot(reopened, store)
+        self.assertEqual(reopened.get('cmpt', '225', 'd100'), {'title': 'new'})
+
+    def test_records_that_do_not_match_the_index_are_refused(self):
+        self.write({('cmpt', '225', 'd100'): {'title': 'old'}})
+        records_path = outline_store.records_paths('2025-spring')[0]
+        with open(records_path, 'ab') as f:
+            f.write(b'{"title":"appended"}\n')
+        with self.assertRaises(ValueError):
+            OutlineStore('2025-spring')
+
+    def test_failed_write_leaves_the_published_pair_alone(self):
+        self.write({('cmpt', '225', 'd100'): {'title': 'old'}})
+        with self.assertRaises(RuntimeError):
+            with OutlineWriter('2025-spring') as writer:
+                writer.add('cmpt', '225', 'd100', {'title': 'new'})
+                raise RuntimeError('scrape failed')
+        store = OutlineStore('2025-spring')
+        self.addCleanup(store.close)
+        self.assertEqual(store.get('cmpt', '225', 'd100'), {'title': 'old'})
+        self.assertEqual(len(os.listdir(self.dir.name)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
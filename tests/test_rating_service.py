@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from RatingService import CLOSED, HALF_OPEN, OPEN, UNAVAILABLE, CircuitBreaker, FlakyUpstream, RatingService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RatingServiceTest(unittest.IsolatedAsyncioTestCase):
+    """RatingService against FlakyUpstream, with a fake clock standing in for TTLs and the breaker timeout"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.upstream = FlakyUpstream(latency=0)
+        self.breaker = CircuitBreaker(threshold=2, reset_timeout=10.0, clock=self.clock)
+        self.service = RatingService(self.upstream, ttl=100.0, failure_ttl=5.0, timeout=None,
+                                     breaker=self.breaker, clock=self.clock)
+
+    async def test_breaker_opens_goes_half_open_and_closes(self):
+        self.upstream.failing = True
+        self.assertIs(await self.service.get('A'), UNAVAILABLE)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertIs(await self.service.get('B'), UNAVAILABLE)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        # Open: refused without calling upstream
+        calls = self.upstream.calls
+        self.assertIs(await self.service.get('C'), UNAVAILABLE)
+        self.assertEqual(self.upstream.calls, calls)
+
+        # After the reset timeout one probe goes through, other callers are still refused,
+        # and the probe's failure reopens the breaker
+        self.clock.advance(10.0)
+        self.upstream.latency = 0.01
+        probe = asyncio.ensure_future(self.service.get('D'))
+        await asyncio.sleep(0)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertIs(await self.service.get('E'), UNAVAILABLE)
+        self.assertIs(await probe, UNAVAILABLE)
+        self.assertEqual(self.upstream.calls, calls + 1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        # A successful probe closes it
+        self.clock.advance(10.0)
+        self.upstream.failing = False
+        rating = await self.service.get('F')
+        self.assertIsNot(rating, UNAVAILABLE)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    async def test_stale_rating_served_while_breaker_open(self):
+        rating = await self.service.get('A')
+        self.clock.advance(150.0)
+        self.upstream.failing = True
+        await self.service.get('B')
+        await self.service.get('C')
+        self.assertEqual(self.breaker.state, OPEN)
+
+        calls = self.upstream.calls
+        self.assertIs(await self.service.get('A'), rating)
+        self.assertEqual(self.upstream.calls, calls)
+        self.assertEqual(self.service.stats['stale'], 1)
+        self.assertNotIn('A', self.service.in_flight)
+
+    async def test_failed_lookup_is_not_cached(self):
+        self.upstream.failing = True
+        self.assertIs(await self.service.get('A'), UNAVAILABLE)
+        self.assertNotIn('A', self.service.cache)
+
+        # Inside failure_ttl the name isn't retried
+        calls = self.upstream.calls
+        self.assertIs(await self.service.get('A'), UNAVAILABLE)
+        self.assertEqual(self.upstream.calls, calls)
+
+        self.clock.advance(5.0)
+        self.upstream.failing = False
+        rating = await self.service.get('A')
+        self.assertIsNot(rating, UNAVAILABLE)
+        self.assertIs(self.service.cache['A'], rating)
+
+    async def test_timed_out_lookup_is_unavailable_and_not_cached(self):
+        self.service.timeout = 0.05
+        self.upstream.failing = self.upstream.hang = True
+        self.assertIs(await self.service.get('A'), UNAVAILABLE)
+        self.assertNotIn('A', self.service.cache)
+        self.assertEqual(self.service.stats['failed'], 1)
+
+    async def test_background_refresh_fills_cache(self):
+        first = await self.service.get('A')
+        self.clock.advance(150.0)
+
+        # Served stale at once, refreshed behind the caller
+        self.assertIs(await self.service.get('A'), first)
+        refresh = self.service.in_flight['A']
+        fresh = await refresh
+        self.assertIs(self.service.cache['A'], fresh)
+        self.assertIsNot(fresh, first)
+        self.assertFalse(self.service.is_stale('A'))
+        self.assertEqual(self.upstream.calls, 2)
+        self.assertIs(await self.service.get('A'), fresh)
+        self.assertEqual(self.upstream.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()